@@ -2,140 +2,394 @@
 #
 # В данном модуле в виде функций реализованы некоторые растровые алгоритмы:
 #
+#   * FrameBuffer                   - растровая плоскость на основе массива NumPy
+#
 #   * bresenham_line                - алгоритм Брезенхейма построения прямой
+#   * bresenham_lines               - алгоритм Брезенхейма построения набора отрезков за один вызов
 #   * bresenham_circle              - алгоритм Брезенхейма построения окружности
+#   * bresenham_circles             - построение набора окружностей или кругов за один вызов
 #
 #   * cohen_sutherland_clipper      - алгоритм Коэна - Сазерленда отсечения отрезка прямоугольником
+#   * cohen_sutherland_clip         - отсечение набора отрезков прямоугольником по алгоритму Коэна - Сазерленда
 #   * liang_barsky_clipper          - алгоритм Лианга - Барски отсечения отрезка прямоугольником
+#   * liang_barsky_clip             - отсечение набора отрезков прямоугольником по алгоритму Лианга - Барски
 #   * cyrus_beck_clipper            - алгоритм Кируса - Бека отсечения отрезка выпуклым многоугольником
+#   * ConvexClipWindow              - выпуклое окно отсечения набора отрезков по алгоритму Кируса - Бека
 #
 #   * sobel_filter                  - фильтр Собеля для выделения контуров изображения
+#   * sobel_array                   - фильтр Собеля для изображения, заданного массивом
+#   * sobel_filter_tiled            - фильтр Собеля для больших изображений по плиткам на нескольких процессах
+#   * sobel_filter_stream           - построчный фильтр Собеля с чтением и записью изображения по мере обработки
+#   * sobel_rows                    - построчный фильтр Собеля для последовательности строк
 #
-#   * line_fill                     - алгоритм рекурсивной заливки отрезками с затравкой
-#   * bitmask_fill (not ready)      - алгоритм нерекурсивной заливки по битовой маске
+#   * line_fill                     - алгоритм заливки отрезками с затравкой
+#   * span_fill                     - нерекурсивная заливка отрезками с затравкой на массиве пикселей
+#   * bitmask_fill                  - алгоритм нерекурсивной заливки по битовой маске
+#   * bitmask_interior              - внутренности замкнутых фигур для набора битовых масок
+#   * label_regions                 - разметка связных областей одного цвета
+#   * RegionIndex                   - кэшируемая разметка областей плоскости для многократной заливки
+#   * flood_fill                    - заливка областей по набору затравочных точек
 #
+#   * Transform2D                   - составное аффинное преобразование набора точек на плоскости
 #   * scale_2D                      - масштабирование точки относительно начала координат
 #   * rotate_2D                     - вращение точки относительно Ox
 #   * shift_2D                      - параллельный перенос точки на плоскости
 #
+#   * Transform3D                   - составное аффинное преобразование набора точек в пространстве
 #   * scale_3D                      - масштабирование точки в пространстве относительно начала координат
 #   * rotateX_3D                    - вращение точки относительно Ox
 #   * rotateY_3D                    - вращение точки относительно Oy
 #   * rotateZ_3D                    - вращение точки относительно Oz
 #   * shift_3D                      - параллельный перенос точки в пространстве
 #
+#   * load_obj                      - чтение сетки из файла OBJ в массивы вершин и треугольных граней
+#   * MeshCache                     - двоичный кэш разобранных файлов OBJ на диске
+#
 #   * roggers_clipper               - отсечение невидимых граней по алгоритму Роджерса
 #   * zbuffer_clipper               - отсечение невидимых граней с помощью Z буффера
 #   * zbuffer_clipper_with_light    - освещение
+#   * render_animation              - построение анимации сетки в GIF или последовательность PNG
+#   * Renderer                      - сеанс построения изображений сеток с хранением сеток, вида и буферов
+#
+#   * profile                       - включение замеров времени этапов и счетчиков построения изображений сеток
+#   * RenderStats                   - результаты замеров с выводом в JSON и в формат Chrome Trace
 #
 
 from PIL import Image
-import array
-from math import sqrt
-from statistics import mean
 import numpy as np
 from random import randint
-
-
-def bresenham_line(line : tuple[tuple[int, int], tuple[int, int]], image : Image, color = 255):
-# функция рисует на растровой плоскости отрезок по 2м точкам по целочисленному алгоритму Брезенхейма
+from functools import lru_cache, cached_property
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from multiprocessing import shared_memory
+import os
+import tempfile
+import shutil
+import hashlib
+import json
+import re
+import time
+
+
+class FrameBuffer:
+# растровая плоскость, хранящая пиксели в массиве NumPy
+# (все растровые алгоритмы модуля принимают как FrameBuffer, так и Image)
 #
 # параметры:
-#   line в виде ((x_1, y_1), (x_2, y_2)) - отрезок
-#   image - растровая плоскость
+#   size в виде (w, h) - ширина и высота плоскости
+#   mode - режим плоскости: 'L' (h, w) uint8, 'RGB' (h, w, 3) uint8, 'RGBA' (h, w, 4) uint8, 'I' (h, w) int32
+#   color - цвет фона
 #
-    # задание переменных
-    x_1 = line[0][0]
-    y_1 = line[0][1]
-    x_2 = line[1][0]
-    y_2 = line[1][1]
+# пиксели хранятся в поле data с индексацией data[y, x], преобразование в Image выполняется только при сохранении;
+# поле version увеличивается при каждой записи через методы плоскости (после прямой записи в data нужно вызвать touch),
+# по нему проверяется актуальность кэшированной разметки областей
+#
+    MODES = {'L': (1, np.uint8), 'RGB': (3, np.uint8), 'RGBA': (4, np.uint8), 'I': (1, np.int32)}
 
-    # если точка 1 лежит правее точки 2, то поменяем их местами
-    if (x_1 > x_2):
-        x = x_1; x_1 = x_2; x_2 = x
-        y = y_1; y_1 = y_2; y_2 = y
-    
-    # данная прямая не помещается полностью на нашу плоскость
-    if ((x_1 < 0) | (x_2 > image.size[0]) | (min(y_1, y_2) < 0) | (max(y_1, y_2) > image.size[1])):
-        return
+    def __init__(self, size : tuple[int, int], mode = 'L', color = 0):
+        if (mode not in FrameBuffer.MODES):
+            raise ValueError(f"unsupported mode {mode!r}")
+
+        channels, dtype = FrameBuffer.MODES[mode]
+        shape = (size[1], size[0]) if channels == 1 else (size[1], size[0], channels)
 
+        self.mode = mode
+        self.data = np.empty(shape, dtype)
+        self.data[...] = _pixel_colors(color, channels, 1)[0]
+        self.version = 0
+        self._regions = None
 
-    dx = (x_2 - x_1); dy = (y_2 - y_1)
+    @classmethod
+    def from_array(cls, data : np.ndarray, mode = None):
+    # создание плоскости поверх уже существующего массива (без копирования)
+    #
+    # параметры:
+    #   data - массив (h, w) или (h, w, c)
+    #   mode - режим плоскости, по умолчанию определяется по форме массива
+    #
+        if (mode is None):
+            mode = 'L' if data.ndim == 2 else {3: 'RGB', 4: 'RGBA'}[data.shape[2]]
+
+        if (mode not in FrameBuffer.MODES):
+            raise ValueError(f"unsupported mode {mode!r}, expected one of {', '.join(FrameBuffer.MODES)}")
+        channels, dtype = FrameBuffer.MODES[mode]
+        if (data.dtype != dtype or (data.ndim == 2) != (channels == 1)):
+            raise ValueError(f"array of {data.dtype} {data.shape} does not match mode {mode!r}")
+
+        fb = cls.__new__(cls)
+        fb.mode = mode
+        fb.data = data
+        fb.version = 0
+        fb._regions = None
+        return fb
+    @classmethod
+    def from_image(cls, image : Image):
+    # создание плоскости по изображению PIL (пиксели копируются один раз)
+        if (image.mode not in FrameBuffer.MODES):
+            raise ValueError(f"unsupported image mode {image.mode!r}, expected one of {', '.join(FrameBuffer.MODES)} (use image.convert)")
+        return cls.from_array(np.array(image, dtype = FrameBuffer.MODES[image.mode][1]), image.mode)
+
+    @property
+    def size(self):
+        return (self.data.shape[1], self.data.shape[0])
+    def copy(self):
+        return FrameBuffer.from_array(self.data.copy(), self.mode)
+
+    def getpixel(self, xy : tuple[int, int]):
+        value = self.data[xy[1], xy[0]]
+        return int(value) if self.data.ndim == 2 else tuple(int(v) for v in value)
+    def putpixel(self, xy : tuple[int, int], color):
+        self.put_pixels(np.array([xy[0]]), np.array([xy[1]]), color)
+    def put_pixels(self, x : np.ndarray, y : np.ndarray, color):
+    # функция записывает набор пикселей одним индексированным присваиванием
+    #
+    # параметры:
+    #   x, y - массивы координат пикселей (пиксели за пределами плоскости отбрасываются)
+    #   color - цвет: число, кортеж каналов или массив цветов для каждого пикселя
+    #
+        x = np.asarray(x); y = np.asarray(y)
+        inside = (x >= 0) & (x < self.data.shape[1]) & (y >= 0) & (y < self.data.shape[0])
 
-    if (dy >= 0):
-        if(dx >= dy):
-            image.putpixel((x_1, y_1), color)
+        colors = _pixel_colors(color, FrameBuffer.MODES[self.mode][0], x.size)
+        if (colors.shape[0] > 1):
+            colors = colors[inside.ravel()]
 
-            x = x_1; y = y_1; var = 0
-            while (x < x_2):
-                var += dy
-                if(2*var > dx):
-                    y += 1
-                    var -= dx
-                x += 1
+        self.data[y[inside], x[inside]] = colors if self.data.ndim == 3 else colors[:, 0]
+        self.version += 1
 
-                image.putpixel((x, y), color)
+    def put_flat(self, index : np.ndarray, color):
+    # функция записывает пиксели по плоским индексам y * w + x (индексы должны лежать на плоскости)
+        colors = _pixel_colors(color, FrameBuffer.MODES[self.mode][0], index.size)
 
+        if (self.data.flags.c_contiguous):
+            self.data.reshape(-1, colors.shape[1])[index] = colors
         else:
-            image.putpixel((x_1, y_1), color)
+            (y, x) = np.divmod(index, self.data.shape[1])
+            self.data[y, x] = colors if self.data.ndim == 3 else colors[:, 0]
+        self.version += 1
+    def touch(self):
+    # отметка об изменении пикселей, записанных напрямую в data
+        self.version += 1
+
+    def regions(self):
+    # разметка связных областей одного цвета (RegionIndex), кэшируется до изменения плоскости
+        if (self._regions is None or self._regions.version != self.version):
+            self._regions = RegionIndex(self)
+        return self._regions
+
+    def to_image(self):
+        return Image.fromarray(self.data, self.mode)
+    def save(self, path):
+        self.to_image().save(path)
+    def show(self):
+        self.to_image().show()
+def _pixel_colors(color, channels, n):
+# вспомогательная функция приведения цвета к массиву (1, channels) или (n, channels)
+# (целое число для многоканальной плоскости трактуется как в PIL: 0xBBGGRR)
+#
+    color = np.asarray(color)
+
+    if (channels == 1):
+        return color.reshape(-1, 1)
 
-            x = x_1; y = y_1; var = 0
-            while (y < y_2):
-                var += dx
-                if(2*var > dy):
-                    x += 1
-                    var -= dy
-                y += 1
+    if (color.ndim == 0 or (color.ndim == 1 and color.shape[0] == n and n != channels)):
+        packed = color.reshape(-1, 1).astype(np.int64)
+        color = (packed >> np.arange(0, 8 * channels, 8)) & 255
 
-                image.putpixel((x, y), color)
+    return color.reshape(-1, channels)
+def _per_item_colors(color, n : int, channels : int):
+# вспомогательная функция, определяющая, задан ли цвет для каждого из n примитивов
+# (один цвет - число, кортеж или массив из channels значений; цвета примитивов - массив NumPy (n,)
+# для одноканальной плоскости или (n, channels), поэтому массив (3,) на плоскости RGB - всегда один цвет)
+#
+    if (not isinstance(color, np.ndarray) or color.ndim == 0):
+        return False
+    if (color.shape == (n, channels) or (channels == 1 and color.shape == (n,))):
+        return True
+    if (color.size == channels):
+        return False
+    raise ValueError(f"expected one color or an array of {n} colors of {channels} channels, got shape {color.shape}")
+def _image_channels(image):
+# число каналов растровой плоскости (FrameBuffer или Image)
+    return FrameBuffer.MODES[image.mode][0] if image.mode in FrameBuffer.MODES else len(image.getbands())
+def _put_pixels(image, x : np.ndarray, y : np.ndarray, color):
+# вспомогательная функция записи набора пикселей в растровую плоскость (FrameBuffer или Image)
+#
+    if (isinstance(image, FrameBuffer)):
+        image.put_pixels(x, y, color)
+    elif (image.mode in FrameBuffer.MODES and 16 * x.size > image.size[0] * image.size[1]):
+        # много пикселей: один проход через массив дешевле поштучной записи
+        fb = FrameBuffer.from_image(image)
+        fb.put_pixels(x, y, color)
+        image.paste(fb.to_image())
     else:
-        if(dx >= -dy):
-            image.putpixel((x_1, y_1), color)
+        pixels = image.load()
+        colors = _pixel_colors(color, len(image.getbands()), x.size).tolist()
+        colors = [c[0] if len(c) == 1 else tuple(c) for c in colors]
+
+        for (i, x_i, y_i) in zip(range(x.size), x.tolist(), y.tolist()):
+            if (0 <= x_i < image.size[0] and 0 <= y_i < image.size[1]):
+                pixels[x_i, y_i] = colors[i if len(colors) > 1 else 0]
+@lru_cache(maxsize = 8)
+def _line_table(width : int):
+# вспомогательная функция, строящая таблицу смещений точек коротких отрезков (длиной меньше 32)
+#
+# элемент [kind, n, d, k] равен смещению плоского индекса k-й точки отрезка относительно его начала,
+# где kind = 2 * (главная ось Ox) + (отрезок идет вверх), n и d - длины отрезка по второй и главной осям
+#
+    n = np.arange(32)[:, None, None]
+    d = np.arange(32)[None, :, None]
+    k = np.arange(32)[None, None, :]
+    delta = (2 * k * n + np.maximum(d - 1, 0)) // np.maximum(2 * d, 1)
+
+    return np.stack((
+        -width * k + delta,     # Oy, вниз
+        width * k + delta,      # Oy, вверх
+        k - width * delta,      # Ox, вниз
+        k + width * delta,      # Ox, вверх
+    )).astype(np.int32).ravel()
+def _segments_steps(segments : np.ndarray, size : tuple[int, int]):
+# вспомогательная функция, вычисляющая параметры шагов набора отрезков по алгоритму Брезенхейма
+#
+# на k-м шаге по главной оси накопленная ошибка var превышает половину шага ровно
+# delta(k) = round_half_down(k * n / d) раз, поэтому точки находятся без цикла по шагам (см. _steps_points);
+# для каждого отрезка заранее вычисляется диапазон шагов k, при которых точка лежит на плоскости,
+# поэтому шаги за пределами плоскости не генерируются вовсе
+#
+# параметры:
+#   segments - массив (N, 4) отрезков в виде (x_1, y_1, x_2, y_2)
+#   size в виде (w, h) - размеры растровой плоскости
+#
+# возвращаемое значение - кортеж массивов (N,): (base, x_major, up, d, n, k_lo, counts), где base - плоский
+# индекс y * w + x первой точки, counts - число видимых точек каждого отрезка
+#
+    (w, h) = size
+    (x_a, y_a, x_b, y_b) = segments.T.copy()
 
-            x = x_1; y = y_1; var = 0
-            while (x < x_2):
-                var += -dy
-                if(2*var > dx):
-                    y -= 1
-                    var -= dx
-                x += 1
+    # если точка 1 лежит правее точки 2, то поменяем их местами
+    swap = x_a > x_b
+    x_1 = np.minimum(x_a, x_b)
+    y_1 = np.where(swap, y_b, y_a)
+    dx = np.abs(x_b - x_a)
+    dy = np.where(swap, y_a - y_b, y_b - y_a)
+
+    up = dy >= 0
+    dy = np.abs(dy)
+
+    # главная ось - та, вдоль которой отрезок длиннее:
+    #   главная координата = s_1 + sign_s * k, вторая координата = m_1 + sign_m * delta(k)
+    x_major = dx >= dy
+    d = np.maximum(dx, dy)
+    n = np.minimum(dx, dy)
+
+    k_lo = np.zeros_like(d)
+    k_hi = d.copy()
+
+    # отрезки, лежащие на плоскости не полностью, ограничиваются диапазоном шагов, при которых точка видна
+    outside = np.flatnonzero((x_1 < 0) | (x_1 + dx >= w) | (np.minimum(y_a, y_b) < 0) | (np.maximum(y_a, y_b) >= h))
+    if (outside.size):
+        sign = np.where(up[outside], 1, -1)
+        xm = x_major[outside]; d_o = d[outside]; n_o = n[outside]
+        s_1 = np.where(xm, x_1[outside], y_1[outside]); sign_s = np.where(xm, 1, sign); limit_s = np.where(xm, w, h) - 1
+        m_1 = np.where(xm, y_1[outside], x_1[outside]); sign_m = np.where(xm, sign, 1); limit_m = np.where(xm, h, w) - 1
+
+        # шаги, при которых главная координата лежит на плоскости
+        lo = np.maximum(np.where(sign_s > 0, -s_1, s_1 - limit_s), 0)
+        hi = np.minimum(np.where(sign_s > 0, limit_s - s_1, s_1), d_o)
+
+        # шаги, при которых вторая координата лежит на плоскости: delta(k) in [t_lo, t_hi]
+        # delta(k) >= t  <=>  k >= ceil((2dt - d + 1) / 2n),   delta(k) <= t  <=>  k <= floor((2dt + d) / 2n)
+        t_lo = np.where(sign_m > 0, -m_1, m_1 - limit_m)
+        t_hi = np.where(sign_m > 0, limit_m - m_1, m_1)
+        n_2 = np.maximum(2 * n_o, 1)
+        lo = np.where(n_o > 0, np.maximum(lo, -((d_o - 2 * d_o * t_lo - 1) // n_2)), lo)
+        hi = np.where(n_o > 0, np.minimum(hi, (2 * d_o * t_hi + d_o) // n_2), hi)
+        hi = np.where((n_o == 0) & ((t_lo > 0) | (t_hi < 0)), -1, hi)
+
+        k_lo[outside] = lo
+        k_hi[outside] = hi
+
+    counts = np.maximum(k_hi - k_lo + 1, 0)
+    return (y_1 * w + x_1, x_major, up, d, n, k_lo, counts)
+def _steps_points(steps : tuple, w : int):
+# вспомогательная функция, вычисляющая плоские индексы точек отрезков по результату _segments_steps
+    (base, x_major, up, d, n, k_lo, counts) = steps
+    offsets = np.cumsum(counts) - counts
+
+    if (d.size and d.max() < 32):
+        # короткие отрезки: смещения точек берутся из таблицы
+        kind = 2 * x_major + up
+        start = (((kind * 32 + n) * 32 + d) * 32 + k_lo - offsets).astype(np.int32)
+        t = np.arange(counts.sum(), dtype = np.int32) + np.repeat(start, counts)
+        return (np.repeat(base.astype(np.int32), counts) + _line_table(w)[t], counts)
+
+    k = np.arange(counts.sum()) + np.repeat(k_lo - offsets, counts)
+    delta = (k * np.repeat(2 * n, counts) + np.repeat(np.maximum(d - 1, 0), counts)) // np.repeat(np.maximum(2 * d, 1), counts)
+    sign = np.where(up, 1, -1)
+    step_k = np.where(x_major, 1, sign * w)
+    step_delta = np.where(x_major, sign * w, 1)
+
+    return (np.repeat(base, counts) + np.repeat(step_k, counts) * k + np.repeat(step_delta, counts) * delta, counts)
 
-                image.putpixel((x, y), color)
 
-        else:
-            image.putpixel((x_1, y_1), color)
-
-            x = x_1; y = y_1; var = 0
-            while (y > y_2):
-                var += dx
-                if(2*var > -dy):
-                    x += 1
-                    var -= -dy
-                y -= 1
-                
-                image.putpixel((x, y), color)
-def bresenham_circle(xy : tuple[int, int], R : int, image : Image, color = 255):
-# функция рисует на растровой плоскости окружность по целочисленному алгоритму Брезенхейма
+def bresenham_line(line : tuple[tuple[int, int], tuple[int, int]], image : Image, color = 255):
+# функция рисует на растровой плоскости отрезок по 2м точкам по целочисленному алгоритму Брезенхейма
+# (часть отрезка, выходящая за пределы плоскости, отсекается попиксельно)
 #
 # параметры:
-#   xy в виде (x, y) - центр окружности
-#   R - радиус окружности    
+#   line в виде ((x_1, y_1), (x_2, y_2)) - отрезок
 #   image - растровая плоскость
 #
-    # задание переменных
-    x_0 = xy[0]
-    y_0 = xy[1]
-
-    # данная окружность не помещается полностью на нашу плоскость
-    if (x_0 - R < 0 | x_0 + R > image.size[0] | y_0 - R < 0 | y_0 + R > image.size[1]):
-        return
+    bresenham_lines(np.array([[line[0][0], line[0][1], line[1][0], line[1][1]]]), image, color)
+def bresenham_lines(segments : np.ndarray, image : Image, color = 255, chunk = 1 << 20):
+# функция рисует на растровой плоскости набор отрезков за один вызов
+# (точки совпадают с bresenham_line для каждого отрезка по отдельности)
+#
+# параметры:
+#   segments - массив (N, 4) отрезков в виде (x_1, y_1, x_2, y_2), дробные координаты округляются
+#   image - растровая плоскость
+#   color - цвет всех отрезков или массив NumPy цветов для каждого отрезка: (N,) для одноканальной плоскости,
+#           (N, c) для плоскости из c каналов
+#   chunk - число точек, обрабатываемых за один проход (ограничивает расход памяти; отрезок не делится,
+#           поэтому проход может содержать больше точек, только если в нем один отрезок)
+#
+    segments = np.asarray(segments).reshape(-1, 4)
+    if (segments.dtype.kind == 'f'):
+        segments = np.rint(segments)
+
+    # при небольших координатах все промежуточные величины помещаются в int32, что вдвое сокращает трафик памяти
+    small = segments.size == 0 or (np.abs(segments).max() < 1 << 13 and max(image.size) <= 1 << 13)
+    segments = segments.astype(np.int32 if small else np.int64, copy = False)
+
+    per_segment = _per_item_colors(color, segments.shape[0], _image_channels(image))
+
+    # проходы делятся по накопленному числу видимых точек, а не по числу отрезков
+    steps = _segments_steps(segments, image.size)
+    ends = np.cumsum(steps[-1])
+    i = 0
+    while (i < segments.shape[0]):
+        j = max(int(np.searchsorted(ends, (ends[i - 1] if i else 0) + chunk, 'right')), i + 1)
+        (index, counts) = _steps_points(tuple(a[i:j] for a in steps), image.size[0])
+        colors = np.repeat(color[i:j], counts, axis = 0) if per_segment else color
+        i = j
+
+        if (isinstance(image, FrameBuffer)):
+            image.put_flat(index, colors)
+        else:
+            (y, x) = np.divmod(index, image.size[0])
+            _put_pixels(image, x, y, colors)
+@lru_cache(maxsize = 1024)
+def _circle_table(R : int, fill : bool):
+# вспомогательная функция, вычисляющая смещения (dx, dy) точек окружности (или круга) радиуса R от центра
+# (таблица строится один раз для каждого радиуса и переиспользуется)
+#
+    if (R == 0):
+        return (np.zeros(1, np.int64), np.zeros(1, np.int64))
 
     dx = 0; dy = R; f = 1 - R
-    image.putpixel((x_0 + dx, y_0 + dy), color) # 0
-    image.putpixel((y_0 + dy, x_0 + dx), color) # 3
-    image.putpixel((x_0 - dx, y_0 - dy), color) # 6
-    image.putpixel((y_0 - dy, x_0 - dx), color) # 9
-
+    x = [dx, dy, -dx, -dy] # 0, 3, 6, 9
+    y = [dy, dx, -dy, -dx]
 
     # данный алгоритм чертит 0 - 1.5 круга от его верхушки (dx, dy) = (0, R)
     # остальные вершины получаются симметрично
@@ -147,14 +401,67 @@ def bresenham_circle(xy : tuple[int, int], R : int, image : Image, color = 255):
             f += 2 * dx + 3
         dx += 1
 
-        image.putpixel((x_0 + dx, y_0 + dy), color) # 0 - 1.5
-        image.putpixel((x_0 + dy, y_0 + dx), color) # 1.5 - 3
-        image.putpixel((x_0 + dy, y_0 - dx), color) # 3 - 4.5
-        image.putpixel((x_0 + dx, y_0 - dy), color) # 4.5 - 6
-        image.putpixel((x_0 - dx, y_0 - dy), color) # 6 - 7.5
-        image.putpixel((x_0 - dy, y_0 - dx), color) # 7.5 - 9
-        image.putpixel((x_0 - dy, y_0 + dx), color) # 9 - 10.5
-        image.putpixel((x_0 - dx, y_0 + dy), color) # 10.5 - 12
+        # 0 - 1.5, 1.5 - 3, 3 - 4.5, 4.5 - 6, 6 - 7.5, 7.5 - 9, 9 - 10.5, 10.5 - 12
+        x += [dx, dy, dy, dx, -dx, -dy, -dy, -dx]
+        y += [dy, dx, -dx, -dy, -dy, -dx, dx, dy]
+
+    (x, y) = np.unique(np.array([x, y]), axis = 1)
+
+    if (fill):
+        # круг: в каждой строке dy заливаются все точки между крайними точками окружности
+        top = np.abs(y).max()
+        half = np.full(2 * top + 1, -1, np.int64)
+        np.maximum.at(half, y + top, np.abs(x))
+        width = np.maximum(2 * half + 1, 0)
+        y = np.repeat(np.arange(-top, top + 1), width)
+        x = np.arange(y.size) - np.repeat(np.cumsum(width) - half - 1, width)
+
+    return (x, y)
+def bresenham_circle(xy : tuple[int, int], R : int, image : Image, color = 255, fill = False):
+# функция рисует на растровой плоскости окружность по целочисленному алгоритму Брезенхейма
+# (часть окружности, выходящая за пределы плоскости, отсекается попиксельно)
+#
+# параметры:
+#   xy в виде (x, y) - центр окружности
+#   R - радиус окружности    
+#   image - растровая плоскость
+#   fill - рисовать закрашенный круг вместо окружности
+#
+    bresenham_circles(np.array([xy]), np.array([R]), image, color, fill)
+def bresenham_circles(centers : np.ndarray, radii, image : Image, color = 255, fill = False):
+# функция рисует на растровой плоскости набор окружностей (или кругов) за один вызов
+#
+# параметры:
+#   centers - массив (N, 2) центров окружностей в виде (x, y)
+#   radii - радиус всех окружностей или массив (N,) радиусов
+#   image - растровая плоскость
+#   color - цвет всех окружностей или массив NumPy цветов для каждой окружности: (N,) для одноканальной
+#           плоскости, (N, c) для плоскости из c каналов
+#   fill - рисовать закрашенные круги вместо окружностей
+#
+    centers = np.rint(np.asarray(centers)).astype(np.int64).reshape(-1, 2)
+    radii = np.broadcast_to(np.rint(np.asarray(radii)).astype(np.int64), centers.shape[:1])
+    if (radii.size and radii.min() < 0):
+        raise ValueError("radius must be non-negative")
+
+    # таблицы смещений всех различных радиусов складываются в общий пул
+    (unique, inverse) = np.unique(radii, return_inverse = True)
+    tables = [_circle_table(int(R), bool(fill)) for R in unique]
+    sizes = np.array([t[0].size for t in tables], np.int64)
+    starts = np.cumsum(sizes) - sizes
+    pool_x = np.concatenate([t[0] for t in tables] + [np.empty(0, np.int64)])
+    pool_y = np.concatenate([t[1] for t in tables] + [np.empty(0, np.int64)])
+
+    # j-я точка i-й окружности - элемент пула starts[r_i] + j
+    counts = sizes[inverse]
+    offsets = np.cumsum(counts) - counts
+    index = np.arange(counts.sum()) + np.repeat(starts[inverse] - offsets, counts)
+
+    x = np.repeat(centers[:, 0], counts) + pool_x[index]
+    y = np.repeat(centers[:, 1], counts) + pool_y[index]
+
+    per_circle = _per_item_colors(color, centers.shape[0], _image_channels(image))
+    _put_pixels(image, x, y, np.repeat(color, counts, axis = 0) if per_circle else color)
 def rectangle(x_min, x_max, y_min, y_max, image : Image):
 # функция рисует на растровой плоскости прямоугольник
 #
@@ -165,10 +472,12 @@ def rectangle(x_min, x_max, y_min, y_max, image : Image):
 #   y_max - верхняя грань прямоугольника   
 #   image - растровая плоскость
 #
-    bresenham_line(((x_min, y_min), (x_min, y_max)), image) # LEFT
-    bresenham_line(((x_max, y_min), (x_max, y_max)), image) # RIGHT
-    bresenham_line(((x_min, y_min), (x_max, y_min)), image) # BOTTOM
-    bresenham_line(((x_min, y_max), (x_max, y_max)), image) # TOP
+    bresenham_lines(np.array([
+        [x_min, y_min, x_min, y_max], # LEFT
+        [x_max, y_min, x_max, y_max], # RIGHT
+        [x_min, y_min, x_max, y_min], # BOTTOM
+        [x_min, y_max, x_max, y_max], # TOP
+    ]), image)
 def polygon(xy, image : Image):
 # функция рисует на растровой плоскости произовольный многоугольник
 #
@@ -176,9 +485,9 @@ def polygon(xy, image : Image):
 #   xy - точки многоугольника в виде ((x_1, y_1), (x_2, y_2), ...)  
 #   image - растровая плоскость
 #
-    for i in range(len(xy)):
-        bresenham_line(((xy[i - 1][0], xy[i - 1][1]), (xy[i][0], xy[i][1])), image)
-def cohen_sutherland_clipper(line : tuple[tuple[int, int], tuple[int, int]], x_min, x_max, y_min, y_max, image : Image):
+    xy = np.asarray(xy).reshape(-1, 2)
+    bresenham_lines(np.hstack((np.roll(xy, 1, axis = 0), xy)), image)
+def cohen_sutherland_clipper(line : tuple[tuple[int, int], tuple[int, int]], x_min, x_max, y_min, y_max, image : Image, draw_window = True):
 # функция отсекает некоторый отрезок прямоугольником на растровой плоскость по алгоритму Коэна - Сазерленда
 #
 # параметры:
@@ -188,89 +497,71 @@ def cohen_sutherland_clipper(line : tuple[tuple[int, int], tuple[int, int]], x_m
 #   y_min - нижняя грань прямоугольника
 #   y_max - верхняя грань прямоугольника   
 #   image - растровая плоскость
+#   draw_window - рисовать ли сам прямоугольник
 #
-    def code(xy : tuple[int, int], x_min, x_max, y_min, y_max):
-    # вспомогательная функция, вычисляющая код точки по алгоритму Коэна - Сазерленда, относительно прямоугольника
-        x = xy[0]
-        y = xy[1]
-
-        code = 0
-
+    (clipped, accept) = cohen_sutherland_clip(np.array([[line[0][0], line[0][1], line[1][0], line[1][1]]]), x_min, x_max, y_min, y_max)
 
-        code += LEFT if x < x_min else 0
-        code += RIGHT if x > x_max else 0
-        code += BOTTOM if y < y_min else 0
-        code += TOP if y > y_max else 0
+    if (draw_window):
+        rectangle(x_min, x_max, y_min, y_max, image)
+    bresenham_lines(clipped[accept], image)
+def cohen_sutherland_clip(segments : np.ndarray, x_min, x_max, y_min, y_max):
+# функция отсекает набор отрезков прямоугольником по алгоритму Коэна - Сазерленда (без рисования)
+#
+# параметры:
+#   segments - массив (N, 4) отрезков в виде (x_1, y_1, x_2, y_2)
+#   x_min, x_max, y_min, y_max - границы прямоугольника
+#
+# возвращаемое значение - массив (N, 4) отсеченных отрезков (float64) и маска видимых отрезков accept
+#
+    def code(x : np.ndarray, y : np.ndarray):
+    # вспомогательная функция, вычисляющая коды точек по алгоритму Коэна - Сазерленда, относительно прямоугольника
+        return (LEFT * (x < x_min)) | (RIGHT * (x > x_max)) | (BOTTOM * (y < y_min)) | (TOP * (y > y_max))
 
-        return code
-    
     # задаю константы
     LEFT = 1; RIGHT = 2; BOTTOM = 4; TOP = 8
 
-    # задание переменных
-    x_1 = line[0][0]
-    y_1 = line[0][1]
-    x_2 = line[1][0]
-    y_2 = line[1][1]
-
-    
-    x_a = x_1; y_a = y_1
-    x_b = x_2; y_b = y_2
-
-    x_c = x_a; y_c = y_a
+    seg = np.array(segments, dtype = np.float64).reshape(-1, 4)
+    code_a = code(seg[:, 0], seg[:, 1])
+    code_b = code(seg[:, 2], seg[:, 3])
 
-    code_a = code(x_a, y_a, x_min, x_max, y_min, y_max)
-    code_b = code(x_b, y_b, x_min, x_max, y_min, y_max)
-    code_c = code(x_c, y_c, x_min, x_max, y_min, y_max)
-
-    # когда коды обоих точек будут равны 0, тогда они будут в прямоугольнике
-    while (code_a | code_b):
-
-        # если обе точки с одной стороны прямоугольника, то отрезок не пересекает прямоугольник
-        if (code_a & code_b):
+    # за один проход каждый активный отрезок переносит одну из своих точек на одну из граней,
+    # поэтому проходов не больше 8 (по 4 грани на каждую точку)
+    for _ in range(8):
+        # отрезок обработан, если обе точки в прямоугольнике или обе с одной стороны от него
+        active = np.flatnonzero(((code_a | code_b) != 0) & ((code_a & code_b) == 0))
+        if (active.size == 0):
             break
 
         # выбираем точку c ненулевым кодом
-        if (code_a):
-            x_c = x_a
-            y_c = y_a
-            code_c = code_a
-        elif (code_b):
-            x_c = x_b
-            y_c = y_b
-            code_c = code_b
-    
-
-        # если c левее прямоугольника, то передвигаем c на прямую x = x_min
-        if (code_c & LEFT):
-            y_c += round((y_a - y_b) * (x_min - x_c) / (x_a - x_b))
-            x_c = x_min
-        # если c правее прямоугольника, то передвигаем c на прямую x = x_max
-        elif (code_c & RIGHT):
-            y_c += round((y_a - y_b) * (x_max - x_c) / (x_a - x_b))
-            x_c = x_max
-        # если c ниже прямоугольника, то передвигаем c на прямую y = y_min
-        elif (code_c & BOTTOM):
-            x_c += round((x_a - x_b) * (y_min - y_c) / (y_a - y_b))
-            y_c = y_min
-        # если c выше прямоугольника, то передвигаем c на прямую y = y_max
-        elif (code_c & TOP):
-            x_c += round((x_a - x_b) * (y_max - y_c) / (y_a - y_b))
-            y_c = y_max
-    
+        use_a = code_a[active] != 0
+        code_c = np.where(use_a, code_a[active], code_b[active])
+        (x_a, y_a, x_b, y_b) = seg[active].T
+        x_c = np.where(use_a, x_a, x_b)
+        y_c = np.where(use_a, y_a, y_b)
 
-        # смещаем точку
-        if (code_a == code_c):
-            x_a = x_c; y_a = y_c
-            code_a = code(x_a, y_a, x_min, x_max, y_min, y_max)
-        elif (code_b == code_c):
-            x_b = x_c; y_b = y_c
-            code_b = code(x_b, y_b, x_min, x_max, y_min, y_max)
+        # переносим c на первую из пересекаемых граней в порядке LEFT, RIGHT, BOTTOM, TOP
+        vertical = (code_c & (LEFT | RIGHT)) != 0
+        edge_x = np.where(code_c & LEFT, x_min, x_max)
+        edge_y = np.where(code_c & BOTTOM, y_min, y_max)
 
+        v = np.flatnonzero(vertical); h = np.flatnonzero(~vertical)
+        y_c[v] += (y_a[v] - y_b[v]) * (edge_x[v] - x_c[v]) / (x_a[v] - x_b[v]); x_c[v] = edge_x[v]
+        x_c[h] += (x_a[h] - x_b[h]) * (edge_y[h] - y_c[h]) / (y_a[h] - y_b[h]); y_c[h] = edge_y[h]
 
-    rectangle(x_min, x_max, y_min, y_max, image)
-    bresenham_line(((x_a, y_a), (x_b, y_b)), image)
-def liang_barsky_clipper(line : tuple[tuple[int, int], tuple[int, int]], x_min, x_max, y_min, y_max, image : Image):
+        # смещаем точку
+        moved_a = active[use_a]; moved_b = active[~use_a]
+        seg[moved_a, 0] = x_c[use_a]; seg[moved_a, 1] = y_c[use_a]
+        seg[moved_b, 2] = x_c[~use_a]; seg[moved_b, 3] = y_c[~use_a]
+        code_a[moved_a] = code(seg[moved_a, 0], seg[moved_a, 1])
+        code_b[moved_b] = code(seg[moved_b, 2], seg[moved_b, 3])
+    else:
+        # оставшиеся отрезки задевают угол прямоугольника с погрешностью округления
+        rest = ((code_a | code_b) != 0) & ((code_a & code_b) == 0)
+        seg[rest] = np.clip(seg[rest], [x_min, y_min, x_min, y_min], [x_max, y_max, x_max, y_max])
+        code_a[rest] = 0; code_b[rest] = 0
+
+    return (seg, (code_a | code_b) == 0)
+def liang_barsky_clipper(line : tuple[tuple[int, int], tuple[int, int]], x_min, x_max, y_min, y_max, image : Image, draw_window = True):
 # функция отсекает некоторый отрезок прямоугольником на растровой плоскость по алгоритму Лианга - Барски
 #
 # параметры:
@@ -280,393 +571,823 @@ def liang_barsky_clipper(line : tuple[tuple[int, int], tuple[int, int]], x_min,
 #   y_min - нижняя грань прямоугольника
 #   y_max - верхняя грань прямоугольника   
 #   image - растровая плоскость
+#   draw_window - рисовать ли сам прямоугольник
 #
-    # задание переменных
-    x_1 = line[0][0]
-    y_1 = line[0][1]
-    x_2 = line[1][0]
-    y_2 = line[1][1]
-
-
-    p_1 = - (x_2 - x_1)
-    p_2 = - p_1
-    p_3 = - (y_2 - y_1)
-    p_4 = - p_3
-
-    q_1 = x_1 - x_min
-    q_2 = x_max - x_1
-    q_3 = y_1 - y_min
-    q_4 = y_max - y_1
-
-    neg_arr = array.array('f'); neg_arr.append(0.0) # массив значений t для LEFT и BOTTOM (левой и нижней граней прямоугольника)
-    pos_arr = array.array('f'); pos_arr.append(1.0) # массив значений t для RIGHT и TOP (правой и верхней граней прямоугольника)
+    (clipped, visible, _, _) = liang_barsky_clip(np.array([[line[0][0], line[0][1], line[1][0], line[1][1]]]), x_min, x_max, y_min, y_max)
 
-    # если p_1 == 0 или p_3 == 0, то прямая параллельна вертикальным или горизонтальным сторонам прямоугольника соответственно
-    # в данном случае при q_i < 0 прямая проходит вне прямоугольника
-    if ((p_1 == 0 & (q_1 < 0 | q_2 < 0)) | (p_3 == 0 & (q_3 < 0 | q_4 < 0))):
-        return
-    
-    # при p_1 != 0 прямая не параллельна вертикальным сторонам, то есть будет их пересекать
-    if (p_1 != 0):
-        t_1 = q_1 / p_1
-        t_2 = q_2 / p_2
-
-        if (p_1 < 0):
-            neg_arr.append(t_1)
-            pos_arr.append(t_2)
-        else:
-            neg_arr.append(t_2)
-            pos_arr.append(t_1)
-
-    # при p_3 != 0 прямая не параллельна горизонтальным сторонам, то есть будет их пересекать
-    if (p_3 != 0):
-        t_3 = q_3 / p_3
-        t_4 = q_4 / p_4
+    if (draw_window):
+        rectangle(x_min, x_max, y_min, y_max, image)
+    bresenham_lines(clipped[visible], image)
+def liang_barsky_clip(segments : np.ndarray, x_min, x_max, y_min, y_max):
+# функция отсекает набор отрезков прямоугольником по алгоритму Лианга - Барски (без рисования)
+#
+# параметры:
+#   segments - массив (N, 4) отрезков в виде (x_1, y_1, x_2, y_2)
+#   x_min, x_max, y_min, y_max - границы прямоугольника
+#
+# возвращаемое значение - массив (N, 4) отсеченных отрезков, маска видимых отрезков visible
+# и параметры t_enter, t_exit видимой части отрезка p = p_1 + t * (p_2 - p_1) (все в float64)
+#
+    seg = np.array(segments, dtype = np.float64).reshape(-1, 4)
+    (x_1, y_1, x_2, y_2) = seg.T
 
-        if (p_3 < 0):
-            neg_arr.append(t_3)
-            pos_arr.append(t_4)
-        else:
-            neg_arr.append(t_4)
-            pos_arr.append(t_3)
+    # p_i - проекции отрезка на внешние нормали граней LEFT, RIGHT, BOTTOM, TOP, q_i - расстояния от точки 1 до граней
+    p = np.stack((x_1 - x_2, x_2 - x_1, y_1 - y_2, y_2 - y_1), axis = 1)
+    q = np.stack((x_1 - x_min, x_max - x_1, y_1 - y_min, y_max - y_1), axis = 1)
 
-    t_n_1 = max(neg_arr)
-    t_n_2 = min(pos_arr)
+    # при p_i == 0 отрезок параллелен грани, и при q_i < 0 он проходит вне прямоугольника
+    parallel_outside = ((p == 0) & (q < 0)).any(axis = 1)
 
-    if(t_n_1 > t_n_2):
-        return
+    # при p_i < 0 отрезок входит через грань i, при p_i > 0 - выходит
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        t = q / p
+    t_enter = np.maximum(np.where(p < 0, t, -np.inf).max(axis = 1), 0.0)
+    t_exit = np.minimum(np.where(p > 0, t, np.inf).min(axis = 1), 1.0)
 
-    x_n_1 = round(x_1 + t_n_1 * p_2)
-    y_n_1 = round(y_1 + t_n_1 * p_4)
+    visible = ~parallel_outside & (t_enter <= t_exit)
 
-    x_n_2 = round(x_1 + t_n_2 * p_2)
-    y_n_2 = round(y_1 + t_n_2 * p_4)
+    d = seg[:, 2:] - seg[:, :2]
+    clipped = np.hstack((seg[:, :2] + t_enter[:, None] * d, seg[:, :2] + t_exit[:, None] * d))
 
-    rectangle(x_min, x_max, y_min, y_max, image)
-    bresenham_line(((x_n_1, y_n_1), (x_n_2, y_n_2)), image)
-def cyrus_beck_clipper(line : tuple[tuple[int, int], tuple[int, int]], xy, image):
+    return (clipped, visible, t_enter, t_exit)
+def cyrus_beck_clipper(line : tuple[tuple[int, int], tuple[int, int]], xy, image, draw_window = True):
 # функция отсекает некоторый отрезок выпуклым многоугольником на растровой плоскость по алгоритму Кируса - Бека
 #
 # параметры:
 #   line в виде ((x_1, y_1), (x_2, y_2)) - отрезок
 #   xy - точки многоугольника в виде ((x_1, y_1), (x_2, y_2), ...)  
 #   image - растровая плоскость
+#   draw_window - рисовать ли сам многоугольник
 #
-    def dot(v_xy_1 : (int, int), v_xy_2 : (int, int)):
-    # вспомогательная функция вычисления скалярного произведения двух векторов
-    #
-    # параметры:
-    #  v_xy_i в виде (x_i, y_i) - вектор i
-    #
-        return v_xy_1[0] * v_xy_2[0] + v_xy_1[1] * v_xy_2[1]
-    def vec(line : tuple[tuple[int, int], tuple[int, int]]):
-    # вспомогательная функция вычисления нормализированного вектора по двум точкам
-    #
-    # параметры:
-    #   line в виде ((x_1, y_1), (x_2, y_2)) - отрезок
-    #
-        # задание переменных
-        x_1 = line[0][0]
-        y_1 = line[0][1]
-        x_2 = line[1][0]
-        y_2 = line[1][1]
-
-        return ((x_2 - x_1) / sqrt((x_1 - x_2) ** 2 + (y_2 - y_1) ** 2), (y_2 - y_1) / sqrt((x_2 - x_1) ** 2 + (y_2 - y_1) ** 2))
-    def nor(xy_1 : (int, int), xy_2 : (int, int), xy_0 : (int, int)):
-    # вспомогательная функция вычисления нормализированной нормали к отрезку, направленной в сторону точки xy_0
-    #
-    # параметры:
-    #   xy_i в виде (x_i, y_i) - точка i отрезка, i = {1, 2}
-    #   xy_0 в виде (x_0, y_0) - точка, в сторону которой ориентирована нормаль
-    #
-        v_xy = vec((xy_1, xy_2))
-        v_nor = (0, 0)
-        
-        if (v_xy[0] == 0):
-            v_nor = (1, 0)
-        elif (v_xy[1] == 0):
-            v_nor = (0, 1)
-        else:
-            # при x_2 = 1 :  y_2 = - (x_1/y_1) из уравнения x_1*x_2 + y_1*y_2 = 0
-            v_nor = (1, - v_xy[0]/v_xy[1])
-            v_nor = tuple(t / sqrt(1 + (- v_xy[0]/v_xy[1]) ** 2) for t in v_nor)
-        
-        v_nor = v_nor if dot(v_nor, vec((xy_1, xy_0))) > 0 else tuple(-t for t in v_nor)
-        
-        return v_nor
-    def is_point_right_to_vec(xy_1 : (int, int), xy_2 : (int, int), xy : (int, int)):
-    # вспомогательная функция, определяющая лежит ли точка правее луча
-    #
-    # параметры:
-    #   xy_i в виде (x_i, y_i) - точки луча, направленного след образом xy_1 -> xy_2
-    #   xy в виде (x, y) - точка
-    #
-        # D = (х - х1) * (у2 - у1) - (у - у1) * (х2 - х1)
-        D = (xy[0] - xy_1[0]) * (xy_2[1] - xy_1[1]) - (xy[1] - xy_1[1]) * (xy_2[0] - xy_1[0])
-
-        # если D = 0, то точка лежит на прямой
-        # если D > 0, то точка правее луча
-        # если D < 0, то точка левее луча
-        return True if (D > 0) else False
-    def line_cross_point(line_1 : tuple[tuple[int, int], tuple[int, int]] , line_2 : tuple[tuple[int, int], tuple[int, int]]):
-    # вспомогательная функция нахождения координаты пересечения двух непараллельных прямых
+    window = ConvexClipWindow(xy)
+    (clipped, visible, _, _) = window.clip(np.array([[line[0][0], line[0][1], line[1][0], line[1][1]]]))
+
+    if (draw_window):
+        window.draw(image)
+    bresenham_lines(clipped[visible], image)
+class ConvexClipWindow:
+# выпуклое окно отсечения для алгоритма Кируса - Бека
+# (нормали и смещения ребер вычисляются один раз, после чего окно отсекает любое число отрезков)
+#
+# параметры:
+#   xy - точки многоугольника в виде ((x_1, y_1), (x_2, y_2), ...) в любом порядке обхода
+#
+    def __init__(self, xy):
+        self.xy = np.array(xy, dtype = np.float64).reshape(-1, 2)
+
+        # упорядочиваю вершины против часовой стрелки (удвоенная ориентированная площадь должна быть > 0)
+        edges = self.xy - np.roll(self.xy, 1, axis = 0)
+        area = np.sum(np.roll(self.xy, 1, axis = 0)[:, 0] * self.xy[:, 1] - self.xy[:, 0] * np.roll(self.xy, 1, axis = 0)[:, 1])
+        if (area == 0):
+            raise ValueError("clip window is degenerate")
+        if (area < 0):
+            self.xy = self.xy[::-1].copy()
+            edges = self.xy - np.roll(self.xy, 1, axis = 0)
+
+        # при обходе против часовой стрелки все повороты между соседними ребрами - левые
+        turns = edges[:, 0] * np.roll(edges, -1, axis = 0)[:, 1] - edges[:, 1] * np.roll(edges, -1, axis = 0)[:, 0]
+        if ((turns < 0).any()):
+            raise ValueError("clip window is not convex")
+
+        # ребро i идет от вершины i - 1 к вершине i; нормаль (-e_y, e_x) направлена внутрь,
+        # и точка p лежит внутри полуплоскости ребра, если normals[i] . p >= offsets[i]
+        self.normals = np.stack((-edges[:, 1], edges[:, 0]), axis = 1)
+        self.offsets = np.einsum('ij,ij->i', self.normals, self.xy)
+
+    def clip(self, segments : np.ndarray):
+    # функция отсекает набор отрезков окном (без рисования)
     #
     # параметры:
-    #   line_i в виде ((x_1, y_1), (x_2, y_2)) - линия i, которая строится по двум точкам
-    #
-        # найду уравнения прямых вида y = kx + b
-        # k = (y_2 - y_1) / (x_2 - x_1)
-        k_1 = (line_1[1][1] - line_1[0][1]) / (line_1[1][0] - line_1[0][0])
-        k_2 = (line_2[1][1] - line_2[0][1]) / (line_2[1][0] - line_2[0][0])
-        # b = y - kx (подставляю первую точку)
-        b_1 = line_1[0][1] - k_1 * line_1[0][0]
-        b_2 = line_2[0][1] - k_2 * line_2[0][0]
-
-
-        # из y = kx + b получаю k_1*x + b_1 = k_2*x + b_2
-        x = (b_2 - b_1) / (k_1 - k_2)
-        y = k_1 * x + b_1
-
-        return (x, y)
-    def center_point_polygon(xy):
-    # вспомогательная функция нахождания геометрического центра многоугольника
+    #   segments - массив (N, 4) отрезков в виде (x_1, y_1, x_2, y_2)
     #
-    # параметры:
-    #   xy - точки многоугольника в виде ((x_1, y_1), (x_2, y_2), ...)
+    # возвращаемое значение - массив (N, 4) отсеченных отрезков, маска видимых отрезков visible
+    # и параметры t_enter, t_exit видимой части отрезка p = p_1 + t * (p_2 - p_1)
     #
-        xy_c = [0, 0]
-
-        for i in range(len(xy)):
-            xy_c[0] += xy[i][0]
-            xy_c[1] += xy[i][1]
-        xy_c = (xy_c[0]/len(xy), xy_c[1]/len(xy))
-
-        return xy_c
-    
-    # задание переменных
-    x_1 = line[0][0]
-    y_1 = line[0][1]
-    x_2 = line[1][0]
-    y_2 = line[1][1]
-
-    # изначальные параметры отрезка в параметрическом виде p = p_0 + t * dp
-    t_1 = 0; t_2 = 1
-    p_0_x = x_1
-    p_0_y = y_1
-    dp_x = x_2 - x_1
-    dp_y = y_2 - y_1
-
-    # нахожу геометрический центр многоугольника
-    xy_c = center_point_polygon(xy)
-
-    # нахожу вектор v_xy по исходному отрезку
-    v_xy = vec(line)
-
-
-    # упорядочиваю вершины против часовой стрелки
-    if(is_point_right_to_vec((xy[0][0], xy[0][1]), (xy[1][0], xy[1][1]), xy_c)):
-        xy = xy[::-1]
-
-    # обхожу многоугольник против часовой стрелки
-    for i in range(len(xy)):
-
-        # нахожу нормаль n_edge ребра, ориентированную вовнутрь
-        # и скалярное произведение v_dot
-        n_edge = nor((xy[i - 1][0], xy[i - 1][1]), (xy[i][0], xy[i][1]), xy_c)
-        v_dot = dot(v_xy, n_edge)
-
-        # если v_dot == 0, то отрезок параллелен стороне многоугольника
-        if (v_dot == 0):
-            # если любая точка отрезка лежит правее ребра, то отрезок невиден
-            if (is_point_right_to_vec((xy[i - 1][0], xy[i - 1][1]), (xy[i][0], xy[i][1]), (xy_1[0], xy_1[1]))):
-                return
-
-        # если v_dot < 0, то отрезок направлен с внутренней на внешнюю сторону ребра
-        elif (v_dot < 0):
-            # найду пересечение отрезка и ребра
-            (x, y) = line_cross_point(line, ((xy[i - 1][0], xy[i - 1][1]), (xy[i][0], xy[i][1])))
-            # t = (x - x_1) / (x_2 - x_1)
-            t = (x - p_0_x) / dp_x
-
-            # изменяю конец отрека, если t < t_2
-            if (t < t_2):
-                t_2 = t
-
-        # если v_dot > 0, то отрезок направлен с внешней на внутреннюю сторону ребра
-        elif (v_dot > 0):
-            # найду пересечение отрезка и ребра
-            (x, y) = line_cross_point(line, ((xy[i - 1][0], xy[i - 1][1]), (xy[i][0], xy[i][1])))
-            # t = (x - x_1) / (x_2 - x_1)
-            t = (x - p_0_x) / dp_x
-
-            
-            # изменяю начало отрека, если t > t_1
-            if (t > t_1):
-                t_1 = t
-
-    # если t_1 < t_2, то отрезок видим; иначе отбрасываем
-    if (t_1 < t_2):
-        polygon(xy, image)
-        bresenham_line(((round(p_0_x + t_1 * dp_x), round(p_0_y + t_1 * dp_y)), (round(p_0_x + t_2 * dp_x), round(p_0_y + t_2 * dp_y))), image)
-def sobel_filter(image_path, new_image_path):
+        seg = np.array(segments, dtype = np.float64).reshape(-1, 4)
+        p_1 = seg[:, :2]
+        d = seg[:, 2:] - p_1
+
+        # для точки p_1 + t * d и ребра i: normals[i] . p - offsets[i] = w + t * v
+        w = p_1 @ self.normals.T - self.offsets
+        v = d @ self.normals.T
+
+        # при v == 0 отрезок параллелен ребру (или вырожден в точку) и невиден, если лежит снаружи
+        parallel_outside = ((v == 0) & (w < 0)).any(axis = 1)
+
+        # при v > 0 отрезок входит в полуплоскость ребра, при v < 0 - выходит из нее
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            t = -w / v
+        t_enter = np.maximum(np.where(v > 0, t, -np.inf).max(axis = 1), 0.0)
+        t_exit = np.minimum(np.where(v < 0, t, np.inf).min(axis = 1), 1.0)
+
+        visible = ~parallel_outside & (t_enter <= t_exit)
+        clipped = np.hstack((p_1 + t_enter[:, None] * d, p_1 + t_exit[:, None] * d))
+
+        return (clipped, visible, t_enter, t_exit)
+    def draw(self, image : Image, color = 255):
+    # функция рисует окно на растровой плоскости
+        bresenham_lines(np.hstack((np.roll(self.xy, 1, axis = 0), self.xy)), image, color)
+def sobel_filter(image_path, new_image_path, normalize = False, show = True):
 # функция обрабатывает изображение с помощью фильтра Собеля (выделяет его контуры)
 #
 # параметры:
 #   image_path - путь до изображения
-#   new_image_path - путь до нового изображения
+#   new_image_path - путь до нового изображения (полутонового, режим 'L')
+#   normalize - масштабировать градиент так, чтобы максимум стал равен 255 (иначе значения обрезаются до 255)
+#   show - показать результат (для пакетной обработки без дисплея передается False)
 #
-    def sobel_operator(xy : tuple[int, int], image : Image):
-    # вспомогательная функция, вычисляющая значения оператора Собеля в точке
-    #
-    # параметры:
-    #   xy в виде (x, y) - точка 
-    #   image - изображение
-        x = xy[0]
-        y = xy[1]
-
-        # Вычисляем значения яркости пикселей в 3x3 окрестности точки с координатами (x,y)
-        z1 = mean(image.getpixel((x-1,y-1)))
-        
-        z2 = mean(image.getpixel((x,y-1)))
-        z3 = mean(image.getpixel((x+1,y-1)))
-        z4 = mean(image.getpixel((x-1,y)))
-        #z5 = mean(image.getpixel((x,y)))
-        z6 = mean(image.getpixel((x+1,y)))
-        z7 = mean(image.getpixel((x-1,y+1)))
-        z8 = mean(image.getpixel((x,y+1)))
-        z9 = mean(image.getpixel((x+1,y+1)))
-
-        # Вычисляем значения частных производных
-        G_x = z7 + 2*z8 + z9 - (z1 + 2*z2 + z3)
-        G_y = z3 + 2*z6 + z9 - (z1 + 2*z4 + z7)
-
-        # Возвращаем значение градиента в точке с координатами (x,y)
-        return sqrt(G_x ** 2 + G_y ** 2)
-
-    image = Image.open(image_path)
-    new_image = Image.new('RGB', (image.size[0], image.size[1]))
-
-    for x in range(1, image.size[0] - 1):
-        for y in range(1, image.size[1] - 1):
-            new_image.putpixel((x, y), round(sobel_operator((x, y), image)))
+    with Image.open(image_path) as image:
+        pixels = np.asarray(image)
+
+    new_image = Image.fromarray(sobel_array(pixels, normalize), 'L')
     new_image.save(new_image_path)
-    new_image.show()
+    if (show):
+        new_image.show()
+def sobel_array(pixels : np.ndarray, normalize = False):
+# функция вычисляет контуры изображения, заданного массивом (h, w) или (h, w, c), фильтром Собеля
+#
+# параметры:
+#   pixels - массив пикселей изображения
+#   normalize - масштабировать градиент так, чтобы максимум стал равен 255 (иначе значения обрезаются до 255)
+#
+# возвращаемое значение - массив (h, w) uint8 модуля градиента (крайние строки и столбцы равны 0)
+#
+    result = np.zeros(pixels.shape[:2], np.uint8)
+    if (min(pixels.shape[:2]) < 3):
+        return result
+
+    gradient = _sobel_operator(_luminance(pixels))
+    if (normalize and gradient.max() > 0):
+        gradient *= 255 / gradient.max()
+
+    result[1:-1, 1:-1] = np.clip(np.rint(gradient), 0, 255)
+    return result
+def sobel_filter_tiled(image_path, new_image_path, tile = 2048, workers = None):
+# функция обрабатывает большое изображение фильтром Собеля по плиткам на нескольких процессах
+# (результат побитово совпадает с sobel_filter без нормализации)
+#
+# каждая плитка читается с полем в 1 пиксель и пишется в отображаемый в память выходной массив,
+# поэтому расход памяти пропорционален размеру плитки и числу процессов, а не размеру изображения;
+# входные .npy и двоичные .pgm / .ppm отображаются в память напрямую, остальные форматы
+# предварительно декодируются один раз во временный .npy
+#
+# параметры:
+#   image_path - путь до изображения
+#   new_image_path - путь до нового изображения (.npy и .pgm пишутся напрямую, остальные форматы - по завершении)
+#   tile - размер стороны плитки
+#   workers - число процессов (по умолчанию - число ядер, 1 - без пула процессов)
+#
+    directory = os.path.dirname(os.path.abspath(new_image_path))
+    temporary = []
+
+    try:
+        source = image_path
+        if (_open_pixels(image_path) is None):
+            # формат нельзя отобразить в память: декодирую изображение один раз
+            with Image.open(image_path) as image:
+                pixels = np.asarray(image)
+            (fd, source) = tempfile.mkstemp(suffix = '.npy', dir = directory); os.close(fd)
+            temporary.append(source)
+            np.save(source, pixels)
+            del pixels
+
+        shape = _open_pixels(source).shape[:2]
+
+        extension = os.path.splitext(new_image_path)[1].lower()
+        if (extension in ('.npy', '.pgm')):
+            target = new_image_path
+        else:
+            (fd, target) = tempfile.mkstemp(suffix = '.npy', dir = directory); os.close(fd)
+            temporary.append(target)
+        _create_pixels(target, shape)
+
+        boxes = [(y, x, min(y + tile, shape[0]), min(x + tile, shape[1])) for y in range(0, shape[0], tile) for x in range(0, shape[1], tile)]
+        workers = workers or os.cpu_count()
+
+        if (workers == 1):
+            for box in boxes:
+                _sobel_tile(source, target, box)
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                for _ in pool.map(_sobel_tile, repeat(source), repeat(target), boxes):
+                    pass
+
+        if (target != new_image_path):
+            Image.fromarray(np.asarray(_open_pixels(target)), 'L').save(new_image_path)
+    finally:
+        _pixels_cache.clear()
+        for path in temporary:
+            os.remove(path)
+def sobel_filter_stream(image_path, new_image_path):
+# функция обрабатывает изображение фильтром Собеля построчно, не загружая его целиком
+# (результат побитово совпадает с sobel_filter без нормализации)
+#
+# двоичные .pgm / .ppm читаются полосой из трех строк, а результат в формате .pgm пишется
+# по мере готовности строк, поэтому расход памяти - O(ширины изображения); изображения
+# других форматов декодируются целиком, а результат в других форматах сохраняется по завершении
+#
+# параметры:
+#   image_path - путь до изображения или двоичный файловый объект (например, sys.stdin.buffer) с .pgm / .ppm
+#   new_image_path - путь до нового изображения или двоичный файловый объект, в который пишется .pgm
+#
+    source = open(image_path, 'rb') if isinstance(image_path, (str, os.PathLike)) else image_path
+
+    try:
+        header = _netpbm_header(source)
+        if (header is None):
+            # формат без построчного чтения
+            if (source is image_path and not source.seekable()):
+                raise ValueError("only binary .pgm / .ppm can be streamed from a pipe")
+            source.seek(0)
+            with Image.open(source) as image:
+                pixels = np.asarray(image)
+            (w, h) = (pixels.shape[1], pixels.shape[0])
+            rows = iter(pixels)
+        else:
+            (channels, w, h, _) = header
+            rows = _netpbm_rows(source, channels, w, h)
+
+        output = new_image_path if not isinstance(new_image_path, (str, os.PathLike)) else None
+        if (output is None and not str(new_image_path).lower().endswith('.pgm')):
+            Image.fromarray(np.array(list(sobel_rows(rows)), np.uint8).reshape(h, w), 'L').save(new_image_path)
+            return
+
+        target = output if output is not None else open(new_image_path, 'wb')
+        try:
+            target.write(b'P5\n%d %d\n255\n' % (w, h))
+            for row in sobel_rows(rows):
+                target.write(row.tobytes())
+            target.flush()
+        finally:
+            if (target is not output):
+                target.close()
+    finally:
+        if (source is not image_path):
+            source.close()
+def sobel_rows(rows):
+# генератор, обрабатывающий изображение фильтром Собеля построчно
+# (в памяти хранятся только три последние строки яркости)
+#
+# параметры:
+#   rows - итерируемая последовательность строк изображения, массивов (w,) или (w, c)
+#
+# возвращаемое значение - строки результата, массивы (w,) uint8; строка y выдается сразу после чтения строки y + 1
+#
+    band = []
+    for row in rows:
+        band.append(_luminance(np.asarray(row)[None])[0])
+
+        if (len(band) == 1):
+            # первая строка изображения всегда равна 0
+            yield np.zeros(band[0].size, np.uint8)
+        elif (len(band) == 3):
+            result = np.zeros(band[1].size, np.uint8)
+            if (result.size >= 3):
+                result[1:-1] = np.clip(np.rint(_sobel_operator(np.stack(band))[0]), 0, 255)
+            yield result
+            band.pop(0)
+
+    # последняя строка изображения всегда равна 0
+    if (len(band) > 1):
+        yield np.zeros(band[-1].size, np.uint8)
+def _netpbm_rows(file, channels, w, h):
+# генератор, читающий строки двоичного .pgm / .ppm (файл позиционирован на начало данных)
+    for _ in range(h):
+        data = file.read(w * channels)
+        if (len(data) < w * channels):
+            raise ValueError("unexpected end of image data")
+        yield np.frombuffer(data, np.uint8).reshape((w, channels) if channels > 1 else (w,))
+def _sobel_tile(source, target, box : tuple[int, int, int, int]):
+# вспомогательная функция, обрабатывающая одну плитку (y_0, x_0, y_1, x_1) фильтром Собеля
+#
+    (y_0, x_0, y_1, x_1) = box
+    pixels = _open_pixels(source)
+    result = _open_pixels(target, 'r+')
+    (h, w) = pixels.shape[:2]
+
+    # плитка читается с полем в 1 пиксель; крайние строки и столбцы изображения остаются равными 0
+    (r_y, r_x) = (max(y_0 - 1, 0), max(x_0 - 1, 0))
+    gradient = _sobel_operator(_luminance(pixels[r_y : min(y_1 + 1, h), r_x : min(x_1 + 1, w)]))
+
+    (o_y, o_x) = (max(y_0, 1), max(x_0, 1))
+    (e_y, e_x) = (min(y_1, h - 1), min(x_1, w - 1))
+    if (o_y < e_y and o_x < e_x):
+        part = gradient[o_y - r_y - 1 : e_y - r_y - 1, o_x - r_x - 1 : e_x - r_x - 1]
+        result[o_y : e_y, o_x : e_x] = np.clip(np.rint(part), 0, 255)
+_pixels_cache = {}
+def _open_pixels(path, mode = 'r'):
+# вспомогательная функция, отображающая в память массив пикселей файла .npy или двоичного .pgm / .ppm
+# (отображения кэшируются внутри процесса)
+#
+# возвращаемое значение - массив (h, w) или (h, w, c) либо None, если формат не поддерживается
+#
+    key = (os.path.abspath(path), mode)
+    if (key not in _pixels_cache):
+        extension = os.path.splitext(path)[1].lower()
+        if (extension == '.npy'):
+            _pixels_cache[key] = np.load(path, mmap_mode = mode)
+        elif (extension in ('.pgm', '.ppm')):
+            with open(path, 'rb') as file:
+                header = _netpbm_header(file)
+            if (header is None):
+                return None
+            (channels, w, h, offset) = header
+            shape = (h, w) if channels == 1 else (h, w, channels)
+            _pixels_cache[key] = np.memmap(path, np.uint8, mode, offset, shape)
+        else:
+            return None
+    return _pixels_cache[key]
+def _create_pixels(path, shape : tuple[int, int]):
+# вспомогательная функция, создающая заполненный нулями полутоновый файл .npy или .pgm заданного размера
+    if (path.lower().endswith('.npy')):
+        np.lib.format.open_memmap(path, 'w+', np.uint8, shape).flush()
+    else:
+        with open(path, 'wb') as file:
+            file.write(b'P5\n%d %d\n255\n' % (shape[1], shape[0]))
+            file.truncate(file.tell() + shape[0] * shape[1])
+    _pixels_cache.pop((os.path.abspath(path), 'r+'), None)
+def _netpbm_header(file):
+# вспомогательная функция, читающая заголовок двоичного файла .pgm (P5) или .ppm (P6) с глубиной 8 бит
+#
+# возвращаемое значение - (число каналов, ширина, высота, смещение данных) или None;
+# после вызова файл позиционирован на начало данных
+#
+    magic = file.read(2)
+    if (magic not in (b'P5', b'P6')):
+        return None
+
+    # ширина, высота и максимальное значение, разделенные пробелами (возможны комментарии #)
+    fields = []
+    while (len(fields) < 3):
+        c = file.read(1)
+        if (c == b'#'):
+            file.readline()
+        elif (c.isdigit()):
+            token = c
+            while (True):
+                c = file.read(1)
+                if (not c.isdigit()):
+                    break
+                token += c
+            fields.append(int(token))
+        elif (c == b''):
+            return None
+
+    if (fields[2] > 255):
+        return None
+    return (1 if magic == b'P5' else 3, fields[0], fields[1], file.tell())
+def _luminance(pixels : np.ndarray):
+# вспомогательная функция, вычисляющая яркость пикселей как среднее цветовых каналов (альфа-канал не учитывается)
+    pixels = np.asarray(pixels)
+    if (pixels.ndim == 2):
+        return pixels.astype(np.float64)
+    return pixels[..., :3].mean(axis = 2, dtype = np.float64)
+def _sobel_operator(z : np.ndarray):
+# вспомогательная функция, вычисляющая значения оператора Собеля во внутренних точках массива яркостей
+#
+# в окрестности 3x3 точки (x, y)
+#   z1 z2 z3
+#   z4 z5 z6
+#   z7 z8 z9
+# G_x = z7 + 2*z8 + z9 - (z1 + 2*z2 + z3), G_y = z3 + 2*z6 + z9 - (z1 + 2*z4 + z7);
+# оба ядра сепарабельны: сглаживание [1 2 1] вдоль одной оси и разность [-1 0 1] вдоль другой
+#
+# возвращаемое значение - массив (h - 2, w - 2) модуля градиента sqrt(G_x^2 + G_y^2)
+#
+    smooth_x = z[:, :-2] + 2 * z[:, 1:-1] + z[:, 2:]
+    smooth_y = z[:-2] + 2 * z[1:-1] + z[2:]
+
+    G_x = smooth_x[2:] - smooth_x[:-2]
+    G_y = smooth_y[:, 2:] - smooth_y[:, :-2]
+
+    return np.hypot(G_x, G_y)
 def line_fill(image : Image, new_image_path, start_point : tuple[int, int], color):
 # функция заливки произвольной области: заливает произвольную одноцветную область начиная с точки start_point
 # (алгоритм определяет границы заливки как любой цвет, отличный от исходного цвета стартовой точки)
 #
 # параметры:
-#   image - растровая плоскость
-#   new_image_path - путь до нового изображения
+#   image - растровая плоскость (не изменяется)
+#   new_image_path - путь до нового изображения или None, если сохранять результат не нужно
 #   start_point в виде (x, y) - затравочная точка
+#   color - цвет заливки (в значениях пикселей режима изображения, например номер цвета палитры для 'P')
+#
+# возвращаемое значение - всегда новое изображение Image того же режима, что и image, с залитой областью
+# (для FrameBuffer - режима плоскости, для Image любого режима PIL, включая 'P', '1', 'LA', - с той же палитрой)
+#
+    data = image.data.copy() if isinstance(image, FrameBuffer) else np.array(image)
+    span_fill(data, start_point, color)
+
+    if (image.mode == '1'):
+        new_image = Image.fromarray(data)
+    else:
+        new_image = Image.frombytes(image.mode, image.size, data.tobytes())
+    if (not isinstance(image, FrameBuffer)):
+        if (image.palette is not None):
+            new_image.putpalette(image.getpalette())
+        new_image.info.update(image.info)
+
+    if (new_image_path is not None):
+        new_image.save(new_image_path)
+    return new_image
+def span_fill(data : np.ndarray, start_point : tuple[int, int], color):
+# функция нерекурсивной заливки отрезками с затравкой на массиве пикселей (заливка выполняется на месте)
+#
+# все отрезки строк, имеющие цвет затравки, находятся заранее одним векторным сравнением по всему массиву;
+# вместо рекурсии используется явный стек: элемент стека - строка y и отрезки [left, right] соседней строки,
+# из которых в нее пришла заливка, отрезки строки y, пересекающиеся с ними, находятся двоичным поиском;
+# сами пиксели закрашиваются одной векторной записью в конце
+#
+# параметры:
+#   data - массив пикселей (h, w) или (h, w, c)
+#   start_point в виде (x, y) - затравочная точка (должна лежать на плоскости)
 #   color - цвет заливки
 #
-    def fill(left_x, right_x, y, image, start_pixel_value, color):
-    # рекурсивная функция, заливающая линию
+# возвращаемое значение - число залитых пикселей
+#
+    (h, w) = data.shape[:2]
+    (x_0, y_0) = start_point
+    if (not (0 <= x_0 < w and 0 <= y_0 < h)):
+        raise ValueError(f"start point {tuple(start_point)} is outside the {w}x{h} plane")
+    start_pixel_value = data[y_0, x_0].copy()
+    color = np.asarray(_pixel_colors(color, 1 if data.ndim == 2 else data.shape[2], 1)[0], data.dtype)
+
+    # если цвет стартового пикселя уже color, то заливка не требуется
+    if (np.array_equal(start_pixel_value, color.reshape(start_pixel_value.shape))):
+        return 0
+
+    # отрезки цвета затравки: начала и концы (включительно) в индексах развернутого массива (h, w + 1)
+    same = np.zeros((h, w + 1), bool)
+    same[:, :w] = data == start_pixel_value if data.ndim == 2 else (data == start_pixel_value).all(axis = 2)
+    same = same.ravel()
+    edges = np.diff(same.view(np.int8), prepend = 0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    del same, edges
+
+    row = starts // (w + 1)
+    (starts, ends) = (starts - row * (w + 1), ends - row * (w + 1))
+    first = np.searchsorted(row, np.arange(h + 1))
+    done = np.zeros(starts.size, bool)
+
+    found = []
+    stack = [(y_0, np.array([x_0]), np.array([x_0]))]
+    while (stack):
+        (y, left, right) = stack.pop()
+        (r_0, r_1) = (first[y], first[y + 1])
+        j_lo = np.searchsorted(ends[r_0:r_1], left) + r_0
+        j_hi = np.searchsorted(starts[r_0:r_1], right, 'right') + r_0
+
+        # номера отрезков строки, пересекающихся хотя бы с одним из пришедших
+        if (left.size == 1):
+            ids = np.arange(j_lo[0], j_hi[0])
+        else:
+            count = np.maximum(j_hi - j_lo, 0)
+            ids = np.unique(np.repeat(j_lo - np.cumsum(count) + count, count) + np.arange(count.sum()))
+        ids = ids[~done[ids]]
+        if (ids.size == 0):
+            continue
+        done[ids] = True
+        found.append(ids)
+
+        if (y > 0):
+            stack.append((y - 1, starts[ids], ends[ids]))
+        if (y + 1 < h):
+            stack.append((y + 1, starts[ids], ends[ids]))
+
+    ids = np.concatenate(found)
+    (rows, s, e) = (row[ids], starts[ids], ends[ids])
+    mark = np.zeros(h * (w + 1) + 1, np.int8)
+    mark[rows * (w + 1) + s] = 1
+    mark[rows * (w + 1) + e + 1] = -1
+    span = np.cumsum(mark[:-1], dtype = np.int8).view(bool).reshape(h, w + 1)[:, :w]
+    data[span] = color
+
+    return int((e - s + 1).sum())
+def bitmask_fill(image : Image, new_image_path, bitmask : Image, color):
+# функция заливки произвольной замкнутой фигуры, представленной битовой маской
+#
+# внутренность фигуры - белые пиксели маски, не связанные (по 4 соседям) с краем маски;
+# находится разметкой связных областей маски без попиксельных циклов, за время, линейное по числу пикселей
+#
+# параметры:
+#   image - растровая плоскость (не изменяется)
+#   new_image_path - путь до нового изображения или None, если сохранять результат не нужно
+#   bitmask - битовая маска (представляет собой картинку с любой замкнутой фигурой, цвет фона - белый, границы фигуры - черный),
+#             массив (h, w) или набор масок: список или массив (n, h, w) - маски заливаются по порядку
+#   color - цвет заливки или список цветов для набора масок
+#
+# возвращаемое значение - новая растровая плоскость FrameBuffer с залитыми фигурами
+#
+    new_image = image.copy() if isinstance(image, FrameBuffer) else FrameBuffer.from_image(image)
+
+    single = isinstance(bitmask, (Image.Image, FrameBuffer)) or np.ndim(bitmask) == 2
+    masks = bitmask_interior([bitmask] if single else bitmask)
+    if (masks.shape[1:] != new_image.data.shape[:2]):
+        raise ValueError('bitmask size does not match the image size')
+    colors = [color] if single or isinstance(color, (int, np.integer)) else list(color)
+    if (len(colors) == 1):
+        colors *= len(masks)
+
+    for (mask, color) in zip(masks, colors):
+        new_image.data[mask] = _pixel_colors(color, new_image.data.shape[2] if new_image.data.ndim == 3 else 1, 1)[0]
+
+    if (new_image_path is not None):
+        new_image.save(new_image_path)
+    return new_image
+def bitmask_interior(bitmasks):
+# функция нахождения внутренности замкнутых фигур для набора битовых масок
+#
+# маски одного размера обрабатываются одной разметкой: каждая маска обрамляется белой рамкой в 1 пиксель,
+# и маски ставятся друг под другом - внешние области всех масок сливаются в одну область с рамкой,
+# а все остальные белые области являются внутренностями фигур
+#
+# параметры:
+#   bitmasks - набор масок: список изображений, FrameBuffer или массивов (h, w), либо массив (n, h, w)
+#
+# возвращаемое значение - массив bool (n, h, w), True - внутренние пиксели фигур
+#
+    white = []
+    for mask in bitmasks:
+        if (isinstance(mask, Image.Image)):
+            mask = np.asarray(mask.convert('L'))
+        elif (isinstance(mask, FrameBuffer)):
+            mask = mask.data if mask.data.ndim == 2 else mask.data[..., :3].min(axis = 2)
+        mask = np.asarray(mask)
+        white.append(mask if mask.dtype == bool else mask > 127)
+    if (len({mask.shape for mask in white}) > 1):
+        raise ValueError('bitmasks must have the same size')
+
+    (h, w) = white[0].shape
+    framed = np.ones((len(white), h + 2, w + 2), bool)
+    framed[:, 1:-1, 1:-1] = white
+    labels = label_regions(framed.reshape(-1, w + 2))[0].reshape(framed.shape)
+
+    return (framed & (labels != labels[0, 0, 0]))[:, 1:-1, 1:-1]
+def label_regions(values : np.ndarray):
+# функция разметки связных (по 4 соседям) областей одного цвета
+#
+# пиксели строк объединяются в отрезки одного цвета, отрезки соседних строк одного цвета,
+# пересекающиеся по x, связываются, и связные компоненты графа отрезков находятся векторным
+# подвешиванием корней к меньшему корню со сжатием путей (число проходов - логарифмическое)
+#
+# параметры:
+#   values - массив (h, w) или (h, w, c) цветов пикселей
+#
+# возвращаемое значение - (labels, count): массив (h, w) int32 номеров областей от 0 до count - 1
+# (номера возрастают в порядке первого пикселя области при обходе по строкам)
+#
+    values = _packed_values(values)
+    (h, w) = values.shape
+    flat = values.ravel()
+    if (flat.size == 0):
+        return (np.zeros((h, w), np.int32), 0)
+
+    # отрезки одного цвета: каждая строка начинает новый отрезок, отрезки не переходят через край строки
+    change = np.ones((h, w), bool)
+    change[:, 1:] = values[:, 1:] != values[:, :-1]
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], flat.size) - 1
+
+    # пары пересекающихся отрезков строк y и y + 1 (в развернутом массиве следующая строка сдвинута на w)
+    lo = np.searchsorted(ends, starts + w)
+    hi = np.searchsorted(starts, ends + w, 'right')
+    count = np.maximum(hi - lo, 0)
+    a = np.repeat(np.arange(starts.size), count)
+    b = np.repeat(lo - np.cumsum(count) + count, count) + np.arange(count.sum())
+    same = flat[starts[a]] == flat[starts[b]]
+    (a, b) = (a[same], b[same])
+
+    parent = _merge_roots(np.arange(starts.size), a, b)
+    (roots, run_labels) = np.unique(parent, return_inverse = True)
+    labels = np.repeat(run_labels.astype(np.int32), ends - starts + 1).reshape(h, w)
+    return (labels, roots.size)
+def _packed_values(values : np.ndarray):
+# многоканальные пиксели (h, w, c) упаковываются в одно значение, чтобы сравнивать цвета одной операцией
+    values = np.asarray(values)
+    if (values.ndim == 3):
+        values = np.ascontiguousarray(values).view(np.dtype((np.void, values.dtype.itemsize * values.shape[2])))[..., 0]
+    return values
+def _merge_roots(parent : np.ndarray, a : np.ndarray, b : np.ndarray):
+# объединение множеств по парам (a, b): больший корень подвешивается к меньшему, пути сжимаются до корней
+# (на выходе parent[i] - наименьший элемент множества i)
+    while (a.size):
+        (root_a, root_b) = (parent[a], parent[b])
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while (True):
+            jumped = parent[parent]
+            if (np.array_equal(jumped, parent)):
+                break
+            parent = jumped
+        keep = parent[a] != parent[b]
+        (a, b) = (a[keep], b[keep])
+    return parent
+
+class RegionIndex:
+# разметка растровой плоскости на связные (по 4 соседям) области одного цвета для многократной заливки
+#
+# параметры:
+#   image - растровая плоскость FrameBuffer
+#
+# разметка строится один раз, заливка любого числа затравок - поиск номеров областей и одна векторная запись;
+# после заливки разметка не перестраивается: залитые области объединяются только с соседними областями нового цвета
+# (обычно разметка берется из кэша плоскости методом FrameBuffer.regions)
+#
+    def __init__(self, image : FrameBuffer):
+        self.image = image
+        (self.labels, self.count) = label_regions(image.data)
+        self.version = image.version
+        self._size = self.count
+
+    def label(self, xy : tuple[int, int]):
+        return int(self._seed_labels(xy)[0])
+    def mask(self, seeds):
+    # маска (h, w) пикселей областей, содержащих затравочные точки seeds (массив (n, 2) точек (x, y))
+        hit = np.zeros(self._size, bool)
+        hit[self._seed_labels(seeds)] = True
+        return hit[self.labels]
+    def _seed_labels(self, seeds):
+    # номера областей затравочных точек (точки за пределами плоскости не допускаются)
+        seeds = np.asarray(seeds).reshape(-1, 2)
+        (h, w) = self.labels.shape
+        outside = (seeds[:, 0] < 0) | (seeds[:, 0] >= w) | (seeds[:, 1] < 0) | (seeds[:, 1] >= h)
+        if (outside.any()):
+            raise ValueError(f"seed {tuple(seeds[outside][0].tolist())} is outside the {w}x{h} plane")
+        return self.labels[seeds[:, 1], seeds[:, 0]]
+
+    def fill(self, seeds, color):
+    # функция заливки областей, содержащих затравочные точки
     #
     # параметры:
+    #   seeds - массив (n, 2) затравочных точек (x, y) на плоскости, все области определяются по плоскости до заливки
+    #   color - цвет заливки или массив цветов для каждой затравки (при нескольких затравках в одной области берется последняя)
     #
-    #   left_x, right_x - левая и правая границы заливки соответственно (включая их)
-    #   y - ордината прямой заливки
-    #   start_point_value - значение пикселей, которые надо залить
-    #   color - цвет заливки
+    # возвращаемое значение - число залитых пикселей
     #
-        bresenham_line(((left_x, y), (right_x, y)), image, color)
-        
-        # top
-        if (y + 1 < image.size[1]):
-            l_x = 0
-            for i in range(left_x, 0, -1):
-                if (image.getpixel((i, y + 1)) != start_pixel_value):
-                    l_x = i + 1
-                    break
-            if (l_x < left_x):
-                fill(l_x, left_x, y + 1, image, start_pixel_value, color)
-            
-            r_x = image.size[0] - 1
-            for i in range(right_x, image.size[0]):
-                if (image.getpixel((i, y + 1)) != start_pixel_value):
-                    r_x = i - 1
-                    break
-            if (r_x > right_x):
-                fill(right_x, r_x, y + 1, image, start_pixel_value, color)
-
-            for i in range(left_x, right_x + 1):
-                if (image.getpixel((i, y + 1)) == start_pixel_value):
-                    l_x = i
-                    while (image.getpixel((i, y + 1)) == start_pixel_value):
-                        r_x = i
-                        i += 1
-
-                        if (i > right_x):
-                            break
-
-                    fill(l_x, r_x, y + 1, image, start_pixel_value, color)
-        # bot
-        if (y > 0):
-            
-            l_x = 0
-            for i in range(left_x, 0, -1):
-                if (image.getpixel((i, y - 1)) != start_pixel_value):
-                    l_x = i + 1
-                    break
-            if (l_x < left_x):
-                fill(l_x, left_x, y - 1, image, start_pixel_value, color)
-            
-            r_x = image.size[0] - 1
-            for i in range(right_x, image.size[0]):
-                if (image.getpixel((i, y - 1)) != start_pixel_value):
-                    r_x = i - 1
-                    break
-            if (r_x > right_x):
-                fill(right_x, r_x, y - 1, image, start_pixel_value, color)
-
-            for i in range(left_x, right_x + 1):
-                if (image.getpixel((i, y - 1)) == start_pixel_value):
-                    l_x = i
-                    while (image.getpixel((i, y - 1)) == start_pixel_value):
-                        r_x = i
-                        i += 1
-
-                        if (i > right_x):
-                            break
-
-                    fill(l_x, r_x, y - 1, image, start_pixel_value, color)
+        if (self.version != self.image.version):
+            self.__init__(self.image)
+        data = self.image.data
+        seed_labels = self._seed_labels(seeds)
+        colors = _pixel_colors(color, 1 if data.ndim == 2 else data.shape[2], seed_labels.size).astype(data.dtype)
+
+        # номер затравки для каждой области (-1 - область не заливается)
+        seed_of = np.full(self._size, -1)
+        np.maximum.at(seed_of, seed_labels, np.arange(seed_labels.size))
+        seed_of = seed_of[self.labels]
+        mask = seed_of >= 0
+        if (colors.shape[0] == 1):
+            data[mask] = colors[0] if data.ndim == 3 else colors[0, 0]
+        else:
+            data[mask] = colors[seed_of[mask]] if data.ndim == 3 else colors[seed_of[mask], 0]
+        self.image.touch()
+
+        # объединение залитых областей с соседними областями того же цвета
+        values = _packed_values(data)
+        (a, b) = ([], [])
+        for (first, second) in (((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+                                ((slice(None, -1), slice(None)), (slice(1, None), slice(None)))):
+            join = (mask[first] | mask[second]) & (values[first] == values[second]) & (self.labels[first] != self.labels[second])
+            a.append(self.labels[first][join])
+            b.append(self.labels[second][join])
+        (a, b) = (np.concatenate(a), np.concatenate(b))
+        if (a.size):
+            parent = _merge_roots(np.arange(self._size), a, b)
+            self.labels = parent[self.labels].astype(np.int32)
+            self.count -= int(np.unique(np.concatenate((a, b))).size - np.unique(parent[np.concatenate((a, b))]).size)
+
+        self.version = self.image.version
+        return int(np.count_nonzero(mask))
+
+def flood_fill(image : Image, seeds, color):
+# функция заливки связных областей одного цвета по набору затравочных точек (изменяет плоскость)
+#
+# для FrameBuffer разметка областей берется из кэша плоскости, поэтому повторные заливки не сканируют изображение заново;
+# для Image разметка строится при каждом вызове
+#
+# параметры:
+#   image - растровая плоскость
+#   seeds - массив (n, 2) затравочных точек (x, y)
+#   color - цвет заливки или массив цветов для каждой затравки
+#
+# возвращаемое значение - число залитых пикселей
+#
+    if (isinstance(image, FrameBuffer)):
+        return image.regions().fill(seeds, color)
 
+    fb = FrameBuffer.from_image(image)
+    filled = fb.regions().fill(seeds, color)
+    image.paste(fb.to_image())
+    return filled
 
-    new_image = image.copy()
-    start_pixel_value = image.getpixel(start_point)
+class _AffineTransform:
+# общая часть аффинных преобразований в однородных координатах (размерность задается полем DIM)
+#
+# соглашение: точки - столбцы, p' = M @ (p, 1)^T, перенос в последнем столбце матрицы;
+# преобразования записываются в порядке применения: T().scale(a).shift(t) сначала масштабирует, затем переносит,
+# то есть M = Shift @ Scale; каждый шаг возвращает новое преобразование с уже перемноженной матрицей,
+# поэтому применение к набору точек - одно матричное умножение независимо от длины цепочки
+#
+    DIM = None
+
+    def __init__(self, matrix = None):
+        n = self.DIM + 1
+        self.matrix = np.eye(n) if matrix is None else np.array(matrix, dtype = np.float64)
+        if (self.matrix.shape != (n, n)):
+            raise ValueError(f"expected a {n}x{n} matrix, got {self.matrix.shape}")
+        self.matrix.setflags(write = False)
+
+    def then(self, other):
+    # композиция: сначала self, затем other
+        return type(self)(other.matrix @ self.matrix)
+    def __matmul__(self, other):
+    # композиция в матричном порядке: (a @ b) сначала применяет b, затем a
+        return type(self)(self.matrix @ other.matrix)
+    def _push(self, step):
+        return type(self)(np.asarray(step, dtype = np.float64) @ self.matrix)
+
+    def inverse(self):
+        return type(self)(np.linalg.inv(self.matrix))
+
+    def scale(self, a):
+    # масштабирование относительно начала координат с коэффициентами a по осям
+        return self._push(np.diag([*a[:self.DIM], 1.0]))
+    def shift(self, t):
+    # параллельный перенос на вектор t
+        step = np.eye(self.DIM + 1)
+        step[:self.DIM, self.DIM] = t[:self.DIM]
+        return self._push(step)
+
+    def apply(self, points : np.ndarray, dtype = None, rounding = None):
+    # функция применения преобразования к набору точек
+    #
+    # параметры:
+    #   points - массив (N, DIM) точек
+    #   dtype - тип результата (по умолчанию float64)
+    #   rounding - округление перед приведением к dtype: None, 'rint', 'floor', 'ceil' или 'trunc'
+    #              (без округления приведение к целому типу отбрасывает дробную часть)
+    #
+    # возвращаемое значение - массив (N, DIM) преобразованных точек
+    #
+        d = self.DIM
+        points = np.asarray(points, dtype = np.float64)
+        if (points.shape[-1] != d):
+            raise ValueError(f"expected points of shape (N, {d}), got {points.shape}")
+
+        res = points @ self.matrix[:d, :d].T
+        res += self.matrix[:d, d]
+
+        if (rounding is not None):
+            _ROUNDING[rounding](res, out = res)
+        return res if dtype is None else res.astype(dtype, copy = False)
+_ROUNDING = {'rint': np.rint, 'floor': np.floor, 'ceil': np.ceil, 'trunc': np.trunc}
+
+class Transform2D(_AffineTransform):
+# аффинное преобразование плоскости: матрица 3x3, p' = M @ (x, y, 1)^T
+# (например, Transform2D().scale(a).rotate(phi).shift(t) - это M = Shift @ Rotate @ Scale)
+#
+# параметры:
+#   matrix - матрица 3x3 (по умолчанию - тождественное преобразование)
+#
+    DIM = 2
 
-    # если цвет стартового пикселя уже color, то заливка не требуется
-    if (start_pixel_value == color):
-        return
-    
-    # нахожу левую и правую границы (границы включаются в заливку)
-    left_x = 0
-    for i in range(start_point[0], 0, -1):
-        if (image.getpixel((i, start_point[1])) != start_pixel_value):
-            left_x = i + 1
-            break
+    def rotate(self, phi : float):
+    # вращение на угол phi (в радианах), матрица как в rotate_2D
+        (c, s) = (np.cos(phi), np.sin(phi))
+        return self._push([[c, s, 0], [-s, c, 0], [0, 0, 1]])
 
-    right_x = image.size[0] - 1
-    for i in range(start_point[0], image.size[0]):
-        if (image.getpixel((i, start_point[1])) != start_pixel_value):
-            right_x = i - 1
-            break
-    
-    fill(left_x, right_x, start_point[1], new_image, start_pixel_value, color)
-    new_image.save(new_image_path)
-    new_image.show()
-def bitmask_fill(image : Image, new_image_path, bitmask : Image, color):
-# функция заливки произвольной замкнутой фигуры, представленной битовой маской
+class Transform3D(_AffineTransform):
+# аффинное преобразование пространства: матрица 4x4, p' = M @ (x, y, z, 1)^T
+# (например, Transform3D().scale(a).shift(t).rotate_y(20).rotate_x(34) - это M = Rx @ Ry @ Shift @ Scale)
 #
 # параметры:
-#   image_path - путь до изображения
-#   new_image_path - путь до нового изображения
-#   bitmask - битовая маска (представляет собой картинку с любой замкнутой фигурой, цвет фона - белый, границы фигуры - черный)
-#   color - цвет заливки
+#   matrix - матрица 4x4 (по умолчанию - тождественное преобразование)
 #
-    pass
+# углы вращения задаются в градусах, матрицы совпадают с rotateX_3D, rotateY_3D и rotateZ_3D
+#
+    DIM = 3
+
+    def rotate_x(self, phi_x : float):
+        (c, s) = (np.cos(np.radians(phi_x)), np.sin(np.radians(phi_x)))
+        return self._push([[1, 0, 0, 0], [0, c, -s, 0], [0, s, c, 0], [0, 0, 0, 1]])
+    def rotate_y(self, phi_y : float):
+        (c, s) = (np.cos(np.radians(phi_y)), np.sin(np.radians(phi_y)))
+        return self._push([[c, 0, s, 0], [0, 1, 0, 0], [-s, 0, c, 0], [0, 0, 0, 1]])
+    def rotate_z(self, phi_z : float):
+        (c, s) = (np.cos(np.radians(phi_z)), np.sin(np.radians(phi_z)))
+        return self._push([[c, s, 0, 0], [-s, c, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]])
+
+    @cached_property
+    def normal_matrix(self):
+    # матрица 3x3 преобразования нормалей: (M^-1)^T для линейной части M
+        normal = np.linalg.inv(self.matrix[:3, :3]).T
+        normal.setflags(write = False)
+        return normal
+    def apply_normals(self, normals : np.ndarray, normalize = True):
+    # функция преобразования набора нормалей (N, 3), по умолчанию результат нормируется
+        res = np.asarray(normals, dtype = np.float64) @ self.normal_matrix.T
+        if (normalize):
+            length = np.linalg.norm(res, axis = 1, keepdims = True)
+            np.divide(res, length, out = res, where = length > 0)
+        return res
 
 def scale_2D(xy : tuple[int, int], a : tuple[float, float]):
 # функция масштабирования точки относительно начала координат
@@ -677,24 +1398,9 @@ def scale_2D(xy : tuple[int, int], a : tuple[float, float]):
 #
 # возвращаемое значение - координаты новой точки в виде (x, y)
 #
+    res = Transform2D().scale(a).apply([xy], int, 'trunc')[0]
 
-    # scale matrix
-    Scale = [
-        [a[0],   0,       0],
-        [0,      a[1],    0],
-        [0,      0,       1],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xy[0]  ],
-        [   xy[1]  ],
-        [   1      ],
-    ]
-
-    res = np.dot(Scale,Dot)
-
-    return (res[0][0](int), res[0][1](int))
+    return (int(res[0]), int(res[1]))
 def rotate_2D(xy : tuple[int, int], phi : float):
 # функция вращения точки относительно Ox
 #
@@ -704,23 +1410,9 @@ def rotate_2D(xy : tuple[int, int], phi : float):
 #
 # возвращаемое значение - координаты новой точки в виде (x, y)
 #
-    # rotation matrix
-    Rotate = [
-        [np.cos(phi),       np.sin(phi),        0],
-        [-np.sin(phi),      np.cos(phi),        0],
-        [0,                 0,                  1],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xy[0]  ],
-        [   xy[1]  ],
-        [   1      ],
-    ]
+    res = Transform2D().rotate(phi).apply([xy], int, 'trunc')[0]
 
-    res = np.dot(Rotate,Dot)
-
-    return (res[0][0](int), res[0][1](int))
+    return (int(res[0]), int(res[1]))
 def shift_2D(xy: tuple[int, int], t : tuple[int, int]):
 # функция параллельного переноса точки
 #
@@ -729,25 +1421,10 @@ def shift_2D(xy: tuple[int, int], t : tuple[int, int]):
 #   t в виде (t_x, t_y) - единицы параллельного переноса
 #
 # возвращаемое значение - координаты новой точки в виде (x, y)
-# 
-
-    # shift matrix
-    Shift = [
-        [1,         0,        0],
-        [0,         1,        0],
-        [t[0],      t[1],     1],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xy[0]  ],
-        [   xy[1]  ],
-        [   1      ],
-    ]
-
-    res = np.dot(Shift,Dot)
+#
+    res = Transform2D().shift(t).apply([xy], int, 'trunc')[0]
 
-    return (res[0][0](int), res[0][1](int))
+    return (int(res[0]), int(res[1]))
 
 def scale_3D(xyz : tuple[int, int, int], a : tuple[float, float, float]):
 # функция масштабирования точки в пространстве относительно начала координат
@@ -758,27 +1435,9 @@ def scale_3D(xyz : tuple[int, int, int], a : tuple[float, float, float]):
 #
 # возвращаемое значение - координаты новой точки в виде (x, y, z)
 #
+    res = Transform3D().scale(a).apply([xyz], int, 'trunc')[0]
 
-    # scale matrix
-    Scale = [
-        [a[0],   0,       0,        0],
-        [0,      a[1],    0,        0],
-        [0,      0,       a[2],     0],
-        [0,      0,       0,        1]
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xyz[0]  ],
-        [   xyz[1]  ],
-        [   xyz[2]  ],
-        [   1      ]
-    ]
-
-    res = np.dot(Scale,Dot)
-
-    return (int(res[0][0]),int(res[1][0]),int(res[2][0]))
-
+    return (int(res[0]), int(res[1]), int(res[2]))
 def rotateX_3D(xyz : tuple[int, int, int], phi_x : float):
 # функция вращения точки относительно Ox
 #
@@ -787,27 +1446,10 @@ def rotateX_3D(xyz : tuple[int, int, int], phi_x : float):
 #   a в виде phi_x - угол между вектором (x, y, z) и Ox
 #
 # возвращаемое значение - координаты новой точки в виде (x, y, z)
-# 
-    phi_x = phi_x * np.pi / 180 
-    # rotation matrix
-    RotateX = [
-        [1,     0,                  0,                  0],
-        [0,     np.cos(phi_x),      -np.sin(phi_x),     0],
-        [0,     np.sin(phi_x),      np.cos(phi_x),      0],
-        [0,     0,                  0,                  1],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xyz[0]  ],
-        [   xyz[1]  ],
-        [   xyz[2]  ],
-        [   1       ],
-    ]
-
-    res = np.dot(RotateX,Dot)
-
-    return (int(res[0][0]),int(res[1][0]),int(res[2][0]))
+#
+    res = Transform3D().rotate_x(phi_x).apply([xyz], int, 'trunc')[0]
+
+    return (int(res[0]), int(res[1]), int(res[2]))
 def rotateY_3D(xyz : tuple[int, int, int], phi_y : float):
 # функция вращения точки относительно Oy
 #
@@ -816,27 +1458,10 @@ def rotateY_3D(xyz : tuple[int, int, int], phi_y : float):
 #   a в виде phi_y - угол между вектором (x, y, z) и Oy
 #
 # возвращаемое значение - координаты новой точки в виде (x, y, z)
-# 
-    phi_y = phi_y * np.pi / 180 
-    # rotation matrix
-    RotateY = [
-        [np.cos(-phi_y),    0,      -np.sin(-phi_y),    0],
-        [0,                 1,      0,                  0],
-        [np.sin(-phi_y),    0,      np.cos(-phi_y),     0],
-        [0,                 0,      0,                  1],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xyz[0]  ],
-        [   xyz[1]  ],
-        [   xyz[2]  ],
-        [   1       ],
-    ]
-
-    res = np.dot(RotateY,Dot)
-
-    return (int(res[0][0]),int(res[1][0]),int(res[2][0]))
+#
+    res = Transform3D().rotate_y(phi_y).apply([xyz], int, 'trunc')[0]
+
+    return (int(res[0]), int(res[1]), int(res[2]))
 def rotateZ_3D(xyz : tuple[int, int, int], phi_z : float):
 # функция вращения точки относительно Oz
 #
@@ -845,27 +1470,10 @@ def rotateZ_3D(xyz : tuple[int, int, int], phi_z : float):
 #   a в виде phi_z - угол между вектором (x, y, z) и Oz
 #
 # возвращаемое значение - координаты новой точки в виде (x, y, z)
-# 
-    phi_z = phi_z * np.pi / 180 
-    # rotation matrix
-    RotateZ = [
-        [np.cos(phi_z),       np.sin(phi_z),        0,          0],
-        [-np.sin(phi_z),      np.cos(phi_z),        0,          0],
-        [0,                   0,                      1,          0],
-        [0,                   0,                      0,          1],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xyz[0]  ],
-        [   xyz[1]  ],
-        [   xyz[2]  ],
-        [   1       ],
-    ]
-
-    res = np.dot(RotateZ,Dot)
-
-    return (int(res[0][0]),int(res[1][0]),int(res[2][0]))
+#
+    res = Transform3D().rotate_z(phi_z).apply([xyz], int, 'trunc')[0]
+
+    return (int(res[0]), int(res[1]), int(res[2]))
 def shift_3D(xyz : tuple[int, int, int], t : tuple[int, int, int]):
 # функция параллельного переноса точки
 #
@@ -874,264 +1482,1118 @@ def shift_3D(xyz : tuple[int, int, int], t : tuple[int, int, int]):
 #   t в виде (t_x, t_y, t_z) - единицы параллельного переноса
 #
 # возвращаемое значение - координаты новой точки в виде (x, y, z)
-# 
-
-    # shift matrix
-    Shift = [
-        [1,     0,      0,      t[0]],
-        [0,     1,      0,      t[1]],
-        [0,     0,      1,      t[2]],
-        [0,     0,      0,      1   ],
-    ]
-
-    # dot matrix
-    Dot = [
-        [   xyz[0]  ],
-        [   xyz[1]  ],
-        [   xyz[2]  ],
-        [   1       ],
-    ]
-
-    res = np.dot(Shift,Dot)
-
-    
+#
+    res = Transform3D().shift(t).apply([xyz], int, 'trunc')[0]
 
-    return (int(res[0][0]),int(res[1][0]),int(res[2][0]))
+    return (int(res[0]), int(res[1]), int(res[2]))
 
-def roggers_clipper(obj_file, image : Image):
-# функция отсечения невидимых граней по алгоритму Роджерса
+def load_obj(obj_file, return_polygons = False, cache = True):
+# функция чтения сетки из файла Wavefront OBJ
+#
+# если задан двоичный кэш mesh_cache (по умолчанию кэш выключен и включается явно, например
+# rast_alg.mesh_cache = MeshCache()), разобранная сетка сохраняется в нем, и повторное чтение того же файла
+# отображает готовые массивы в память без разбора текста; массивы в обоих случаях доступны для записи
+# (отображение копируется при записи, изменения не попадают в кэш);
+# файл не разбирается построчно: строки вершин и граней и их содержимое выделяются по массиву байтов,
+# числа разбираются NumPy сразу для всех строк; учитываются только строки "v" ("vn", "vt" и "vp" пропускаются)
+# и "f", в гранях допускаются записи v/vt/vn, v//vn и отрицательные (относительные) индексы,
+# многоугольники разбиваются на треугольники веером (0, j, j + 1)
 #
 # параметры:
+#   obj_file - путь до файла
+#   return_polygons - вернуть также номер исходного многоугольника для каждого треугольника
+#   cache - использовать кэш mesh_cache
 #
-# возвращаемое значение
+# возвращаемое значение - (vertices, faces) или (vertices, faces, polygons):
+#   vertices - массив (V, 3) float32, faces - массив (F, 3) int32 индексов вершин с 0
+#   (в файле индексы по стандарту OBJ начинаются с 1), polygons - массив (F,) int32
 #
-    def is_plane_visible(pl : list):
-        global dots
-        global center
-
-        a = np.array([dots[pl[0]][0] - center[0], dots[pl[0]][1] - center[1], dots[pl[0]][2] - center[2]])
-        b = np.array([0, 0, -1])
-
-        if (a.dot(b) <= 0):
-            return False
+    with _stage('load_obj'):
+        if (cache and mesh_cache is not None):
+            (vertices, faces, polygons) = mesh_cache.load(obj_file)
         else:
-            return True
-
-    dots = []
-    center = [0,0,0]
-    plane = []
-
-    with open(obj_file) as file:
-        info = file.read().split('\n')
-
-    for line in info:
-        if (line.find("v") == 0):
-            _, *line = line.split()
-            dots.append( list(float(dot) for dot in line) )
-        elif (line.find("f") == 0):
-            _, *line = line.split()
-            plane.append( list(int(fig) for fig in line) )
-
-
-    for i in range(len(dots)):
-        center[0] += dots[i][0]
-        center[1] += dots[i][1]
-        center[2] += dots[i][2]
-    center[0] /= len(dots)
-    center[1] /= len(dots)
-    center[2] /= len(dots)
-
-
-    for i in range(len(plane)):
-        pl = plane[i]
-        if (is_plane_visible(pl)):
-            for i in range(len(pl) + 1):
-                bresenham_line(((int(dots[pl[i]][0]), int(dots[pl[i]][1])), (int(dots[pl[i+1]][0]), int(dots[pl[i+1]][1]))), image)
-def zbuffer_clipper(obj_file, image : Image):
-# функция отсечения невидимых граней с помощью Z буффера
+            with open(obj_file, 'rb') as file:
+                text = file.read()
+            with _stage('parse_obj'):
+                (vertices, faces, polygons) = _parse_obj(text, obj_file)
+
+    return (vertices, faces, polygons) if return_polygons else (vertices, faces)
+def _parse_obj(text : bytes, obj_file):
+# разбор содержимого файла OBJ (obj_file - имя файла для сообщений об ошибках), результат как у load_obj
+    # изменяемая копия текста с двумя переводами строки и 16 пробелами в конце (см. _obj_lines)
+    chars = np.empty(len(text) + 18, np.uint8)
+    chars[:len(text)] = np.frombuffer(text, np.uint8)
+    chars[len(text):len(text) + 2] = 10
+    chars[len(text) + 2:] = 32
+
+    # строки: начало, первый непробельный символ и перевод строки; тип строки по ключевому слову
+    ends = np.flatnonzero(chars[:len(text) + 1] == 10)
+    begin = np.concatenate(([0], ends[:-1] + 1))
+    first = begin.copy()
+    key = chars[first]
+    indent = (key == 32) | (key == 9)
+    while (indent.any()):
+        first[indent] += 1
+        key[indent] = chars[first[indent]]
+        indent[indent] = (key[indent] == 32) | (key[indent] == 9)
+    separated = chars[first + 1]
+    separated = (separated == 32) | (separated == 9)
+    is_vertex = (key == ord('v')) & separated
+    is_face = (key == ord('f')) & separated
+
+    # вершины: лишние координаты (w или цвет вершины) отбрасываются
+    (values, counts) = _obj_numbers(*_obj_lines(chars, begin, first, ends, is_vertex), np.float64)
+    if ((counts < 3).any()):
+        raise ValueError(f"{obj_file}: vertex with less than 3 coordinates")
+    if (counts.size and (counts == counts[0]).all()):
+        vertices = values.reshape(-1, counts[0])[:, :3]
+    else:
+        vertices = values[(np.cumsum(counts) - counts)[:, None] + np.arange(3)]
+    vertices = np.ascontiguousarray(vertices, dtype = np.float32)
+
+    # грани: из записей v/vt/vn берется только номер вершины - целое число заканчивается на '/'
+    (index, counts) = _obj_numbers(*_obj_lines(chars, begin, first, ends, is_face), np.int64)
+    if ((counts < 3).any()):
+        raise ValueError(f"{obj_file}: face with less than 3 vertices")
+
+    negative = index < 0
+    if (negative.any()):
+        # отрицательный индекс отсчитывается от числа вершин, объявленных до строки грани
+        declared = np.repeat(np.cumsum(is_vertex)[is_face], counts)
+        index[negative] += declared[negative] + 1
+    index -= 1
+    if (index.size and (index.min() < 0 or index.max() >= len(vertices))):
+        raise ValueError(f"{obj_file}: face index out of range")
+
+    # разбиение многоугольников на треугольники веером
+    if (counts.size and (counts == 3).all()):
+        faces = index.reshape(-1, 3).astype(np.int32)
+        polygons = np.arange(counts.size, dtype = np.int32)
+    else:
+        triangles = counts - 2
+        polygons = np.repeat(np.arange(counts.size, dtype = np.int32), triangles)
+        start = np.repeat(np.cumsum(counts) - counts, triangles)
+        j = np.arange(polygons.size) - np.repeat(np.cumsum(triangles) - triangles, triangles) + 1
+        faces = np.stack((index[start], index[start + j], index[start + j + 1]), axis = 1).astype(np.int32)
+
+    return (vertices, faces, polygons)
+def _obj_lines(chars : np.ndarray, begin : np.ndarray, first : np.ndarray, ends : np.ndarray, selected : np.ndarray):
+# выделение выбранных строк (вместе с переводами строк) в один массив байтов, ключевые слова
+# и комментарии (от '#' до конца строки) заменяются пробелами
+#
+# если выбранные строки идут одним блоком (обычно вершины и грани записаны блоками), результат -
+# срез chars, и замена делается прямо в chars (chars должен быть изменяемым, и после последней
+# строки в нем должно быть не меньше 16 байтов); иначе подряд идущие строки копируются срезами
+#
+# возвращаемое значение - (text, stops): массив байтов, в котором после последней строки есть
+# еще 16 байтов (для чтения чисел по 8 байтов), и положения переводов строк в нем
+#
+    edges = np.diff(selected.view(np.int8), prepend = 0, append = 0)
+    (run_first, run_last) = (np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1)
+    if (run_first.size == 1):
+        offset = begin[run_first[0]]
+        text = chars[offset:ends[run_last[0]] + 17]
+        stops = ends[selected] - offset
+        text[first[selected] - offset] = 32
+    else:
+        pad = np.full(16, 32, np.uint8)
+        if (run_first.size * 16 <= max(np.count_nonzero(selected), 1)):
+            text = np.concatenate([chars[begin[i]:ends[j] + 1] for (i, j) in zip(run_first, run_last)] + [pad])
+        else:
+            mark = np.zeros(chars.size + 1, np.int8)
+            mark[begin[selected]] = 1
+            mark[ends[selected] + 1] -= 1
+            text = np.concatenate((chars[np.cumsum(mark[:-1], dtype = np.int8).view(bool)], pad))
+        length = ends[selected] - begin[selected] + 1
+        stops = np.cumsum(length) - 1
+        text[stops - length + 1 + (first - begin)[selected]] = 32
+
+    comment = np.flatnonzero(text[:stops[-1] + 1] == ord('#')) if stops.size else stops
+    if (comment.size):
+        line = np.searchsorted(stops, comment)
+        head = np.concatenate(([True], line[1:] != line[:-1]))
+        mark = np.zeros(text.size + 1, np.int8)
+        mark[comment[head]] = 1
+        mark[stops[line[head]]] -= 1
+        text[np.cumsum(mark[:-1], dtype = np.int8).view(bool)] = 32
+    return (text, stops)
+def _obj_numbers(text : np.ndarray, stops : np.ndarray, dtype):
+# разбор чисел строк, выделенных _obj_lines: все числа подряд и количество чисел в каждой строке
+#
+# параметры:
+#   text, stops - результат _obj_lines
+#   dtype - float64 или int64 (целое число может заканчиваться символом '/', остаток записи v/vt/vn не разбирается)
+#
+# числа разбираются блоками по 32768 (промежуточные массивы блока помещаются в кэш процессора)
+# функцией _obj_tokens; числа с порядком, длинные и неправильные числа разбираются отдельно
+#
+    if (stops.size == 0):
+        return (np.zeros(0, dtype), np.zeros(0, np.int64))
+
+    # начало числа - непробельный символ после пробельного (пробельными считаются все управляющие символы)
+    space = text[:stops[-1] + 1] <= 32
+    at = np.flatnonzero(space[:-1] > space[1:]) + 1
+    # обычно во всех строках одинаковое число чисел - тогда достаточно проверить границы строк
+    k = at.size // stops.size
+    if (k and k * stops.size == at.size and (at[k - 1::k] < stops).all() and (at[k::k] > stops[:-1]).all()):
+        counts = np.full(stops.size, k)
+    else:
+        counts = np.diff(np.searchsorted(at, stops), prepend = 0)
+    words = np.ndarray((text.size - 7,), '<u8', text, 0, (1,))
+
+    values = np.empty(at.size, dtype)
+    good = np.empty(at.size, bool)
+    for i in range(0, at.size, 1 << 15):
+        (values[i:i + (1 << 15)], good[i:i + (1 << 15)]) = _obj_tokens(text, words, at[i:i + (1 << 15)], dtype)
+
+    bad = np.flatnonzero(~good)
+    if (bad.size):
+        # отдельный разбор: число - непрерывная последовательность непробельных символов
+        data = text.tobytes()
+        word_at = re.compile(rb'[^\x00- ]+').match
+        try:
+            for i in bad:
+                word = word_at(data, at[i]).group()
+                values[i] = float(word) if np.dtype(dtype).kind == 'f' else int(word.split(b'/', 1)[0])
+        except ValueError:
+            raise ValueError('malformed numbers in OBJ file') from None
+    return (values, counts)
+def _obj_tokens(text : np.ndarray, words : np.ndarray, at : np.ndarray, dtype):
+# разбор чисел, начинающихся с позиций at, для _obj_numbers
+#
+# вещественное число собирается из целой и дробной части как целая мантисса, деленная на точную
+# степень 10 - это дает тот же результат, что и float()
+#
+# возвращаемое значение - (values, good): значения и признаки того, что число разобрано
+#
+    sign = text[at]
+    negative = sign == ord('-')
+    p = at + (negative | (sign == ord('+')))
+    (values, length) = _obj_digits(words, p)
+    p += length
+    if (np.dtype(dtype).kind == 'f'):
+        dot = text[p] == ord('.')
+        p += dot
+        (fraction, places) = _obj_digits(words, p)
+        places *= dot
+        p += places
+        scale = (10 ** np.arange(9, dtype = np.uint64))[places]
+        values *= scale
+        values += fraction
+        # мантисса не больше 2**53 и степень 10 точно представимы в float64, знак числа переносится в делитель
+        good = text[p] <= 32
+        good &= length + places > 0
+        good &= values <= np.uint64(1 << 53)
+        scale = scale.astype(np.float64)
+        np.negative(scale, out = scale, where = negative)
+        values = values / scale
+    else:
+        end = text[p]
+        good = ((end <= 32) | (end == ord('/'))) & (length > 0)
+        # значения не больше 10**8, поэтому uint64 читается как int64 без преобразования
+        values = values.view(np.int64)
+        np.negative(values, out = values, where = negative)
+    return (values, good)
+def _obj_digits(words : np.ndarray, at : np.ndarray):
+# значения и количества десятичных цифр (не более 8) в начале чисел, начинающихся с позиций at
+#
+# 8 байтов, начиная с каждой позиции, читаются одним словом (первый байт - младший); номер первого
+# нецифрового байта берется из порядка младшего установленного бита, цифры перед ним сдвигаются
+# в старшие байты и складываются попарно умножением
+#
+# (все операции выполняются на месте: на блоке чисел время уходит в основном на проходы по массивам)
+#
+    u = np.uint64
+    x = words[at]
+    x ^= u(0x3030303030303030)
+    other = x + u(0x0606060606060606)
+    other |= x
+    other &= u(0xF0F0F0F0F0F0F0F0)
+    other &= np.negative(other)
+    shift = other.astype(np.float64).view(u)
+    shift >>= u(55)
+    shift -= u(128)
+    np.minimum(shift, u(8), out = shift)
+    length = shift.astype(np.intp)
+    shift <<= u(3)
+    np.subtract(u(64), shift, out = shift)
+    x <<= shift
+    x *= u(2561)
+    x >>= u(8)
+    x &= u(0x00FF00FF00FF00FF)
+    x *= u(6553601)
+    x >>= u(16)
+    x &= u(0x0000FFFF0000FFFF)
+    x *= u(42949672960001)
+    x >>= u(32)
+    return (x, length)
+
+class MeshCache:
+# двоичный кэш разобранных файлов OBJ на диске
+#
+# параметры:
+#   directory - каталог кэша (по умолчанию - rast_alg/meshes в каталоге кэша пользователя:
+#               $XDG_CACHE_HOME или ~/.cache)
+#   max_bytes - наибольший размер кэша, при превышении удаляются давно не использованные сетки
+#
+# сетка хранится в подкаталоге, названном по хэшу содержимого файла, массивами .npy, которые читаются
+# отображением в память; небольшие файлы-ссылки в каталоге refs связывают путь, размер и время изменения
+# файла с хэшем, поэтому для неизмененного файла не нужно даже читать его текст; время изменения
+# подкаталога сетки обновляется при каждом чтении и служит порядком вытеснения
+#
+# кэш не влияет на результат: при любой ошибке ввода-вывода в каталоге кэша (нет прав, нет места,
+# каталог удален другим процессом) файл просто разбирается заново; ошибки чтения самого файла OBJ
+# передаются вызывающему
+#
+    VERSION = 1
+    ARRAYS = ('vertices', 'faces', 'polygons')
+
+    def __init__(self, directory = None, max_bytes = 1 << 30):
+        if (directory is None):
+            directory = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'rast_alg', 'meshes')
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def load(self, obj_file):
+    # функция чтения сетки через кэш, возвращаемое значение - (vertices, faces, polygons) как у load_obj
+        stat = os.stat(obj_file)
+        key = f"{os.path.abspath(obj_file)}|{stat.st_size}|{stat.st_mtime_ns}|{MeshCache.VERSION}"
+        ref = os.path.join(self.directory, 'refs', hashlib.blake2b(key.encode(), digest_size = 16).hexdigest())
+
+        # файл не изменялся - хэш содержимого берется из ссылки
+        try:
+            with open(ref) as file:
+                arrays = self._open(file.read().strip())
+            if (arrays is not None):
+                if (_stats is not None):
+                    _stats.count('mesh cache hits')
+                return arrays
+        except OSError:
+            pass
+
+        with open(obj_file, 'rb') as file:
+            text = file.read()
+        digest = hashlib.blake2b(text, digest_size = 16, person = b'rast_alg.obj.%d' % MeshCache.VERSION).hexdigest()
+
+        # то же содержимое уже разбиралось (файл скопирован или только изменено время)
+        try:
+            arrays = self._open(digest)
+        except OSError:
+            arrays = None
+        if (_stats is not None):
+            _stats.count('mesh cache hits' if arrays is not None else 'mesh cache misses')
+        if (arrays is None):
+            with _stage('parse_obj'):
+                arrays = _parse_obj(text, obj_file)
+            try:
+                self._store(digest, arrays)
+            except OSError:
+                return arrays
+        try:
+            _write_atomic(ref, digest.encode())
+        except OSError:
+            pass
+        return arrays
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def _open(self, digest):
+    # отображение сохраненных массивов в память с копированием при записи или None, если сетки нет в кэше
+        entry = os.path.join(self.directory, digest)
+        try:
+            arrays = tuple(np.load(os.path.join(entry, f"{name}.npy"), mmap_mode = 'c') for name in MeshCache.ARRAYS)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            # каталог только для чтения - сетка читается, но порядок вытеснения не обновляется
+            pass
+        return arrays
+    def _store(self, digest, arrays):
+    # запись массивов во временный каталог и его переименование, чтобы другие процессы не увидели неполную запись
+        entry = os.path.join(self.directory, digest)
+        os.makedirs(self.directory, exist_ok = True)
+        temp = tempfile.mkdtemp(dir = self.directory, prefix = '.tmp-')
+        try:
+            for (name, array) in zip(MeshCache.ARRAYS, arrays):
+                np.save(os.path.join(temp, f"{name}.npy"), array)
+            os.replace(temp, entry)
+        except OSError:
+            # сетку уже записал другой процесс
+            shutil.rmtree(temp, ignore_errors = True)
+        self._evict(keep = digest)
+
+    def _evict(self, keep):
+    # удаление давно не использованных сеток, пока размер кэша больше max_bytes
+        entries = []
+        for item in os.scandir(self.directory):
+            if (item.is_dir() and item.name not in ('refs', keep) and not item.name.startswith('.')):
+                size = sum(f.stat().st_size for f in os.scandir(item.path))
+                entries.append((item.stat().st_mtime, size, item.path))
+        total = sum(size for (_, size, _) in entries) + sum(f.stat().st_size for f in os.scandir(os.path.join(self.directory, keep)))
+
+        for (_, size, path) in sorted(entries):
+            if (total <= self.max_bytes):
+                break
+            shutil.rmtree(path, ignore_errors = True)
+            total -= size
+# кэш load_obj: None - кэш выключен (на диск ничего не записывается)
+mesh_cache = None
+
+def _write_atomic(path, data : bytes):
+# запись файла через временный файл и переименование
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    (fd, temp) = tempfile.mkstemp(dir = os.path.dirname(path), prefix = '.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+def roggers_clipper(obj_file, image : Image, color = 255):
+# функция отсечения невидимых граней по алгоритму Роджерса
+#
+# нормали всех граней вычисляются сразу по обходу их вершин (_face_normals); грань видима,
+# если ее нормаль направлена к наблюдателю, находящемуся со стороны +z (как в Z буфере, где видима точка
+# с наибольшим z): (n, (0, 0, 1)) > 0, то есть обход грани при взгляде с +z - против часовой стрелки;
+# ребра видимых граней собираются в один массив без повторов, поэтому общее ребро двух граней
+# рисуется один раз, и все ребра рисуются одним вызовом bresenham_lines
 #
 # параметры:
+#   obj_file - путь до файла OBJ
+#   image - растровая плоскость
+#   color - цвет ребер
+#
+    (dots, faces, polygons) = load_obj(obj_file, return_polygons = True)
+    if (len(faces) == 0):
+        return
+
+    with _stage('culling'):
+        visible = _face_normals(dots, faces) @ np.array([0, 0, 1.0]) > 0
+    with _stage('edges'):
+        edges = _visible_edges(faces, polygons, visible)
+    if (_stats is not None):
+        _stats.count('triangles', len(faces))
+        _stats.count('triangles culled', len(faces) - np.count_nonzero(visible))
+        _stats.count('edges drawn', len(edges))
+
+    with _stage('draw'):
+        xy = dots[:, :2].astype(np.int64)
+        bresenham_lines(np.concatenate((xy[edges[:, 0]], xy[edges[:, 1]]), axis = 1), image, color)
+def _visible_edges(faces : np.ndarray, polygons : np.ndarray, visible : np.ndarray):
+# стороны видимых многоугольников без повторов (диагонали разбиения на треугольники не включаются)
+#
+# возвращаемое значение - массив (E, 2) индексов вершин
+#
+    # многоугольники разбиты на треугольники веером: стороны многоугольника - (0, 1) первого треугольника,
+    # (1, 2) каждого треугольника и (2, 0) последнего
+    first = np.ones(len(faces), bool)
+    first[1:] = polygons[1:] != polygons[:-1]
+    last = np.ones(len(faces), bool)
+    last[:-1] = first[1:]
+
+    edges = np.concatenate((faces[visible & first][:, [0, 1]], faces[visible][:, [1, 2]], faces[visible & last][:, [2, 0]]))
+    return np.unique(np.sort(edges, axis = 1), axis = 0)
+def _face_normals(vertices : np.ndarray, faces : np.ndarray):
+# нормали граней по обходу вершин: по стандарту OBJ вершины лицевой стороны перечислены против часовой
+# стрелки, и нормаль (p1 - p0) x (p2 - p0) направлена от лицевой стороны; длина нормали - удвоенная площадь грани
 #
-# возвращаемое значение
-#
-    class point:
-        def __init__(self, xyz : tuple[int,int,int]):
-            self.x = xyz[0]
-            self.y = xyz[1]
-            self.z = xyz[2]
-        
-
-    class plane:
-        def __init__(self, p: tuple[point,point,point], color):
-            
-            self.p = p
-            self.color = color
-
-            Arr = np.array((
-                [   -p[0].x,    -p[0].y,     -p[0].z  ],
-                [   p[1].x - p[0].x,    p[1].y - p[0].y,     p[1].z - p[0].z  ],
-                [   p[2].x - p[0].x,    p[2].y - p[0].y,     p[2].z - p[0].z  ],
-            ))
-
-
-            self.A = np.linalg.det(np.array((
-                [Arr[1][1], Arr[1][2]],
-                [Arr[2][1], Arr[2][2]],
-                )))
-            self.B = np.linalg.det(np.array((
-                [Arr[1][0], Arr[1][2]],
-                [Arr[2][0], Arr[2][2]],
-                )))
-            self.C = np.linalg.det(np.array((
-                [Arr[1][0], Arr[1][1]],
-                [Arr[2][0], Arr[2][1]],
-                )))
-            self.D = np.linalg.det(Arr)
-
-        def in_plane_xy(self, xy : tuple[int,int]) -> bool: 
-        
-            # Проверка будет производиться для обоих обходов
-            # Описание векторов фигуры
-            abV = tuple([(self.p[1].x - self.p[0].x), (self.p[1].y - self.p[0].y)])
-            bcV = tuple([(self.p[2].x - self.p[1].x), (self.p[2].y - self.p[1].y)])
-            caV = tuple([(self.p[0].x - self.p[2].x), (self.p[0].y - self.p[2].y)])
-
-            # Описание нормалей векторов фигуры
-            Nab = tuple([abV[1], -abV[0]])
-            Nbc = tuple([bcV[1], -bcV[0]])
-            Nca = tuple([caV[1], -caV[0]])
-
-            # Описание векторов от точек фигуры до исходной точки
-            atV = tuple([xy[0] - self.p[0].x, xy[1] - self.p[0].y])
-            btV = tuple([xy[0] - self.p[1].x, xy[1] - self.p[1].y])
-            ctV = tuple([xy[0] - self.p[2].x, xy[1] - self.p[2].y])
-
-            # Проверка на принадлежность исходной точки данной фигуре
-            if ((
-                (Nab[0]*atV[0] + Nab[1]*atV[1] >= 0) and 
-                (Nbc[0]*btV[0] + Nbc[1]*btV[1] >= 0) and 
-                (Nca[0]*ctV[0] + Nca[1]*ctV[1] >= 0)
-                )
-
-                or
-
-                (
-                (Nab[0]*atV[0] + Nab[1]*atV[1] < 0) and 
-                (Nbc[0]*btV[0] + Nbc[1]*btV[1] < 0) and 
-                (Nca[0]*ctV[0] + Nca[1]*ctV[1] < 0)
-                )):
-                
-                return True
-
-            return False
-        def get_z(self, xy : tuple[int, int]) -> int:
-            return -(self.D + self.A * xy[0] + self.B * xy[1]) / self.C
-        
-
-    dots = list()
-    planes = list()
-
-    with open(obj_file) as file:
-        info = file.read().split('\n')
-
-    for line in info:
-        if (line.find("v") == 0):
-            _, *line = line.split()
-            if (len(line) == 3):
-                x = (int(line[0]))
-                y = (int(line[1]))
-                z = (int(line[2]))
-
-                (x,y,z) = scale_3D((x,y,z),(300, 400, 400))
-                (x,y,z) = shift_3D((x,y,z),(500,500,0))
-
-                (x,y,z) = rotateY_3D((x,y,z), 20)
-                #(x,y,z) = rotateZ_3D((x,y,z), 15)
-                (x,y,z) = rotateX_3D((x,y,z), 34)
-
-                dots.append(point((x, y, z)))
-
-        elif (line.find("f") == 0):
-            _, *line = line.split()
-            if (len(line) == 3):
-                p0 = dots[int(line[0]) - 1]
-                p1 = dots[int(line[1]) - 1]
-                p2 = dots[int(line[2]) - 1]
-                planes.append(plane((p0, p1, p2), randint(100, 255)))
-
-    
-    for i in range(image.size[0]):
-        for j in range(image.size[1]):
-          
-          z_max = planes[0].get_z((i,j))
-
-          for p in planes:
-              if(p.in_plane_xy((i, j))):
-                  z = p.get_z((i,j))
-                  if (z > z_max):
-                      z_max = z
-                      image.putpixel((i,j), p.color)  
-def zbuffer_clipper_with_light(obj_file, image : Image):
+# обход берется из файла как есть и не исправляется: сетка с обходом по часовой стрелке видна с обратной стороны
+#
+# возвращаемое значение - массив (F, 3)
+#
+    p = vertices[faces].astype(np.float64)
+    return np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+def zbuffer_clipper(obj_file, image : Image, workers = 1):
 # функция отсечения невидимых граней с помощью Z буффера
 #
 # параметры:
+#   obj_file - путь до файла OBJ
+#   image - растровая плоскость
+#   workers - число процессов (1 - без пула процессов, None - число ядер); пул включается только явно,
+#             при запуске процессов через spawn вызывающий модуль должен проверять __name__ == '__main__'
+#
+# грани закрашиваются случайными оттенками, видимой считается точка с наибольшим z
+#
+    (vertices, faces) = load_obj(obj_file)
+    with _stage('transform'):
+        points = _ZBUFFER_VIEW.apply(vertices)
+    colors = np.array([randint(100, 255) for _ in range(len(faces))], np.int64)
+
+    (color, depth, ids) = _zbuffer_render(points, faces, colors, image.size, workers = workers)
+    _put_visible(image, color, ids)
+# вид на сетку для zbuffer_clipper и zbuffer_clipper_with_light: вся цепочка преобразований перемножена в одну матрицу,
+# округление до пикселей происходит только при растеризации
+_ZBUFFER_VIEW = Transform3D().scale((300, 400, 400)).shift((500, 500, 0)).rotate_y(20).rotate_x(34)
+
+def _zbuffer_render(points : np.ndarray, faces : np.ndarray, colors : np.ndarray, size : tuple[int, int],
+                    shade = None, workers = 1, tile = 64, buffers = None):
+# растеризация треугольников с буфером глубины на всю плоскость
+#
+# при нескольких процессах треугольники распределяются по плиткам tile x tile, которые они задевают,
+# и плитки растеризуются в пуле процессов; буферы лежат в разделяемой памяти, и каждый процесс пишет
+# только в свои плитки, поэтому блокировки не нужны, а результат совпадает с растеризацией в одном процессе
+# (сетки меньше _ZBUFFER_POOL_FACES треугольников всегда растеризуются в одном процессе)
+#
+# параметры:
+#   points - массив (V, 3) координат вершин на плоскости (x, y) и глубины z
+#   faces - массив (F, 3) индексов вершин треугольников
+#   colors - массив (F,) или (F, C) цветов треугольников
+#   size в виде (w, h) - размер плоскости
+#   shade - массив (F, 3) яркостей вершин треугольников: цвет пикселя - цвет треугольника, умноженный
+#           на интерполированную яркость (None - без освещения)
+#   workers - число процессов (None - число ядер)
+#   tile - размер стороны плитки
+#   buffers - заранее выделенные буферы (color, depth, ids) из _zbuffer_buffers: они очищаются и заполняются
+#             вместо выделения новых (None - новые буферы)
+#
+# возвращаемое значение - (color, depth, ids): массивы (h, w) цветов, глубин -z (inf - пиксель не закрашен)
+# и номеров видимых треугольников (-1 - пиксель не закрашен)
+#
+    (w, h) = size
+    with _stage('setup'):
+        setup = _triangle_setup(points, faces)
+    workers = workers or os.cpu_count()
+    if (_stats is not None):
+        box = setup[5]
+        _stats.count('triangles', len(faces))
+        _stats.count('triangles offscreen', np.count_nonzero((box[:, 0] > box[:, 2]) | (box[:, 1] > box[:, 3]) | (box[:, 2] < 0) | (box[:, 3] < 0) | (box[:, 0] >= w) | (box[:, 1] >= h)))
+
+    if (workers == 1 or len(faces) < _ZBUFFER_POOL_FACES):
+        buffers = _zbuffer_buffers((h, w), colors) if buffers is None else _zbuffer_clear(buffers)
+        with _stage('raster'):
+            _zbuffer_tile(setup, np.arange(len(faces)), colors, buffers, (0, 0), shade)
+        return buffers
+
+    # распределение треугольников по плиткам: пары (плитка, треугольник), упорядоченные по плитке
+    with _stage('binning'):
+        (tiles_x, tiles_y) = (-(-w // tile), -(-h // tile))
+        box = setup[5]
+        t_box = np.stack((np.clip(box[:, 0], 0, w - 1), np.clip(box[:, 1], 0, h - 1), np.clip(box[:, 2], 0, w - 1), np.clip(box[:, 3], 0, h - 1)), axis = 1) // tile
+        visible = (box[:, 0] <= box[:, 2]) & (box[:, 1] <= box[:, 3]) & (box[:, 2] >= 0) & (box[:, 3] >= 0) & (box[:, 0] < w) & (box[:, 1] < h)
+        (ids, t_box) = (np.flatnonzero(visible), t_box[visible])
+        (span_x, span_y) = (t_box[:, 2] - t_box[:, 0] + 1, t_box[:, 3] - t_box[:, 1] + 1)
+        count = span_x * span_y
+        owner = np.repeat(np.arange(ids.size), count)
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        tile_id = (t_box[owner, 1] + offset // span_x[owner]) * tiles_x + t_box[owner, 0] + offset % span_x[owner]
+        order = np.argsort(tile_id, kind = 'stable')
+        (tile_id, pairs) = (tile_id[order], ids[owner[order]])
+
+        # задания для процессов: подряд идущие плитки примерно с равным числом треугольников
+        (used, start) = np.unique(tile_id, return_index = True)
+        stop = np.append(start[1:], tile_id.size)
+        bounds = np.searchsorted(stop, np.linspace(0, tile_id.size, workers * 4 + 1)[1:], 'left') + 1
+        jobs = [list(zip(used[i:j].tolist(), start[i:j].tolist(), stop[i:j].tolist())) for (i, j) in zip(np.concatenate(([0], bounds[:-1])), bounds) if i < j]
+
+    blocks = []
+    try:
+        arrays = (*setup, colors, shade, pairs) + _zbuffer_buffers((h, w), colors)
+        specs = [_shared_copy(array, blocks) if array is not None else None for array in arrays]
+        with _stage('raster'), ProcessPoolExecutor(max_workers = workers) as pool:
+            for stats in pool.map(_zbuffer_tiles, repeat(specs), repeat((w, h, tiles_x, tile, _stats is not None)), jobs):
+                if (stats is not None):
+                    _stats.merge(stats)
+        result = [np.ndarray(shape, dtype, block.buf) for ((_, shape, dtype), block) in zip(specs[-3:], blocks[-3:])]
+        if (buffers is None):
+            return tuple(array.copy() for array in result)
+        for (buffer, array) in zip(buffers, result):
+            buffer[...] = array
+        return buffers
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+_ZBUFFER_POOL_FACES = 4096
+def _zbuffer_tiles(specs : list, layout : tuple, job : list):
+# вспомогательная функция процесса пула, растеризующая набор плиток (tile_id, начало, конец пар треугольников)
+# (при включенных замерах возвращает замеры процесса для объединения с замерами основного процесса)
+    global _stats
+    (*setup, colors, shade, pairs, color_buf, depth_buf, id_buf) = [_shared_array(spec) if spec is not None else None for spec in specs]
+    (w, h, tiles_x, tile, profiling) = layout
+    _stats = RenderStats() if profiling else None
+    with _stage('raster tiles'):
+        for (tile_id, begin, end) in job:
+            (y_0, x_0) = ((tile_id // tiles_x) * tile, (tile_id % tiles_x) * tile)
+            window = (slice(y_0, min(y_0 + tile, h)), slice(x_0, min(x_0 + tile, w)))
+            _zbuffer_tile(setup, pairs[begin:end], colors, (color_buf[window], depth_buf[window], id_buf[window]), (x_0, y_0), shade)
+    return _stats
+
+_shared_cache = {}
+def _shared_copy(array : np.ndarray, blocks : list):
+# копирование массива в новый блок разделяемой памяти (блок добавляется в blocks для последующего удаления)
+#
+# возвращаемое значение - описание (имя блока, форма, тип) для _shared_array
+#
+    block = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, array.dtype, block.buf)[...] = array
+    return (block.name, array.shape, array.dtype.str)
+def _shared_array(spec : tuple):
+# вспомогательная функция, подключающая блок разделяемой памяти как массив
+# (подключения кэшируются внутри процесса пула и закрываются при его завершении)
+    (name, shape, dtype) = spec
+    if (name not in _shared_cache):
+        block = shared_memory.SharedMemory(name = name)
+        _shared_cache[name] = (block, np.ndarray(shape, dtype, block.buf))
+    return _shared_cache[name][1]
+def _zbuffer_buffers(shape : tuple[int, int], colors : np.ndarray):
+# пустые буферы цвета, глубины и номеров треугольников
+    return (np.zeros(shape + colors.shape[1:], colors.dtype), np.full(shape, np.inf), np.full(shape, -1, np.int64))
+
+def _put_visible(image, color_buf : np.ndarray, id_buf : np.ndarray):
+# запись закрашенных пикселей буфера цвета в растровую плоскость (дробные цвета освещения округляются)
+    with _stage('write'):
+        (y, x) = np.nonzero(id_buf >= 0)
+        if (_stats is not None):
+            _stats.count('pixels written', x.size)
+        color = color_buf[y, x]
+        if (color.dtype.kind == 'f'):
+            color = np.clip(np.rint(color), 0, 255).astype(np.int64)
+        _put_pixels(image, x, y, color)
+def _zbuffer_clear(buffers : tuple):
+# очистка буферов цвета, глубины и номеров треугольников без выделения памяти
+    (color_buf, depth_buf, id_buf) = buffers
+    color_buf.fill(0)
+    depth_buf.fill(np.inf)
+    id_buf.fill(-1)
+    return buffers
+
+def _triangle_setup(points : np.ndarray, faces : np.ndarray):
+# подготовка треугольников к растеризации
+#
+# функции ребер e_k(x, y) = a_k * x + b_k * y + c_k (ребро против вершины k) домножаются на знак площади,
+# поэтому пиксель покрыт треугольником при e_0, e_1, e_2 >= 0 для любого направления обхода,
+# глубина в пикселе z = (e_0 * z_0 + e_1 * z_1 + e_2 * z_2) / area - барицентрическая интерполяция
+#
+# возвращаемое значение - (a, b, c, z, area, box): массивы (F, 3) коэффициентов функций ребер и глубин вершин,
+# (F,) удвоенных площадей и (F, 4) ограничивающих прямоугольников (x_min, y_min, x_max, y_max) в целых пикселях
+# (у вырожденных треугольников прямоугольник пустой)
+#
+    p = np.asarray(points, np.float64)[faces]
+    (x, y, z) = (p[..., 0], p[..., 1], p[..., 2])
+    (x_a, y_a, x_b, y_b) = (np.roll(x, -1, axis = 1), np.roll(y, -1, axis = 1), np.roll(x, -2, axis = 1), np.roll(y, -2, axis = 1))
+
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+    sign = np.sign(area)[:, None]
+    a = (y_a - y_b) * sign
+    b = (x_b - x_a) * sign
+    c = (x_a * y_b - x_b * y_a) * sign
+    area = np.abs(area)
+
+    box = np.stack((np.ceil(x.min(axis = 1)), np.ceil(y.min(axis = 1)), np.floor(x.max(axis = 1)), np.floor(y.max(axis = 1))), axis = 1)
+    box = np.clip(box, -1 << 30, 1 << 30).astype(np.int64)
+    box[area == 0] = (0, 0, -1, -1)
+    return (a, b, c, z, area, box)
+
+def _zbuffer_tile(setup : tuple, ids : np.ndarray, colors : np.ndarray, buffers : tuple, origin : tuple[int, int],
+                  shade = None, small = 256, batch = 1 << 16):
+# растеризация набора треугольников в прямоугольную часть плоскости
 #
-# возвращаемое значение
-#
-    class point:
-        def __init__(self, xyz : tuple[int,int,int]):
-            self.x = xyz[0]
-            self.y = xyz[1]
-            self.z = xyz[2]
-
-    class plane:
-        def __init__(self, p: tuple[point,point,point], color):
-            
-            self.p = p
-            self.color = color
-
-            XYZ = np.array(
-                [   p[0].x,    p[1].x,     p[2].x  ],
-                [   p[0].y,    p[1].y,     p[2].y  ],
-                [   p[0].z,    p[1].z,     p[2].z  ],
-                [   1,         1,          1       ],
-            )
-            (self.A, self.B, self.C, self.D) = np.dot(np.array([0,0,0]), np.linalg.matrix_power(XYZ, -1))
-
-        def in_plane_xy(self, xy : tuple[int,int]) -> bool: 
-            return (min(xy[0].x,xy[1].x,xy[2].x) <= xy.x <= max(xy[0].x,xy[1].x,xy[2].x)
-                    & 
-                    (min(xy[0].y,xy[1].y,xy[2].y) <= xy.y <= max(xy[0].y,xy[1].y,xy[2].y)))
-        def get_z(self, xy : tuple[int, int]) -> int:
-            return -(self.D + self.A * xy[0] + self.B * xy[1]) / self.C
-        
-
-    dots = list(point)
-    planes = list(plane)
-
-    with open(obj_file) as file:
-        info = file.read().split('\n')
-
-    for line in info:
-        if (line.find("v") == 0):
-            _, *line = line.split()
-            if (len(line) == 3):
-                dots.append(int(line[0]), int(line[1]), int(line[2]))
-
-        elif (line.find("f") == 0):
-            _, *line = line.split()
-            if (len(line) == 3):
-                planes.append((point(dots[line[0]]), point(dots[line[1]]), point(line[2])), randint(0, 255))
-
-    
-    for i in range(image.size[0]):
-        for j in range(image.size[1]):
-          
-          z_max = -float('inf')
-          for p in planes:
-              if(p.in_plane_xy((i, j))):
-                  z = p.get_z((i,j))
-                  if (z_max < z):
-                      z_max = z
-                      image.putpixel((i,j), p.color * pow(2, -(abs(z - 100) / 50)))
+# покрытие и глубина вычисляются для всего ограничивающего прямоугольника треугольника сразу;
+# большие треугольники растеризуются по одному сетками NumPy, маленькие (не больше small пикселей)
+# объединяются в пакеты примерно по batch пикселей; глубина хранится как -z, и пиксель записывается,
+# если np.less(-z, depth) или глубины равны, а номер треугольника меньше - поэтому результат
+# не зависит ни от порядка треугольников, ни от разбиения плоскости на части
+#
+# параметры:
+#   setup - результат _triangle_setup
+#   ids - номера растеризуемых треугольников
+#   colors - массив (F,) или (F, C) цветов треугольников
+#   buffers - (color, depth, ids) - буферы части плоскости (изменяются на месте)
+#   origin в виде (x, y) - положение части на плоскости
+#   shade - массив (F, 3) яркостей вершин треугольников, интерполируемых так же, как глубина (или None)
+#
+    (a, b, c, z, area, box) = setup
+    (color_buf, depth_buf, id_buf) = buffers
+    (x_0, y_0) = origin
+    (h, w) = depth_buf.shape
+
+    # ограничивающие прямоугольники в координатах части плоскости
+    ids = np.asarray(ids)
+    clip = box[ids] - (x_0, y_0, x_0, y_0)
+    np.maximum(clip[:, :2], 0, out = clip[:, :2])
+    np.minimum(clip[:, 2], w - 1, out = clip[:, 2])
+    np.minimum(clip[:, 3], h - 1, out = clip[:, 3])
+    (bw, bh) = (clip[:, 2] - clip[:, 0] + 1, clip[:, 3] - clip[:, 1] + 1)
+    keep = (bw > 0) & (bh > 0)
+    (ids, clip, bw, bh) = (ids[keep], clip[keep], bw[keep], bh[keep])
+    pixels = bw * bh
+
+    for t in ids[pixels > small].tolist():
+        (x_min, y_min, x_max, y_max) = (max(box[t, 0] - x_0, 0), max(box[t, 1] - y_0, 0), min(box[t, 2] - x_0, w - 1), min(box[t, 3] - y_0, h - 1))
+        xs = np.arange(x_min + x_0, x_max + x_0 + 1, dtype = np.float64)
+        ys = np.arange(y_min + y_0, y_max + y_0 + 1, dtype = np.float64)[:, None]
+        e = [a[t, k] * xs + b[t, k] * ys + c[t, k] for k in range(3)]
+        covered = (e[0] >= 0) & (e[1] >= 0) & (e[2] >= 0)
+        d = -((e[0] * z[t, 0] + e[1] * z[t, 1] + e[2] * z[t, 2]) / area[t])
+
+        window = (slice(y_min, y_max + 1), slice(x_min, x_max + 1))
+        (depth_view, id_view) = (depth_buf[window], id_buf[window])
+        win = covered & (np.less(d, depth_view) | ((d == depth_view) & (t < id_view)))
+        if (_stats is not None):
+            _stats.count('pixels tested', covered.size)
+            _stats.count('pixels covered', np.count_nonzero(covered))
+            _stats.count('depth test passes', np.count_nonzero(win))
+        depth_view[win] = d[win]
+        id_view[win] = t
+        if (shade is None):
+            color_buf[window][win] = colors[t]
+        else:
+            light = ((e[0] * shade[t, 0] + e[1] * shade[t, 1] + e[2] * shade[t, 2]) / area[t])[win]
+            color_buf[window][win] = colors[t] * light.reshape((-1,) + (1,) * (colors.ndim - 1))
+
+    # маленькие треугольники: пакеты пикселей всех их ограничивающих прямоугольников
+    small_ids = np.flatnonzero(pixels <= small)
+    bounds = np.searchsorted(np.cumsum(pixels[small_ids]), np.arange(batch, pixels[small_ids].sum() + batch, batch), 'right')
+    for (i, j) in zip(np.concatenate(([0], bounds[:-1])), bounds):
+        part = small_ids[i:j]
+        if (part.size == 0):
+            continue
+        n = pixels[part]
+        owner = np.repeat(np.arange(part.size), n)
+        offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        (px, py) = (clip[part, 0][owner] + offset % bw[part][owner], clip[part, 1][owner] + offset // bw[part][owner])
+        t_all = ids[part][owner]
+
+        (xs, ys) = ((px + x_0).astype(np.float64), (py + y_0).astype(np.float64))
+        e = [a[t_all, k] * xs + b[t_all, k] * ys + c[t_all, k] for k in range(3)]
+        covered = (e[0] >= 0) & (e[1] >= 0) & (e[2] >= 0)
+        d = -((e[0] * z[t_all, 0] + e[1] * z[t_all, 1] + e[2] * z[t_all, 2]) / area[t_all])
+        (flat, d, t) = ((py * w + px)[covered], d[covered], t_all[covered])
+        if (_stats is not None):
+            _stats.count('pixels tested', covered.size)
+            _stats.count('pixels covered', flat.size)
+
+        if (shade is not None):
+            light = ((e[0] * shade[t_all, 0] + e[1] * shade[t_all, 1] + e[2] * shade[t_all, 2]) / area[t_all])[covered]
+
+        # в пределах пакета в каждом пикселе остается ближайший фрагмент (при равной глубине - с меньшим номером)
+        order = np.lexsort((t, d, flat))
+        first = np.ones(flat.size, bool)
+        first[1:] = flat[order][1:] != flat[order][:-1]
+        order = order[first]
+        (flat, d, t) = (flat[order], d[order], t[order])
+
+        # буферы могут быть частью большего массива, поэтому запись идет по двумерным индексам
+        (fy, fx) = np.divmod(flat, w)
+        current = depth_buf[fy, fx]
+        win = np.less(d, current) | ((d == current) & (t < id_buf[fy, fx]))
+        if (_stats is not None):
+            _stats.count('depth test passes', np.count_nonzero(win))
+        (fy, fx, d, t) = (fy[win], fx[win], d[win], t[win])
+        depth_buf[fy, fx] = d
+        id_buf[fy, fx] = t
+        if (shade is None):
+            color_buf[fy, fx] = colors[t]
+        else:
+            color_buf[fy, fx] = colors[t] * light[order][win].reshape((-1,) + (1,) * (colors.ndim - 1))
+
+def zbuffer_clipper_with_light(obj_file, image : Image, light = (0, 0, 1), ambient = 0.1, smooth = True, color = 255, workers = 1):
+# функция отсечения невидимых граней с помощью Z буффера с освещением по закону Ламберта
+#
+# нормали граней вычисляются сразу для всех граней по обходу их вершин (_face_normals), нормали вершин -
+# суммы нормалей прилегающих граней, взвешенные по площади; нормали переводятся в систему вида матрицей нормалей
+# вида, яркость I = ambient + (1 - ambient) * max((n, l), 0) вычисляется сразу для всех вершин (закраска Гуро)
+# или граней (плоская закраска) и интерполируется внутри треугольников при растеризации
+#
+# параметры:
+#   obj_file - путь до файла OBJ
+#   image - растровая плоскость
+#   light - направление на источник света в системе вида (по умолчанию - на наблюдателя, видимая точка - с наибольшим z)
+#   ambient - фоновая освещенность от 0 до 1
+#   smooth - закраска Гуро (True) или плоская закраска (False)
+#   color - цвет сетки
+#   workers - число процессов (1 - без пула процессов, None - число ядер); пул включается только явно,
+#             при запуске процессов через spawn вызывающий модуль должен проверять __name__ == '__main__'
+#
+    (vertices, faces) = load_obj(obj_file)
+    with _stage('transform'):
+        points = _ZBUFFER_VIEW.apply(vertices)
+    with _stage('shading'):
+        shade = _lambert_shade(_mesh_normals(vertices, faces, smooth), faces, smooth, _ZBUFFER_VIEW, light, ambient)
 
+    colors = _face_colors(color, _image_channels(image), len(faces), np.float64)
+
+    (shaded, depth, ids) = _zbuffer_render(points, faces, colors, image.size, shade, workers = workers)
+    _put_visible(image, shaded, ids)
+
+def _mesh_normals(vertices : np.ndarray, faces : np.ndarray, smooth = True):
+# нормали сетки в ее собственной системе координат
+#
+# нормали граней - _face_normals (по обходу вершин, длина - удвоенная площадь грани); нормали вершин -
+# суммы нормалей прилегающих граней, то есть взвешенные по площади
+#
+# возвращаемое значение - массив (V, 3) нормалей вершин (smooth) или (F, 3) нормалей граней
+#
+    normals = _face_normals(vertices, faces)
+    if (smooth):
+        normals = np.stack([np.bincount(faces.ravel(), np.repeat(normals[:, k], 3), len(vertices)) for k in range(3)], axis = 1)
+    return normals
+def _lambert_shade(normals : np.ndarray, faces : np.ndarray, smooth : bool, view : Transform3D, light, ambient : float):
+# яркости вершин треугольников I = ambient + (1 - ambient) * max((n, l), 0) для растеризации
+# (нормали вершин дают закраску Гуро, нормали граней - плоскую закраску)
+#
+# возвращаемое значение - массив (F, 3)
+#
+    light = np.asarray(light, np.float64) / np.linalg.norm(light)
+    shade = ambient + (1 - ambient) * np.maximum(view.apply_normals(normals) @ light, 0)
+    return shade[faces] if smooth else np.repeat(shade[:, None], 3, axis = 1)
+def _face_colors(color, channels : int, count : int, dtype = np.int64):
+# цвета граней: один цвет для всей сетки или (color = None) случайные оттенки серого (для одноканальной
+# плоскости - как в zbuffer_clipper)
+#
+# возвращаемое значение - массив (count,) для одноканальной плоскости или (count, channels)
+#
+    if (color is None):
+        colors = np.array([randint(100, 255) for _ in range(count)], dtype)
+        return colors if channels == 1 else np.repeat(colors[:, None], channels, axis = 1)
+    colors = np.repeat(_pixel_colors(color, channels, 1).astype(dtype), count, axis = 0)
+    return colors[:, 0] if channels == 1 else colors
+
+def render_animation(obj_file, views, output, size = (1000, 1000), mode = 'L', color = None, light = None,
+                     ambient = 0.1, smooth = True, workers = 1, duration = 40, loop = 0):
+# функция построения анимации сетки: кадр за кадром для последовательности положений камеры
+#
+# сетка читается и разбирается один раз, цвета граней и нормали вычисляются один раз, буферы цвета, глубины
+# и кадра выделяются один раз и очищаются перед каждым кадром, поэтому кадр - это только преобразование
+# вершин и растеризация; кадры сразу записываются на диск (PNG) или передаются PIL (GIF)
+#
+# при workers > 1 кадры строятся в пуле процессов: каждый процесс один раз читает сетку (из кэша разобранных
+# файлов, если он включен) и выделяет свои буферы, а кадры записываются в исходном порядке по мере готовности
+#
+# параметры:
+#   obj_file - путь до файла OBJ
+#   views - последовательность преобразований Transform3D или матриц 4 x 4 (сетка -> плоскость и глубина z)
+#   output - путь до файла GIF (*.gif) или шаблон имен файлов PNG с номером кадра, например 'frame_{:04d}.png'
+#   size в виде (w, h) - размер кадра
+#   mode - режим кадра: 'L' или 'RGB'
+#   color - цвет сетки (None - случайные оттенки серого для граней без освещения, белый с освещением)
+#   light - направление на источник света в системе вида (None - без освещения, как zbuffer_clipper)
+#   ambient - фоновая освещенность от 0 до 1
+#   smooth - закраска Гуро (True) или плоская закраска (False)
+#   workers - число процессов (1 - без пула процессов, None - число ядер)
+#   duration - длительность кадра GIF в миллисекундах
+#   loop - число повторов GIF (0 - бесконечно)
+#
+# возвращаемое значение - число построенных кадров
+#
+# пример поворота вокруг Oy:
+#   views = [Transform3D().rotate_y(phi).scale((300, 400, 400)).shift((500, 500, 0)) for phi in range(0, 360, 10)]
+#   render_animation('model.obj', views, 'turn.gif')
+#
+    if (mode not in ('L', 'RGB')):
+        raise ValueError(f"unsupported animation mode {mode!r}")
+    matrices = [view.matrix if isinstance(view, _AffineTransform) else np.asarray(view, np.float64) for view in views]
+
+    channels = FrameBuffer.MODES[mode][0]
+    (_, faces) = load_obj(obj_file)
+    if (color is None and light is not None):
+        color = 255
+    colors = _face_colors(color, channels, len(faces), np.int64 if light is None else np.float64)
+    args = (obj_file, colors, tuple(size), mode, light, ambient, smooth)
+
+    workers = workers or os.cpu_count()
+    if (workers == 1):
+        frames = map(_AnimationFrames(*args).render, matrices)
+        return _write_frames(frames, output, mode, duration, loop)
+
+    with ProcessPoolExecutor(max_workers = workers, initializer = _animation_init, initargs = args) as pool:
+        return _write_frames(pool.map(_animation_frame, matrices), output, mode, duration, loop)
+
+class _AnimationFrames:
+# состояние построения кадров анимации: сетка, цвета, нормали и буферы, общие для всех кадров
+#
+    def __init__(self, obj_file, colors : np.ndarray, size : tuple[int, int], mode : str, light, ambient : float, smooth : bool):
+        (self.vertices, self.faces) = load_obj(obj_file)
+        (self.colors, self.size, self.light, self.ambient, self.smooth) = (colors, size, light, ambient, smooth)
+        self.normals = _mesh_normals(self.vertices, self.faces, smooth) if light is not None else None
+
+        (w, h) = size
+        self.buffers = _zbuffer_buffers((h, w), colors)
+        self.frame = np.zeros(self.buffers[0].shape, np.uint8)
+
+    def render(self, matrix : np.ndarray):
+    # построение кадра для матрицы вида (возвращаемый массив кадра переиспользуется следующим кадром)
+        view = Transform3D(matrix)
+        with _stage('shading'):
+            shade = _lambert_shade(self.normals, self.faces, self.smooth, view, self.light, self.ambient) if self.normals is not None else None
+        with _stage('transform'):
+            points = view.apply(self.vertices)
+        (color_buf, _, _) = _zbuffer_render(points, self.faces, self.colors, self.size, shade, buffers = self.buffers)
+        if (shade is not None):
+            np.rint(color_buf, out = color_buf)
+            np.clip(color_buf, 0, 255, out = color_buf)
+        np.copyto(self.frame, color_buf, casting = 'unsafe')
+        return self.frame
+
+_animation = None
+def _animation_init(*args):
+# инициализация процесса пула: сетка и буферы создаются один раз на процесс
+    global _animation
+    _animation = _AnimationFrames(*args)
+def _animation_frame(matrix : np.ndarray):
+    return _animation.render(matrix)
+
+def _write_frames(frames, output, mode : str, duration : int, loop : int):
+# вспомогательная функция записи кадров в файл GIF или в последовательность файлов PNG
+#
+    output = os.fspath(output)
+    if (output.lower().endswith('.gif')):
+        # кадры копируются: массив кадра переиспользуется, а PIL собирает GIF целиком перед записью
+        images = (Image.fromarray(frame).copy() for frame in frames)
+        first = next(images, None)
+        if (first is None):
+            return 0
+        rest = list(images)
+        first.save(output, save_all = True, append_images = rest, duration = duration, loop = loop)
+        return 1 + len(rest)
+
+    count = 0
+    for (count, frame) in enumerate(frames, 1):
+        Image.fromarray(frame).save(output.format(count - 1))
+    return count
+
+class Renderer:
+# сеанс построения изображений сеток для многократных вызовов (интерактивный просмотр, сервисы)
+#
+# сеанс хранит прочитанные сетки, вычисленные по ним данные (нормали, цвета граней, вершины в системе вида,
+# видимые ребра, яркости) и буферы цвета, глубины и номеров треугольников по размеру плоскости; при каждом
+# вызове пересчитывается только то, что изменилось с прошлого: файл сетки (по времени изменения и размеру),
+# вид или параметры освещения, а при полном совпадении растеризация не повторяется вовсе
+#
+# параметры:
+#   view - преобразование Transform3D или матрица 4 x 4 (сетка -> плоскость и глубина z),
+#          по умолчанию - вид zbuffer_clipper
+#   workers - число процессов растеризации (1 - без пула процессов, None - число ядер)
+#
+# пример:
+#   renderer = Renderer()
+#   for phi in range(0, 360, 10):
+#       renderer.view = Transform3D().rotate_y(phi).scale((300, 400, 400)).shift((500, 500, 0))
+#       image = FrameBuffer((1000, 1000))
+#       renderer.draw_lit('model.obj', image)
+#
+    def __init__(self, view = None, workers = 1):
+        self.view = _ZBUFFER_VIEW if view is None else view
+        self.workers = workers
+        self._meshes = {}
+        self._buffers = {}
+
+    @property
+    def view(self):
+        return self._view
+    @view.setter
+    def view(self, view):
+        self._view = view if isinstance(view, Transform3D) else Transform3D(view)
+        self._view_key = self._view.matrix.tobytes()
+
+    def mesh(self, obj_file):
+    # сетка сеанса: читается при первом обращении и после изменения файла
+        path = os.path.abspath(os.fspath(obj_file))
+        stat = os.stat(path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        mesh = self._meshes.get(path)
+        if (mesh is None or mesh.stamp != stamp):
+            mesh = self._meshes[path] = _RendererMesh(path, stamp, *load_obj(path, return_polygons = True))
+        return mesh
+    def clear(self):
+    # освобождение сеток и буферов сеанса
+        self._meshes.clear()
+        self._buffers.clear()
+
+    def draw_wireframe(self, obj_file, image : Image, color = 255):
+    # видимые ребра сетки по алгоритму Роджерса в системе вида сеанса: грань видима, если ее нормаль
+    # направлена к наблюдателю со стороны +z, как в Z буфере сеанса, где видима точка с наибольшим z: n_z > 0
+    # (то же правило, что в roggers_clipper, поэтому с единичным видом np.eye(4) результат совпадает с ним)
+        mesh = self.mesh(obj_file)
+        if (len(mesh.faces) == 0):
+            return
+        (points, edges) = mesh.edges(self._view, self._view_key)
+        xy = points[:, :2].astype(np.int64)
+        bresenham_lines(np.concatenate((xy[edges[:, 0]], xy[edges[:, 1]]), axis = 1), image, color)
+
+    def draw_zbuffer(self, obj_file, image : Image, color = None):
+    # отсечение невидимых граней с помощью Z буффера (как zbuffer_clipper; color = None - случайные оттенки
+    # серого, постоянные для сетки в пределах сеанса)
+        mesh = self.mesh(obj_file)
+        channels = _image_channels(image)
+        colors = mesh.colors(color, channels, np.int64)
+        key = ('zbuffer', mesh.stamp, self._view_key, repr(color))
+        (shaded, ids) = self._render(mesh, image.size, colors, None, key)
+        _put_visible(image, shaded, ids)
+
+    def draw_lit(self, obj_file, image : Image, light = (0, 0, 1), ambient = 0.1, smooth = True, color = 255):
+    # отсечение невидимых граней с освещением по закону Ламберта (как zbuffer_clipper_with_light)
+        mesh = self.mesh(obj_file)
+        channels = _image_channels(image)
+        colors = mesh.colors(color, channels, np.float64)
+        key = ('lit', mesh.stamp, self._view_key, repr(color), tuple(np.ravel(light).tolist()), ambient, bool(smooth))
+        shade = lambda: _lambert_shade(mesh.normals(smooth), mesh.faces, smooth, self._view, light, ambient)
+        (shaded, ids) = self._render(mesh, image.size, colors, shade, key)
+        _put_visible(image, shaded, ids)
+
+    def _render(self, mesh, size : tuple[int, int], colors : np.ndarray, shade, key : tuple):
+    # растеризация в буферы сеанса для данного размера и типа цвета; при совпадении ключа с прошлой
+    # растеризацией в эти буферы возвращается ее результат (shade - функция, вычисляющая яркости, или None)
+        slot = (tuple(size), colors.shape[1:], colors.dtype.str)
+        (w, h) = size
+        if (slot not in self._buffers):
+            self._buffers[slot] = [_zbuffer_buffers((h, w), colors), None]
+        (buffers, last) = self._buffers[slot]
+        key = (mesh.path,) + key
+        if (last != key):
+            self._buffers[slot][1] = None
+            points = mesh.points(self._view, self._view_key)
+            if (shade is not None):
+                with _stage('shading'):
+                    shade = shade()
+            _zbuffer_render(points, mesh.faces, colors, size, shade, self.workers, buffers = buffers)
+            self._buffers[slot][1] = key
+        return (buffers[0], buffers[2])
+
+class _RendererMesh:
+# сетка сеанса Renderer и вычисленные по ней данные
+# (данные, зависящие от вида, хранятся для последнего вида)
+#
+    def __init__(self, path, stamp : tuple, vertices : np.ndarray, faces : np.ndarray, polygons : np.ndarray):
+        (self.path, self.stamp) = (path, stamp)
+        (self.vertices, self.faces, self.polygons) = (vertices, faces, polygons)
+        self._normals = {}
+        self._colors = {}
+        self._points = (None, None)
+        self._edges = (None, None)
+
+    def normals(self, smooth : bool):
+        smooth = bool(smooth)
+        if (smooth not in self._normals):
+            self._normals[smooth] = _mesh_normals(self.vertices, self.faces, smooth)
+        return self._normals[smooth]
+
+    def colors(self, color, channels : int, dtype):
+        key = (repr(color), channels, np.dtype(dtype).str)
+        if (key not in self._colors):
+            self._colors[key] = _face_colors(color, channels, len(self.faces), dtype)
+        return self._colors[key]
+
+    def points(self, view : Transform3D, view_key : bytes):
+        if (self._points[0] != view_key):
+            with _stage('transform'):
+                self._points = (view_key, view.apply(self.vertices))
+        return self._points[1]
+
+    def edges(self, view : Transform3D, view_key : bytes):
+        if (self._edges[0] != view_key):
+            visible = view.apply_normals(self.normals(False), normalize = False) @ np.array([0, 0, 1.0]) > 0
+            self._edges = (view_key, _visible_edges(self.faces, self.polygons, visible))
+        return (self.points(view, view_key), self._edges[1])
+
+class RenderStats:
+# результаты замеров построения изображений, собранные внутри profile()
+#
+# поля:
+#   stages - словарь {этап: [суммарное время в секундах, число вызовов]}
+#   counters - словарь {счетчик: значение}
+#   events - события для временной шкалы: (этап, начало в наносекундах perf_counter, длительность, pid)
+#
+# этапы: load_obj, parse_obj (разбор текста при промахе кэша), transform (преобразование вершин),
+# shading (нормали и яркости), setup (функции ребер треугольников), binning (распределение по плиткам),
+# raster (растеризация; в процессах пула - raster tiles), write (запись в растровую плоскость),
+# для roggers_clipper - culling, edges и draw;
+# счетчики: triangles, triangles culled (roggers_clipper: нелицевые грани), triangles offscreen (Z буфер:
+# треугольники, ограничивающий прямоугольник которых пуст или целиком вне плоскости; нелицевые грани
+# Z буфер не отбрасывает), pixels tested (пиксели ограничивающих прямоугольников), pixels covered,
+# depth test passes, pixels written, edges drawn, mesh cache hits, mesh cache misses
+#
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.events = []
+        self.origin = time.perf_counter_ns()
+
+    @contextmanager
+    def stage(self, name : str):
+    # замер этапа (этапы могут быть вложенными)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            total = self.stages.setdefault(name, [0.0, 0])
+            total[0] += elapsed / 1e9
+            total[1] += 1
+            self.events.append((name, start, elapsed, os.getpid()))
+    def count(self, name : str, n = 1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+    def merge(self, other):
+    # добавление замеров other (например, собранных в процессе пула)
+        for (name, (seconds, calls)) in other.stages.items():
+            total = self.stages.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += calls
+        for (name, n) in other.counters.items():
+            self.count(name, n)
+        self.events.extend(other.events)
+
+    def to_dict(self):
+        return {'stages': {name: {'seconds': seconds, 'calls': calls} for (name, (seconds, calls)) in self.stages.items()},
+                'counters': dict(self.counters)}
+    def to_json(self, path = None):
+    # замеры в формате JSON (строка или запись в файл path)
+        text = json.dumps(self.to_dict(), indent = 2)
+        if (path is None):
+            return text
+        with open(path, 'w') as file:
+            file.write(text)
+    def to_trace(self, path = None):
+    # события в формате Chrome Trace (chrome://tracing, Perfetto): этапы - события 'X', счетчики - события 'C'
+    # в конце шкалы; возвращается словарь или он записывается в файл path
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self.origin) / 1e3, 'dur': elapsed / 1e3, 'pid': pid, 'tid': pid}
+                  for (name, start, elapsed, pid) in self.events]
+        end = max((event['ts'] + event['dur'] for event in events), default = 0)
+        events += [{'name': name, 'ph': 'C', 'ts': end, 'pid': os.getpid(), 'args': {'value': n}} for (name, n) in self.counters.items()]
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if (path is None):
+            return trace
+        with open(path, 'w') as file:
+            json.dump(trace, file)
+
+    def __str__(self):
+        lines = [f'{name:16} {seconds * 1e3:10.3f} ms  {calls:6} calls' for (name, (seconds, calls)) in self.stages.items()]
+        lines += [f'{name:16} {n:14}' for (name, n) in self.counters.items()]
+        return '\n'.join(lines)
+
+_stats = None
+_NO_STAGE = nullcontext()
+
+@contextmanager
+def profile():
+# включение замеров для всех вызовов функций построения изображений сеток внутри блока with
+# (без profile замеры выключены: в каждом этапе остается только проверка _stats is None)
+#
+# возвращаемое значение - RenderStats, заполняемый по ходу выполнения блока
+# (вложенный блок собирает свои замеры и по завершении добавляет их во внешний)
+#
+# пример:
+#   with profile() as stats:
+#       zbuffer_clipper('model.obj', image)
+#   print(stats)
+#   stats.to_trace('render.json')
+#
+    global _stats
+    (outer, _stats) = (_stats, RenderStats())
+    stats = _stats
+    try:
+        yield stats
+    finally:
+        _stats = outer
+        if (outer is not None):
+            outer.merge(stats)
+
+def _stage(name : str):
+# замер этапа при включенных замерах, иначе - пустой контекст
+    return _stats.stage(name) if _stats is not None else _NO_STAGE
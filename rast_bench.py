@@ -0,0 +1,335 @@
+# Набор тестов производительности для модуля rast_alg
+#
+# Каждый тест строит синтетические входные данные (случайные отрезки, окружности, шумовые и "фотографические"
+# изображения, лабиринты, сетки сфер и торов), измеряет время работы примитива и пиковый расход памяти
+# и пересчитывает их в пропускную способность: пиксели/с, отрезки/с, окружности/с, треугольники/с.
+#
+# Использование:
+#
+#   python rast_bench.py run [-o results.json] [-k zbuffer] [--repeat 3] [--full]
+#       запуск тестов (-k - подстрока имени теста, --full - добавить сетки из 1M треугольников)
+#
+#   python rast_bench.py compare baseline.json [results.json] [--threshold 0.1]
+#       сравнение с сохраненными результатами (без results.json тесты запускаются заново);
+#       замедление или рост памяти больше порога отмечается, и код возврата становится равен 1
+#
+# Время - минимум из repeat запусков после одного прогревочного, пиковая память измеряется
+# отдельным запуском под tracemalloc (чтобы трассировка не искажала время).
+#
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+import rast_alg
+
+
+#
+# генераторы входных данных
+#
+
+def random_segments(n : int, size : tuple[int, int], rng : np.random.Generator, margin = 0.25):
+# случайные отрезки (N, 4), концы которых с запасом margin выходят за пределы плоскости
+    (w, h) = size
+    low = (-margin * w, -margin * h) * 2
+    high = ((1 + margin) * w, (1 + margin) * h) * 2
+    return rng.uniform(low, high, (n, 4)).astype(np.int64)
+
+def noise_image(size : tuple[int, int], rng : np.random.Generator):
+# изображение из равномерного шума (худший случай для фильтров)
+    (w, h) = size
+    return Image.fromarray(rng.integers(0, 256, (h, w, 3), np.uint8), 'RGB')
+
+def photo_image(size : tuple[int, int], rng : np.random.Generator):
+# изображение, похожее на фотографию: плавные градиенты, несколько размытых пятен и слабый шум
+    (w, h) = size
+    (y, x) = np.mgrid[0:h, 0:w].astype(np.float32)
+    pixels = np.zeros((h, w, 3), np.float32)
+    pixels += (x / w * 120)[..., None] + (y / h * 60)[..., None]
+    for _ in range(12):
+        (cx, cy, r) = (rng.uniform(0, w), rng.uniform(0, h), rng.uniform(0.05, 0.3) * min(w, h))
+        blob = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * r * r))
+        pixels += blob[..., None] * rng.uniform(-120, 120, 3).astype(np.float32)
+    pixels += rng.normal(0, 4, pixels.shape).astype(np.float32)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGB')
+
+def maze_image(size : tuple[int, int], rng : np.random.Generator, cell = 8):
+# лабиринт: сетка стен толщиной в 1 пиксель со случайными проходами, так что почти вся плоскость - одна
+# извилистая область (много коротких отрезков заливки)
+    (w, h) = size
+    pixels = np.full((h, w), 255, np.uint8)
+    pixels[::cell, :] = 0
+    pixels[:, ::cell] = 0
+    (rows, cols) = (-(-h // cell), -(-w // cell))
+
+    # в каждой клетке открывается проход вправо или вниз (двоичное дерево - связный лабиринт)
+    right = rng.random((rows, cols)) < 0.5
+    right[-1, :] = True
+    right[:, -1] = False
+    right[-1, -1] = False
+    for (i, j) in zip(*np.nonzero(right)):
+        pixels[i * cell + 1 : (i + 1) * cell, min((j + 1) * cell, w - 1)] = 255
+    for (i, j) in zip(*np.nonzero(~right)):
+        pixels[min((i + 1) * cell, h - 1), j * cell + 1 : (j + 1) * cell] = 255
+    return Image.fromarray(pixels, 'L')
+
+def sphere_mesh(triangles : int):
+# сфера радиуса 0.8 из примерно triangles треугольников (вершины - массив (V, 3), грани - (F, 3))
+    n = max(int(np.sqrt(triangles / 4)), 2)
+    (theta, phi) = np.meshgrid(np.linspace(0, np.pi, n + 1), np.linspace(0, 2 * np.pi, 2 * n, endpoint = False), indexing = 'ij')
+    vertices = 0.8 * np.stack((np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)), axis = -1).reshape(-1, 3)
+    return (vertices, _grid_faces(n + 1, 2 * n))
+
+def torus_mesh(triangles : int):
+# тор с радиусами 0.6 и 0.25 из примерно triangles треугольников
+    n = max(int(np.sqrt(triangles / 4)), 2)
+    (u, v) = np.meshgrid(np.linspace(0, 2 * np.pi, 2 * n, endpoint = False), np.linspace(0, 2 * np.pi, n, endpoint = False), indexing = 'ij')
+    ring = 0.6 + 0.25 * np.cos(v)
+    vertices = np.stack((ring * np.cos(u), 0.25 * np.sin(v), ring * np.sin(u)), axis = -1).reshape(-1, 3)
+    return (vertices, _grid_faces(2 * n, n, wrap_rows = True))
+
+def _grid_faces(rows : int, cols : int, wrap_rows = False):
+# треугольники сетки rows x cols вершин, замкнутой по столбцам (и по строкам при wrap_rows)
+    index = np.arange(rows * cols).reshape(rows, cols)
+    right = np.roll(index, -1, axis = 1)
+    (down, down_right) = (np.roll(index, -1, axis = 0), np.roll(right, -1, axis = 0))
+    if (not wrap_rows):
+        (index, right, down, down_right) = (index[:-1], right[:-1], down[:-1], down_right[:-1])
+    quads = np.stack((index, right, down_right, down), axis = -1).reshape(-1, 4)
+    return np.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]))
+
+def write_obj(path, vertices : np.ndarray, faces : np.ndarray):
+# запись сетки в файл OBJ
+    with open(path, 'w') as file:
+        np.savetxt(file, vertices, fmt = 'v %.6f %.6f %.6f')
+        np.savetxt(file, faces + 1, fmt = 'f %d %d %d')
+
+
+#
+# тесты: каждый возвращает список (имя, единица, объем работы, функция подготовки, функция замера)
+# (функция подготовки вызывается перед каждым запуском и не входит в замер, ее результат передается
+# функции замера)
+#
+
+SIZE = (1000, 1000)
+MESH_SIZES = (1_000, 10_000, 100_000)
+FULL_MESH_SIZES = MESH_SIZES + (1_000_000,)
+
+def lines_cases(rng, workdir, full):
+    segments = random_segments(20_000, SIZE, rng)
+    few = segments[:2_000]
+    canvas = lambda: rast_alg.FrameBuffer(SIZE)
+    window = ((200, 150), (800, 250), (900, 700), (450, 900), (100, 600))
+    clip_window = rast_alg.ConvexClipWindow(window)
+    (x_min, x_max, y_min, y_max) = (200, 800, 150, 850)
+
+    def single(draw):
+        def run(image):
+            for s in few.tolist():
+                draw(((s[0], s[1]), (s[2], s[3])), image)
+        return run
+
+    return [
+        ('bresenham_line', 'segments', len(few), canvas, single(rast_alg.bresenham_line)),
+        ('bresenham_lines', 'segments', len(segments), canvas, lambda image: rast_alg.bresenham_lines(segments, image)),
+        ('cohen_sutherland_clipper', 'segments', len(few), canvas,
+            single(lambda line, image: rast_alg.cohen_sutherland_clipper(line, x_min, x_max, y_min, y_max, image, False))),
+        ('liang_barsky_clipper', 'segments', len(few), canvas,
+            single(lambda line, image: rast_alg.liang_barsky_clipper(line, x_min, x_max, y_min, y_max, image, False))),
+        ('cyrus_beck_clipper', 'segments', len(few), canvas,
+            single(lambda line, image: rast_alg.cyrus_beck_clipper(line, window, image, False))),
+        ('cohen_sutherland_clip', 'segments', len(segments), None,
+            lambda _: rast_alg.cohen_sutherland_clip(segments, x_min, x_max, y_min, y_max)),
+        ('liang_barsky_clip', 'segments', len(segments), None,
+            lambda _: rast_alg.liang_barsky_clip(segments, x_min, x_max, y_min, y_max)),
+        ('ConvexClipWindow.clip', 'segments', len(segments), None, lambda _: clip_window.clip(segments)),
+    ]
+
+def circles_cases(rng, workdir, full):
+    n = 20_000
+    centers = rng.integers(0, SIZE[0], (n, 2))
+    radii = rng.integers(1, 60, n)
+    canvas = lambda: rast_alg.FrameBuffer(SIZE)
+    return [
+        ('bresenham_circles', 'circles', n, canvas, lambda image: rast_alg.bresenham_circles(centers, radii, image)),
+        ('bresenham_circles_fill', 'circles', n // 10, canvas,
+            lambda image: rast_alg.bresenham_circles(centers[:n // 10], radii[:n // 10], image, fill = True)),
+    ]
+
+def sobel_cases(rng, workdir, full):
+    cases = []
+    for (name, image) in (('noise', noise_image(SIZE, rng)), ('photo', photo_image(SIZE, rng))):
+        source = os.path.join(workdir, f'sobel_{name}.png')
+        image.save(source)
+        target = os.path.join(workdir, f'sobel_{name}_out.png')
+        pixels = np.asarray(image)
+        cases.append((f'sobel_filter[{name}]', 'pixels', SIZE[0] * SIZE[1], None,
+                      lambda _, source = source, target = target: rast_alg.sobel_filter(source, target, show = False)))
+        cases.append((f'sobel_array[{name}]', 'pixels', SIZE[0] * SIZE[1], None,
+                      lambda _, pixels = pixels: rast_alg.sobel_array(pixels)))
+    return cases
+
+def fill_cases(rng, workdir, full):
+    maze = rast_alg.FrameBuffer.from_image(maze_image(SIZE, rng))
+    seed = (1, 1)
+    area = int((np.array(rast_alg.line_fill(maze, None, seed, 128)) == 128).sum())
+    open_image = rast_alg.FrameBuffer(SIZE, color = 255)
+    return [
+        ('line_fill[maze]', 'pixels', area, None, lambda _: rast_alg.line_fill(maze, None, seed, 128)),
+        ('line_fill[open]', 'pixels', SIZE[0] * SIZE[1], None, lambda _: rast_alg.line_fill(open_image, None, seed, 128)),
+    ]
+
+def mesh_cases(rng, workdir, full):
+    cases = []
+    for triangles in (FULL_MESH_SIZES if full else MESH_SIZES):
+        for (shape, generate) in (('sphere', sphere_mesh), ('torus', torus_mesh)):
+            (vertices, faces) = generate(triangles)
+            path = os.path.join(workdir, f'{shape}_{triangles}.obj')
+            write_obj(path, vertices, faces)
+            label = f'{shape},{_short(triangles)}'
+            count = len(faces)
+            canvas = lambda: Image.new('L', SIZE)
+            cases += [
+                (f'load_obj[{label}]', 'triangles', count, None, lambda _, path = path: rast_alg.load_obj(path, cache = False)),
+                (f'roggers_clipper[{label}]', 'triangles', count, canvas,
+                    lambda image, path = path: rast_alg.roggers_clipper(path, image)),
+                (f'zbuffer_clipper[{label}]', 'triangles', count, canvas,
+                    lambda image, path = path: rast_alg.zbuffer_clipper(path, image, workers = 1)),
+                (f'zbuffer_clipper_with_light[{label}]', 'triangles', count, canvas,
+                    lambda image, path = path: rast_alg.zbuffer_clipper_with_light(path, image, workers = 1)),
+            ]
+    return cases
+
+SUITES = (lines_cases, circles_cases, sobel_cases, fill_cases, mesh_cases)
+
+def _short(n : int):
+    return f'{n // 1_000_000}M' if n >= 1_000_000 else f'{n // 1_000}k'
+
+
+#
+# запуск и сравнение
+#
+
+def measure(prepare, run, repeat : int):
+# функция замера одного теста
+#
+# возвращаемое значение - (минимальное время в секундах, пиковая память в байтах)
+#
+    def once():
+        state = prepare() if prepare is not None else None
+        start = time.perf_counter()
+        run(state)
+        return time.perf_counter() - start
+
+    once()
+    seconds = min(once() for _ in range(repeat))
+
+    state = prepare() if prepare is not None else None
+    tracemalloc.start()
+    try:
+        run(state)
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (seconds, peak)
+
+def run_benchmarks(keyword = None, repeat = 3, full = False, seed = 0, log = sys.stderr):
+# функция запуска всех тестов, имя которых содержит keyword
+#
+# возвращаемое значение - словарь с описанием окружения ('meta') и списком результатов ('results')
+#
+    rng = np.random.default_rng(seed)
+    results = []
+    with tempfile.TemporaryDirectory(prefix = 'rast_bench_') as workdir:
+        # разобранные сетки кэшируются во временном каталоге, а не в пользовательском кэше
+        (saved_cache, rast_alg.mesh_cache) = (rast_alg.mesh_cache, rast_alg.MeshCache(os.path.join(workdir, 'cache')))
+        try:
+            for suite in SUITES:
+                for (name, unit, amount, prepare, run) in suite(rng, workdir, full):
+                    if (keyword and keyword not in name):
+                        continue
+                    (seconds, peak) = measure(prepare, run, repeat)
+                    results.append({'name': name, 'unit': unit, 'amount': amount, 'seconds': seconds,
+                                    'throughput': amount / seconds if seconds > 0 else float('inf'), 'peak_bytes': peak})
+                    if (log is not None):
+                        print(f'{name:44} {_rate(amount / seconds)} {unit}/s  {seconds * 1e3:10.2f} ms  {peak / 2 ** 20:8.1f} MiB',
+                              file = log, flush = True)
+        finally:
+            rast_alg.mesh_cache = saved_cache
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'repeat': repeat, 'seed': seed, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return {'meta': meta, 'results': results}
+
+def compare(baseline : dict, current : dict, threshold = 0.1):
+# функция сравнения результатов с сохраненными
+#
+# возвращаемое значение - список строк (имя, отношение времени, отношение памяти, признак ухудшения)
+# для тестов, которые есть в обоих наборах
+#
+    before = {result['name']: result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = before.get(result['name'])
+        if (old is None):
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] > 0 else float('inf')
+        memory_ratio = (result['peak_bytes'] + 1) / (old['peak_bytes'] + 1)
+        rows.append((result['name'], time_ratio, memory_ratio, time_ratio > 1 + threshold or memory_ratio > 1 + threshold))
+    return rows
+
+def _rate(value : float):
+    for (scale, suffix) in ((1e9, 'G'), (1e6, 'M'), (1e3, 'k')):
+        if (value >= scale):
+            return f'{value / scale:9.2f}{suffix}'
+    return f'{value:9.2f} '
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'rast_alg benchmarks')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+
+    run_parser = commands.add_parser('run', help = 'run the benchmarks')
+    compare_parser = commands.add_parser('compare', help = 'compare against a stored baseline')
+    compare_parser.add_argument('baseline', help = 'baseline JSON file')
+    compare_parser.add_argument('current', nargs = '?', help = 'results JSON file (default: run the benchmarks now)')
+    compare_parser.add_argument('--threshold', type = float, default = 0.1, help = 'allowed relative slowdown (default 0.1)')
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('-o', '--output', help = 'write the results to this JSON file')
+        sub.add_argument('-k', '--keyword', help = 'run only benchmarks whose name contains this substring')
+        sub.add_argument('--repeat', type = int, default = 3, help = 'timed runs per benchmark (default 3)')
+        sub.add_argument('--full', action = 'store_true', help = 'include 1M-triangle meshes')
+        sub.add_argument('--seed', type = int, default = 0, help = 'random seed for the generated inputs')
+    args = parser.parse_args(argv)
+
+    if (args.command == 'compare' and args.current):
+        with open(args.current) as file:
+            current = json.load(file)
+    else:
+        current = run_benchmarks(args.keyword, args.repeat, args.full, args.seed)
+
+    if (args.output):
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent = 2)
+    elif (args.command == 'run'):
+        json.dump(current, sys.stdout, indent = 2)
+        print()
+
+    if (args.command == 'compare'):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        rows = compare(baseline, current, args.threshold)
+        for (name, time_ratio, memory_ratio, worse) in rows:
+            print(f'{name:44} time x{time_ratio:6.2f}  memory x{memory_ratio:6.2f}  {"REGRESSION" if worse else "ok"}')
+        return 1 if any(row[3] for row in rows) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# rast_alg - одиночный модуль в корне репозитория, без пакетной установки
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import rast_alg
+from rast_alg import FrameBuffer, Transform3D
+from rast_bench import torus_mesh, write_obj
+
+
+VIEWS = [Transform3D().rotate_y(phi).rotate_x(30).scale((150, 200, 200)).shift((160, 120, 0)) for phi in range(0, 360, 60)]
+
+@pytest.fixture
+def mesh_file(tmp_path):
+    path = str(tmp_path / 'torus.obj')
+    write_obj(path, *torus_mesh(2000))
+    return path
+
+def read_frames(pattern, count):
+    return [np.asarray(Image.open(pattern.format(i))) for i in range(count)]
+
+@pytest.mark.parametrize('mode', ['L', 'RGB'])
+def test_frames_match_renderer(tmp_path, mesh_file, mode):
+    pattern = str(tmp_path / 'frame_{:02d}.png')
+    count = rast_alg.render_animation(mesh_file, VIEWS, pattern, size = (320, 240), mode = mode, light = (0, 0, 1))
+
+    assert count == len(VIEWS)
+    renderer = rast_alg.Renderer()
+    for (view, frame) in zip(VIEWS, read_frames(pattern, count)):
+        renderer.view = view
+        image = FrameBuffer((320, 240), mode)
+        renderer.draw_lit(mesh_file, image)
+        assert frame.any()
+        assert np.array_equal(frame, image.data)
+
+def test_pool_matches_single_process(tmp_path, mesh_file):
+    frames = []
+    for workers in (1, 2):
+        pattern = str(tmp_path / f'frame_{workers}_{{:02d}}.png')
+        count = rast_alg.render_animation(mesh_file, VIEWS, pattern, size = (320, 240), color = 200, workers = workers)
+        frames.append(read_frames(pattern, count))
+
+    assert all(np.array_equal(a, b) for (a, b) in zip(*frames))
+
+def test_gif_output(tmp_path, mesh_file):
+    path = str(tmp_path / 'turn.gif')
+    count = rast_alg.render_animation(mesh_file, [view.matrix for view in VIEWS], path, size = (320, 240), light = (0, 0, 1))
+
+    with Image.open(path) as gif:
+        assert count == gif.n_frames == len(VIEWS)
+        assert gif.size == (320, 240)
@@ -0,0 +1,40 @@
+import json
+
+import numpy as np
+
+import rast_alg
+import rast_bench
+
+
+def result(name, seconds, peak_bytes = 1000):
+    return {'name': name, 'unit': 'pixels', 'amount': 100, 'seconds': seconds, 'throughput': 100 / seconds, 'peak_bytes': peak_bytes}
+
+def test_run_benchmarks_keyword():
+    saved = rast_alg.mesh_cache
+    data = rast_bench.run_benchmarks('bresenham_circles', repeat = 1, log = None)
+
+    assert [r['name'] for r in data['results']] == ['bresenham_circles', 'bresenham_circles_fill']
+    for r in data['results']:
+        assert r['seconds'] > 0 and r['amount'] > 0 and r['peak_bytes'] >= 0
+        assert np.isclose(r['throughput'], r['amount'] / r['seconds'])
+    assert data['meta']['repeat'] == 1
+    # временный кэш сеток теста не остается в модуле
+    assert rast_alg.mesh_cache is saved
+    json.dumps(data)
+
+def test_compare_flags_regressions():
+    baseline = {'results': [result('a', 1.0), result('b', 1.0), result('c', 1.0, 1000), result('gone', 1.0)]}
+    current = {'results': [result('a', 1.05), result('b', 1.5), result('c', 1.0, 2000), result('new', 1.0)]}
+
+    rows = {name: worse for (name, _, _, worse) in rast_bench.compare(baseline, current, threshold = 0.1)}
+
+    assert rows == {'a': False, 'b': True, 'c': True}
+
+def test_main_compare_exit_code(tmp_path):
+    (baseline, current) = (tmp_path / 'baseline.json', tmp_path / 'current.json')
+    baseline.write_text(json.dumps({'results': [result('a', 1.0)]}))
+
+    current.write_text(json.dumps({'results': [result('a', 1.02)]}))
+    assert rast_bench.main(['compare', str(baseline), str(current)]) == 0
+    current.write_text(json.dumps({'results': [result('a', 2.0)]}))
+    assert rast_bench.main(['compare', str(baseline), str(current)]) == 1
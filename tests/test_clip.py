@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import rast_alg
+from rast_alg import ConvexClipWindow
+
+
+WINDOW = (10, 90, 20, 70)
+
+def random_segments(n, seed = 0):
+    segments = np.random.default_rng(seed).integers(-30, 130, size = (n, 4)).astype(np.float64)
+    # отрезки на гранях, параллельные граням снаружи, вырожденные и целиком внутри окна
+    extra = [[10, 0, 10, 100], [0, 20, 100, 20], [95, 0, 95, 100], [-5, 75, 120, 75],
+             [50, 50, 50, 50], [0, 0, 0, 0], [20, 30, 80, 60], [90, 70, 10, 20]]
+    return np.vstack((segments, extra))
+
+def window_polygon(x_min, x_max, y_min, y_max):
+    return ((x_min, y_min), (x_max, y_min), (x_max, y_max), (x_min, y_max))
+
+def test_cohen_sutherland_matches_liang_barsky():
+    segments = random_segments(2000)
+    (cs, cs_accept) = rast_alg.cohen_sutherland_clip(segments, *WINDOW)
+    (lb, lb_visible, _, _) = rast_alg.liang_barsky_clip(segments, *WINDOW)
+
+    assert np.array_equal(cs_accept, lb_visible)
+    assert np.allclose(cs[cs_accept], lb[lb_visible])
+
+@pytest.mark.parametrize('order', [1, -1])
+def test_convex_window_matches_liang_barsky(order):
+    segments = random_segments(2000, seed = 1)
+    window = ConvexClipWindow(window_polygon(*WINDOW)[::order])
+    (cb, cb_visible, cb_enter, cb_exit) = window.clip(segments)
+    (lb, lb_visible, lb_enter, lb_exit) = rast_alg.liang_barsky_clip(segments, *WINDOW)
+
+    assert np.array_equal(cb_visible, lb_visible)
+    assert np.allclose(cb[cb_visible], lb[lb_visible])
+    assert np.allclose(cb_enter[cb_visible], lb_enter[lb_visible])
+    assert np.allclose(cb_exit[cb_visible], lb_exit[lb_visible])
+
+def test_clipped_segments_stay_inside_window():
+    (x_min, x_max, y_min, y_max) = WINDOW
+    (clipped, visible, _, _) = rast_alg.liang_barsky_clip(random_segments(2000, seed = 2), *WINDOW)
+    inside = clipped[visible]
+
+    assert ((inside[:, 0::2] >= x_min - 1e-9) & (inside[:, 0::2] <= x_max + 1e-9)).all()
+    assert ((inside[:, 1::2] >= y_min - 1e-9) & (inside[:, 1::2] <= y_max + 1e-9)).all()
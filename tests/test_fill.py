@@ -0,0 +1,157 @@
+from collections import deque
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import rast_alg
+from rast_alg import FrameBuffer
+
+
+def maze(size, seed = 0):
+    # случайные стенки на сетке: много связных областей сложной формы
+    data = np.random.default_rng(seed).choice(np.array([0, 255], np.uint8), size = (size[1], size[0]), p = [0.6, 0.4])
+    return data
+
+def bfs_fill(data, start_point, color):
+    # эталонная заливка по 4 соседям обходом в ширину
+    data = data.copy()
+    (x, y) = start_point
+    target = data[y, x].copy()
+    if (np.array_equal(target, color)):
+        return data
+    queue = deque([(x, y)])
+    data[y, x] = color
+    while (queue):
+        (x, y) = queue.popleft()
+        for (u, v) in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if (0 <= u < data.shape[1] and 0 <= v < data.shape[0] and np.array_equal(data[v, u], target)):
+                data[v, u] = color
+                queue.append((u, v))
+    return data
+
+@pytest.mark.parametrize('seed', range(5))
+def test_line_fill_matches_bfs(seed):
+    data = maze((60, 40), seed)
+    start = tuple(int(v) for v in np.argwhere(data == 0)[0][::-1])
+    image = FrameBuffer.from_array(data.copy())
+
+    filled = rast_alg.line_fill(image, None, start, 128)
+
+    assert np.array_equal(np.array(filled), bfs_fill(data, start, 128))
+    assert np.array_equal(image.data, data)
+
+@pytest.mark.parametrize('source', [
+    lambda data: FrameBuffer.from_array(data),
+    lambda data: Image.fromarray(data, 'L'),
+    lambda data: Image.fromarray(data, 'L').convert('P'),
+    lambda data: Image.fromarray(data, 'L').convert('LA'),
+])
+def test_line_fill_returns_image_of_the_same_mode(source):
+    image = source(maze((30, 20), 1))
+
+    filled = rast_alg.line_fill(image, None, (0, 0), 1)
+
+    assert isinstance(filled, Image.Image)
+    assert filled.mode == image.mode and filled.size == image.size
+
+@pytest.mark.parametrize('seed', range(5))
+def test_flood_fill_matches_bfs(seed):
+    data = maze((60, 40), seed)
+    seeds = np.random.default_rng(seed).integers(0, (60, 40), size = (6, 2))
+    colors = np.arange(10, 70, 10)
+
+    expected = data.copy()
+    union = np.zeros(data.shape, bool)
+    for ((x, y), color) in zip(seeds.tolist(), colors.tolist()):
+        # все области определяются по плоскости до заливки, а при нескольких затравках в области берется последняя
+        region = bfs_fill(data, (x, y), 1 if data[y, x] != 1 else 2) != data
+        expected[region] = color
+        union |= region
+
+    image = FrameBuffer.from_array(data.copy())
+    filled = rast_alg.flood_fill(image, seeds, colors)
+
+    assert np.array_equal(image.data, expected)
+    assert filled == int(np.count_nonzero(union))
+
+def test_flood_fill_reuses_region_index():
+    data = maze((50, 50), 7)
+    image = FrameBuffer.from_array(data.copy())
+    start = tuple(int(v) for v in np.argwhere(data == 0)[0][::-1])
+
+    rast_alg.flood_fill(image, [start], 100)
+    rast_alg.flood_fill(image, [start], 200)
+    # повторная заливка той же области по кэшированной разметке совпадает с заливкой с нуля
+    assert np.array_equal(image.data, bfs_fill(data, start, 200))
+
+def test_flood_fill_on_pil_image():
+    data = maze((40, 30), 3)
+    image = Image.fromarray(data, 'L')
+    start = tuple(int(v) for v in np.argwhere(data == 255)[0][::-1])
+
+    rast_alg.flood_fill(image, [start], 7)
+
+    assert np.array_equal(np.array(image), bfs_fill(data, start, 7))
+
+def reference_interior(mask):
+    # белые пиксели маски, не достижимые по 4 соседям от белых пикселей края
+    outside = np.zeros(mask.shape, bool)
+    queue = deque((x, y) for y in range(mask.shape[0]) for x in range(mask.shape[1])
+                  if (x in (0, mask.shape[1] - 1) or y in (0, mask.shape[0] - 1)) and mask[y, x])
+    for (x, y) in queue:
+        outside[y, x] = True
+    while (queue):
+        (x, y) = queue.popleft()
+        for (u, v) in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if (0 <= u < mask.shape[1] and 0 <= v < mask.shape[0] and mask[v, u] and not outside[v, u]):
+                outside[v, u] = True
+                queue.append((u, v))
+    return (mask > 0) & ~outside
+
+def figure_masks(n, size = (60, 50)):
+    # белый фон и черные контуры окружностей и прямоугольников
+    rng = np.random.default_rng(11)
+    masks = []
+    for _ in range(n):
+        mask = FrameBuffer(size, color = 255)
+        rast_alg.bresenham_circles(rng.integers(0, 60, (3, 2)), rng.integers(3, 20, 3), mask, 0)
+        (x, y) = rng.integers(0, 40, 2)
+        rast_alg.bresenham_lines(np.array([[x, y, x + 15, y], [x + 15, y, x + 15, y + 12],
+                                           [x + 15, y + 12, x, y + 12], [x, y + 12, x, y]]), mask, 0)
+        masks.append(mask.data)
+    return masks
+
+def test_bitmask_fill_matches_reference():
+    masks = figure_masks(4)
+    image = FrameBuffer((60, 50), 'RGB', (1, 2, 3))
+
+    filled = rast_alg.bitmask_fill(image, None, masks, [(10, 0, 0), (0, 20, 0), (0, 0, 30), (40, 40, 40)])
+
+    expected = np.full((50, 60, 3), (1, 2, 3), np.uint8)
+    for (mask, color) in zip(masks, [(10, 0, 0), (0, 20, 0), (0, 0, 30), (40, 40, 40)]):
+        expected[reference_interior(mask)] = color
+    assert np.array_equal(filled.data, expected)
+    assert (image.data == (1, 2, 3)).all()
+
+def test_bitmask_fill_single_image_mask():
+    mask = figure_masks(1)[0]
+    filled = rast_alg.bitmask_fill(Image.new('L', (60, 50)), None, Image.fromarray(mask), 200)
+
+    assert reference_interior(mask).any()
+    assert np.array_equal(filled.data == 200, reference_interior(mask))
+
+def test_label_regions_matches_bfs_components():
+    data = maze((40, 30), 9)
+    (labels, count) = rast_alg.label_regions(data)
+
+    seen = np.zeros(data.shape, bool)
+    components = 0
+    for (y, x) in np.ndindex(*data.shape):
+        if (not seen[y, x]):
+            region = bfs_fill(data, (x, y), 1) == 1
+            seen |= region
+            components += 1
+            # вся область - один номер, и только она
+            assert np.array_equal(labels == labels[y, x], region)
+    assert count == components
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import rast_alg
+from rast_alg import FrameBuffer
+
+
+@pytest.mark.parametrize(('mode', 'shape', 'dtype'), [('L', (30, 40), np.uint8), ('RGB', (30, 40, 3), np.uint8),
+                                                      ('RGBA', (30, 40, 4), np.uint8), ('I', (30, 40), np.int32)])
+def test_modes(mode, shape, dtype):
+    fb = FrameBuffer((40, 30), mode, 7)
+
+    assert fb.data.shape == shape and fb.data.dtype == dtype
+    # целый цвет понимается так же, как в PIL (для многоканальных режимов - значение первого канала)
+    assert np.array_equal(fb.data, np.array(Image.new(mode, (40, 30), 7)))
+    assert fb.size == (40, 30)
+    image = fb.to_image()
+    assert image.mode == mode and image.size == (40, 30)
+    assert np.array_equal(FrameBuffer.from_image(image).data, fb.data)
+
+def test_unsupported_modes():
+    with pytest.raises(ValueError):
+        FrameBuffer((10, 10), 'P')
+    with pytest.raises(ValueError):
+        FrameBuffer.from_image(Image.new('P', (10, 10)))
+    with pytest.raises(ValueError):
+        FrameBuffer.from_array(np.zeros((10, 10), np.float32))
+
+def test_from_array_shares_memory():
+    data = np.zeros((20, 30), np.uint8)
+    fb = FrameBuffer.from_array(data)
+    fb.putpixel((3, 4), 9)
+
+    assert data[4, 3] == 9
+    assert fb.copy().data is not data
+
+def test_put_pixels_drops_pixels_outside_the_plane():
+    fb = FrameBuffer((10, 8), 'RGB')
+    x = np.array([-1, 0, 9, 10, 5])
+    y = np.array([0, 0, 7, 3, -2])
+    fb.put_pixels(x, y, np.array([[1, 1, 1], [2, 2, 2], [3, 3, 3], [4, 4, 4], [5, 5, 5]]))
+
+    assert fb.getpixel((0, 0)) == (2, 2, 2) and fb.getpixel((9, 7)) == (3, 3, 3)
+    assert np.count_nonzero(fb.data.any(axis = 2)) == 2
+
+def test_version_tracks_writes():
+    fb = FrameBuffer((10, 10))
+    version = fb.version
+    rast_alg.bresenham_line(((0, 0), (9, 9)), fb)
+    fb.touch()
+
+    assert fb.version >= version + 2
+
+@pytest.mark.parametrize('mode', ['L', 'RGB'])
+def test_primitives_match_on_image_and_framebuffer(mode):
+    color = 200 if mode == 'L' else (200, 100, 50)
+    image = Image.new(mode, (80, 60))
+    fb = FrameBuffer((80, 60), mode)
+    for target in (image, fb):
+        rast_alg.bresenham_line(((-5, 3), (90, 50)), target, color)
+        rast_alg.bresenham_circle((40, 30), 25, target, color)
+        rast_alg.bresenham_circle((70, 10), 8, target, color, fill = True)
+        rast_alg.rectangle(5, 70, 5, 55, target)
+        rast_alg.polygon(((10, 10), (30, 50), (60, 20)), target)
+
+    assert np.array_equal(np.array(image), fb.data)
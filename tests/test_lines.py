@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import rast_alg
+from rast_alg import FrameBuffer
+
+
+def random_segments(n, low, high, seed = 0):
+    return np.random.default_rng(seed).integers(low, high, size = (n, 4))
+
+def test_batch_matches_single_calls():
+    # отрезки частично выходят за пределы плоскости, есть вырожденные и вертикальные/горизонтальные
+    segments = np.vstack((random_segments(300, -40, 140), [[5, 5, 5, 5], [0, 10, 99, 10], [20, -5, 20, 120]]))
+
+    single = FrameBuffer((100, 80))
+    for (x_1, y_1, x_2, y_2) in segments.tolist():
+        rast_alg.bresenham_line(((x_1, y_1), (x_2, y_2)), single)
+
+    batch = FrameBuffer((100, 80))
+    rast_alg.bresenham_lines(segments, batch)
+
+    assert np.array_equal(single.data, batch.data)
+
+def test_batch_matches_single_calls_per_segment_colors():
+    segments = random_segments(200, -20, 120, seed = 1)
+    colors = np.random.default_rng(2).integers(1, 256, size = (segments.shape[0], 3))
+
+    single = FrameBuffer((100, 100), 'RGB')
+    for ((x_1, y_1, x_2, y_2), color) in zip(segments.tolist(), colors.tolist()):
+        rast_alg.bresenham_line(((x_1, y_1), (x_2, y_2)), single, tuple(color))
+
+    batch = FrameBuffer((100, 100), 'RGB')
+    rast_alg.bresenham_lines(segments, batch, colors)
+
+    assert np.array_equal(single.data, batch.data)
+
+def test_chunked_passes_match_one_pass():
+    segments = random_segments(500, 0, 200, seed = 3)
+
+    one_pass = FrameBuffer((200, 200))
+    rast_alg.bresenham_lines(segments, one_pass, np.arange(1, 501) % 255 + 1)
+    chunked = FrameBuffer((200, 200))
+    rast_alg.bresenham_lines(segments, chunked, np.arange(1, 501) % 255 + 1, chunk = 64)
+
+    assert np.array_equal(one_pass.data, chunked.data)
+
+def test_pil_image_matches_framebuffer():
+    segments = random_segments(100, -10, 70, seed = 4)
+
+    image = Image.new('L', (64, 48))
+    rast_alg.bresenham_lines(segments, image)
+    fb = FrameBuffer((64, 48))
+    rast_alg.bresenham_lines(segments, fb)
+
+    assert np.array_equal(np.array(image), fb.data)
+
+@pytest.mark.parametrize('fill', [False, True])
+def test_circles_batch_matches_single_calls(fill):
+    rng = np.random.default_rng(5)
+    centers = rng.integers(-20, 120, size = (60, 2))
+    radii = rng.integers(0, 40, size = 60)
+    colors = rng.integers(1, 256, size = 60)
+
+    single = FrameBuffer((100, 100))
+    for ((x, y), r, color) in zip(centers.tolist(), radii.tolist(), colors.tolist()):
+        rast_alg.bresenham_circle((x, y), r, single, color, fill = fill)
+
+    batch = FrameBuffer((100, 100))
+    rast_alg.bresenham_circles(centers, radii, batch, colors, fill = fill)
+
+    assert np.array_equal(single.data, batch.data)
+
+def test_filled_circle_covers_circle_outline():
+    outline = FrameBuffer((100, 100))
+    rast_alg.bresenham_circle((50, 50), 30, outline)
+    disc = FrameBuffer((100, 100))
+    rast_alg.bresenham_circle((50, 50), 30, disc, fill = True)
+
+    assert (disc.data[outline.data > 0] > 0).all()
+    (y, x) = np.mgrid[:100, :100]
+    assert (disc.data[(x - 50) ** 2 + (y - 50) ** 2 <= 29 ** 2] > 0).all()
@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pytest
+
+import rast_alg
+
+
+def reference_parse(text):
+    # эталонный построчный разбор: вершины "v" и грани "f" с веерным разбиением многоугольников
+    (vertices, faces) = ([], [])
+    for line in text.decode().splitlines():
+        words = line.split('#', 1)[0].split()
+        if (not words):
+            continue
+        if (words[0] == 'v'):
+            vertices.append([float(w) for w in words[1:4]])
+        elif (words[0] == 'f'):
+            index = [int(w.split('/')[0]) for w in words[1:]]
+            index = [i - 1 if i > 0 else len(vertices) + i for i in index]
+            for j in range(1, len(index) - 1):
+                faces.append((index[0], index[j], index[j + 1]))
+    return (np.array(vertices, np.float32).reshape(-1, 3), np.array(faces, np.int32).reshape(-1, 3))
+
+def write_obj(path, vertices, faces, fmt = '{!r}'):
+    with open(path, 'w') as file:
+        for v in vertices.tolist():
+            file.write('v ' + ' '.join(fmt.format(c) for c in v) + '\n')
+        for f in (faces + 1).tolist():
+            file.write('f ' + ' '.join(map(str, f)) + '\n')
+
+@pytest.mark.parametrize('fmt', ['{!r}', '{:.6f}', '{:.3e}', '{:+.2f}'])
+def test_round_trip(tmp_path, fmt):
+    rng = np.random.default_rng(0)
+    vertices = (rng.standard_normal((500, 3)) * 10.0 ** rng.integers(-3, 4, (500, 1))).astype(np.float32)
+    faces = rng.integers(0, 500, (900, 3)).astype(np.int32)
+    path = tmp_path / 'mesh.obj'
+    write_obj(path, vertices, faces, fmt)
+
+    (v, f, polygons) = rast_alg.load_obj(str(path), return_polygons = True, cache = False)
+
+    expected = np.array([[float(fmt.format(c)) for c in row] for row in vertices.tolist()], np.float32)
+    assert np.array_equal(v, expected)
+    assert np.array_equal(f, faces)
+    assert np.array_equal(polygons, np.arange(faces.shape[0]))
+
+def test_matches_reference_parser(tmp_path):
+    text = (b"# header\n"
+            b"mtllib mesh.mtl\n"
+            b"v 0 0 0\n"
+            b"v 1.5 -2.25 +3.125 1.0\n"
+            b"  v\t-.5 0.000001 12345678901.25 # comment\n"
+            b"vt 0.5 0.5\n"
+            b"vn 0 0 1\n"
+            b"v 1e-3 -2E+2 0.1\n"
+            b"f 1 2 3\n"
+            b"f 1/1/1 2/1/1 3/1/1 4/1/1\n"
+            b"g part\n"
+            b"v 7 8 9\r\n"
+            b"f -1//1 -2//1 -3//1 -4//1 -5//1\r\n"
+            b"f 1 3 5#tail")
+    path = tmp_path / 'mixed.obj'
+    path.write_bytes(text)
+
+    (v, f, polygons) = rast_alg.load_obj(str(path), return_polygons = True, cache = False)
+    (ref_v, ref_f) = reference_parse(text)
+
+    assert np.array_equal(v, ref_v)
+    assert np.array_equal(f, ref_f)
+    assert polygons.tolist() == [0, 1, 1, 2, 2, 2, 3]
+
+@pytest.mark.parametrize('text', [b"v 1 2 x\nf 1 2 3\n", b"v 1 2\n", b"v 1 2 3\nv 1 2 3\nv 1 2 3\nf 1 2 4\n",
+                                  b"v 1 2 3\nv 1 2 3\nf 1 2\n"])
+def test_malformed_files(tmp_path, text):
+    path = tmp_path / 'bad.obj'
+    path.write_bytes(text)
+    with pytest.raises(ValueError):
+        rast_alg.load_obj(str(path), cache = False)
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = rast_alg.MeshCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(rast_alg, 'mesh_cache', cache)
+    return cache
+
+def test_cache_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'home_cache'))
+    path = tmp_path / 'mesh.obj'
+    path.write_bytes(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+
+    assert rast_alg.mesh_cache is None
+    rast_alg.load_obj(str(path))
+    assert not (tmp_path / 'home_cache').exists()
+
+def test_cache_hit_matches_cold_load(tmp_path, cache):
+    rng = np.random.default_rng(1)
+    path = tmp_path / 'mesh.obj'
+    write_obj(path, rng.random((50, 3)).astype(np.float32), rng.integers(0, 50, (80, 3)))
+
+    cold = rast_alg.load_obj(str(path), return_polygons = True, cache = False)
+    miss = rast_alg.load_obj(str(path), return_polygons = True)
+    hit = rast_alg.load_obj(str(path), return_polygons = True)
+
+    for (a, b, c) in zip(cold, miss, hit):
+        assert np.array_equal(a, b) and np.array_equal(a, c) and a.dtype == c.dtype
+        # массивы из кэша, как и только что разобранные, доступны для записи, и запись не меняет кэш
+        assert a.flags.writeable and b.flags.writeable and c.flags.writeable
+    hit[0][:] = -1
+    assert np.array_equal(rast_alg.load_obj(str(path))[0], cold[0])
+
+def test_cache_invalidated_by_file_change(tmp_path, cache):
+    path = tmp_path / 'mesh.obj'
+    path.write_bytes(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+    assert rast_alg.load_obj(str(path))[0].tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0]]
+
+    # тот же размер файла, другое содержимое и время изменения
+    path.write_bytes(b"v 0 0 0\nv 2 0 0\nv 0 2 0\nf 3 2 1\n")
+    stat = path.stat()
+    os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    (vertices, faces) = rast_alg.load_obj(str(path))
+
+    assert vertices.tolist() == [[0, 0, 0], [2, 0, 0], [0, 2, 0]]
+    assert faces.tolist() == [[2, 1, 0]]
+
+def test_cache_falls_back_to_parsing_on_io_errors(tmp_path, monkeypatch):
+    blocker = tmp_path / 'not_a_directory'
+    blocker.write_bytes(b'')
+    monkeypatch.setattr(rast_alg, 'mesh_cache', rast_alg.MeshCache(str(blocker / 'cache')))
+    path = tmp_path / 'mesh.obj'
+    path.write_bytes(b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+
+    assert rast_alg.load_obj(str(path))[1].tolist() == [[0, 1, 2]]
@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+import rast_alg
+from rast_alg import FrameBuffer
+from rast_bench import sphere_mesh, write_obj
+
+
+@pytest.fixture
+def mesh_file(tmp_path):
+    path = str(tmp_path / 'sphere.obj')
+    write_obj(path, *sphere_mesh(3000))
+    return path
+
+def test_profiling_is_off_by_default(mesh_file):
+    rast_alg.zbuffer_clipper(mesh_file, FrameBuffer((1000, 1000)))
+    assert rast_alg._stats is None
+
+def test_roggers_counters(mesh_file):
+    (vertices, faces) = rast_alg.load_obj(mesh_file)
+    screen = str(mesh_file).replace('.obj', '_screen.obj')
+    write_obj(screen, vertices * 400 + 500, faces)
+
+    with rast_alg.profile() as stats:
+        rast_alg.roggers_clipper(screen, FrameBuffer((1000, 1000)))
+
+    facing = rast_alg._face_normals(vertices, faces)[:, 2] > 0
+    assert stats.counters['triangles'] == len(faces)
+    assert stats.counters['triangles culled'] == len(faces) - np.count_nonzero(facing)
+    assert {'load_obj', 'culling', 'edges', 'draw'} <= set(stats.stages)
+
+def test_zbuffer_stages_and_counters(mesh_file):
+    image = FrameBuffer((1000, 1000))
+    with rast_alg.profile() as stats:
+        rast_alg.zbuffer_clipper(mesh_file, image)
+
+    assert {'load_obj', 'transform', 'raster', 'write'} <= set(stats.stages)
+    assert stats.counters['triangles'] == len(rast_alg.load_obj(mesh_file)[1])
+    assert stats.counters['pixels tested'] >= stats.counters['pixels covered'] >= stats.counters['depth test passes']
+    assert stats.counters['pixels written'] == np.count_nonzero(image.data)
+
+def test_pool_counters_match_single_process(mesh_file, monkeypatch):
+    monkeypatch.setattr(rast_alg, '_ZBUFFER_POOL_FACES', 0)
+    counters = []
+    for workers in (1, 2):
+        with rast_alg.profile() as stats:
+            rast_alg.zbuffer_clipper(mesh_file, FrameBuffer((1000, 1000)), workers = workers)
+        # число прошедших тест глубины зависит от порядка растеризации треугольников, остальные счетчики - нет
+        counters.append({name: n for (name, n) in stats.counters.items() if name != 'depth test passes'})
+
+    assert counters[0] == counters[1]
+
+def test_nested_profile_merges_into_outer(mesh_file):
+    with rast_alg.profile() as outer:
+        rast_alg.zbuffer_clipper(mesh_file, FrameBuffer((1000, 1000)))
+        with rast_alg.profile() as inner:
+            rast_alg.zbuffer_clipper(mesh_file, FrameBuffer((1000, 1000)))
+
+    assert outer.counters['triangles'] == 2 * inner.counters['triangles']
+    assert outer.stages['raster'][1] == 2 * inner.stages['raster'][1]
+
+def test_json_and_trace_output(tmp_path, mesh_file):
+    with rast_alg.profile() as stats:
+        rast_alg.zbuffer_clipper(mesh_file, FrameBuffer((1000, 1000)))
+
+    data = json.loads(stats.to_json())
+    assert data['counters'] == stats.counters
+    assert data['stages']['raster']['calls'] == stats.stages['raster'][1]
+
+    stats.to_trace(str(tmp_path / 'trace.json'))
+    with open(tmp_path / 'trace.json') as file:
+        events = json.load(file)['traceEvents']
+    assert {event['name'] for event in events if event['ph'] == 'X'} == {name for (name, *_) in stats.events}
+    assert {event['name'] for event in events if event['ph'] == 'C'} == set(stats.counters)
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+import rast_alg
+from rast_alg import FrameBuffer, Transform3D
+from rast_bench import sphere_mesh, torus_mesh, write_obj
+
+
+@pytest.fixture
+def mesh_file(tmp_path):
+    path = str(tmp_path / 'torus.obj')
+    write_obj(path, *torus_mesh(3000))
+    return path
+
+@pytest.mark.parametrize('mode', ['L', 'RGB'])
+@pytest.mark.parametrize('smooth', [True, False])
+def test_draw_lit_matches_zbuffer_clipper_with_light(mesh_file, mode, smooth):
+    expected = FrameBuffer((1000, 1000), mode)
+    rast_alg.zbuffer_clipper_with_light(mesh_file, expected, smooth = smooth)
+    image = FrameBuffer((1000, 1000), mode)
+    rast_alg.Renderer().draw_lit(mesh_file, image, smooth = smooth)
+
+    assert np.array_equal(image.data, expected.data)
+
+def test_repeated_draws_reuse_session_state(mesh_file):
+    renderer = rast_alg.Renderer()
+    (first, second) = (FrameBuffer((400, 300)), FrameBuffer((400, 300)))
+    renderer.draw_zbuffer(mesh_file, first)
+    mesh = renderer.mesh(mesh_file)
+    renderer.draw_zbuffer(mesh_file, second)
+
+    # сетка не перечитывается, а случайные оттенки граней постоянны в пределах сеанса
+    assert renderer.mesh(mesh_file) is mesh
+    assert np.array_equal(first.data, second.data)
+
+def test_view_change_matches_new_session(mesh_file):
+    renderer = rast_alg.Renderer()
+    renderer.draw_lit(mesh_file, FrameBuffer((1000, 1000)))
+    view = Transform3D().rotate_y(90).scale((300, 400, 400)).shift((500, 500, 0))
+    renderer.view = view
+    image = FrameBuffer((1000, 1000))
+    renderer.draw_lit(mesh_file, image)
+
+    expected = FrameBuffer((1000, 1000))
+    rast_alg.Renderer(view = view).draw_lit(mesh_file, expected)
+    assert np.array_equal(image.data, expected.data)
+
+def test_changed_file_is_read_again(tmp_path):
+    path = str(tmp_path / 'mesh.obj')
+    write_obj(path, *torus_mesh(3000))
+    renderer = rast_alg.Renderer()
+    renderer.draw_lit(path, FrameBuffer((1000, 1000)))
+
+    write_obj(path, *sphere_mesh(3000))
+    stat = os.stat(path)
+    os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    image = FrameBuffer((1000, 1000))
+    renderer.draw_lit(path, image)
+
+    expected = FrameBuffer((1000, 1000))
+    rast_alg.zbuffer_clipper_with_light(path, expected)
+    assert np.array_equal(image.data, expected.data)
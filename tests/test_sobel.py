@@ -0,0 +1,94 @@
+import io
+from math import sqrt
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import rast_alg
+
+
+def reference_sobel(pixels):
+    # эталонный попиксельный фильтр: яркость - среднее цветовых каналов, значение - округленный модуль градиента
+    z = rast_alg._luminance(pixels)
+    result = np.zeros(z.shape, np.uint8)
+    for y in range(1, z.shape[0] - 1):
+        for x in range(1, z.shape[1] - 1):
+            G_x = z[y + 1, x - 1] + 2 * z[y + 1, x] + z[y + 1, x + 1] - (z[y - 1, x - 1] + 2 * z[y - 1, x] + z[y - 1, x + 1])
+            G_y = z[y - 1, x + 1] + 2 * z[y, x + 1] + z[y + 1, x + 1] - (z[y - 1, x - 1] + 2 * z[y, x - 1] + z[y + 1, x - 1])
+            result[y, x] = min(round(sqrt(G_x ** 2 + G_y ** 2)), 255)
+    return result
+
+def random_pixels(shape, seed = 0):
+    # плавный фон с резкими перепадами: есть и малые, и обрезаемые до 255 градиенты
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 40, size = shape) + np.where(rng.random(shape[:2]) < 0.1, 200, 0).reshape(shape[:2] + (1,) * (len(shape) - 2))
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+@pytest.mark.parametrize('shape', [(30, 40), (25, 31, 3), (20, 20, 4), (3, 3), (2, 10)])
+def test_sobel_array_matches_reference(shape):
+    pixels = random_pixels(shape)
+    assert np.array_equal(rast_alg.sobel_array(pixels), reference_sobel(pixels))
+
+def test_sobel_array_normalize():
+    pixels = random_pixels((30, 40), seed = 1)
+    result = rast_alg.sobel_array(pixels, normalize = True)
+
+    assert result.max() == 255
+    assert not result[0].any() and not result[-1].any() and not result[:, 0].any() and not result[:, -1].any()
+    assert not rast_alg.sobel_array(np.full((10, 10), 7, np.uint8), normalize = True).any()
+
+def sobel_file(tmp_path, pixels, extension):
+    # исходное изображение и результат sobel_filter для него
+    source = str(tmp_path / f'source{extension}')
+    if (extension == '.npy'):
+        np.save(source, pixels)
+    else:
+        Image.fromarray(pixels).save(source)
+    return (source, rast_alg.sobel_array(pixels))
+
+def read_result(path):
+    return np.load(path) if path.endswith('.npy') else np.asarray(Image.open(path))
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize(('source', 'target'), [('.png', '.png'), ('.pgm', '.pgm'), ('.ppm', '.npy'), ('.npy', '.png')])
+def test_tiled_matches_sobel_array(tmp_path, workers, source, target):
+    pixels = random_pixels((70, 90, 3) if source == '.ppm' else (70, 90), seed = 2)
+    (source, expected) = sobel_file(tmp_path, pixels, source)
+    output = str(tmp_path / f'tiled{target}')
+
+    # размеры изображения не кратны плитке, крайние плитки - шириной в несколько пикселей
+    rast_alg.sobel_filter_tiled(source, output, tile = 22, workers = workers)
+
+    assert np.array_equal(read_result(output), expected)
+
+@pytest.mark.parametrize('source', ['.png', '.pgm', '.ppm'])
+def test_sobel_filter_matches_sobel_array(tmp_path, source):
+    pixels = random_pixels((40, 50, 3) if source == '.ppm' else (40, 50), seed = 3)
+    (source, expected) = sobel_file(tmp_path, pixels, source)
+    output = str(tmp_path / 'filtered.png')
+
+    rast_alg.sobel_filter(source, output, show = False)
+
+    assert np.array_equal(read_result(output), expected)
+
+@pytest.mark.parametrize(('source', 'target'), [('.pgm', '.pgm'), ('.ppm', '.png'), ('.png', '.pgm'), ('.png', '.png')])
+def test_stream_matches_sobel_array(tmp_path, source, target):
+    pixels = random_pixels((35, 45, 3) if source == '.ppm' else (35, 45), seed = 4)
+    (source, expected) = sobel_file(tmp_path, pixels, source)
+    output = str(tmp_path / f'stream{target}')
+
+    rast_alg.sobel_filter_stream(source, output)
+
+    assert np.array_equal(read_result(output), expected)
+
+def test_stream_file_objects(tmp_path):
+    pixels = random_pixels((20, 30), seed = 5)
+    (source, expected) = sobel_file(tmp_path, pixels, '.pgm')
+    output = io.BytesIO()
+
+    with open(source, 'rb') as file:
+        rast_alg.sobel_filter_stream(file, output)
+
+    output.seek(0)
+    assert np.array_equal(np.asarray(Image.open(output)), expected)
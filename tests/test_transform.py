@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import rast_alg
+from rast_alg import Transform2D, Transform3D
+
+
+def random_points(n, dim, seed = 0):
+    return np.random.default_rng(seed).uniform(-100, 100, size = (n, dim))
+
+def test_2d_chain_matches_steps_in_order():
+    points = random_points(50, 2)
+    chain = Transform2D().scale((2, -0.5)).rotate(0.7).shift((10, -3))
+
+    expected = points * (2, -0.5)
+    (c, s) = (np.cos(0.7), np.sin(0.7))
+    expected = np.stack((c * expected[:, 0] + s * expected[:, 1], -s * expected[:, 0] + c * expected[:, 1]), axis = 1)
+    expected += (10, -3)
+
+    assert np.allclose(chain.apply(points), expected)
+
+def test_2d_composition_order():
+    (a, b) = (Transform2D().rotate(0.3), Transform2D().shift((5, 1)).scale((3, 3)))
+    points = random_points(20, 2, seed = 1)
+
+    assert np.allclose(a.then(b).apply(points), b.apply(a.apply(points)))
+    assert np.allclose((b @ a).apply(points), b.apply(a.apply(points)))
+    assert np.allclose(a.then(b).inverse().apply(a.then(b).apply(points)), points)
+
+def test_2d_rounding_and_dtype():
+    shifted = Transform2D().shift((0.5, -0.5)).apply([[1, 1], [2, 2]], np.int64, 'rint')
+    assert shifted.dtype == np.int64 and shifted.tolist() == [[2, 0], [2, 2]]
+    assert Transform2D().shift((0.7, -0.7)).apply([[0, 0]], int).tolist() == [[0, 0]]
+    assert Transform2D().shift((0.7, -0.7)).apply([[0, 0]], int, 'floor').tolist() == [[0, -1]]
+
+def test_2d_point_helpers_match_transform():
+    for (x, y) in random_points(20, 2, seed = 2).astype(int).tolist():
+        assert rast_alg.scale_2D((x, y), (1.5, -2)) == tuple(int(v) for v in np.trunc((1.5 * x, -2 * y)))
+        assert rast_alg.shift_2D((x, y), (3, -4)) == (x + 3, y - 4)
+        assert rast_alg.rotate_2D((x, y), 0.4) == tuple(int(v) for v in Transform2D().rotate(0.4).apply([[x, y]], int, 'trunc')[0])
+
+def test_transform_rejects_wrong_shapes():
+    with pytest.raises(ValueError):
+        Transform2D(np.eye(4))
+    with pytest.raises(ValueError):
+        Transform2D().apply(np.zeros((5, 3)))
+
+def rotation(axis, degrees):
+    # матрицы вращения rotateX_3D, rotateY_3D и rotateZ_3D
+    (c, s) = (np.cos(np.radians(degrees)), np.sin(np.radians(degrees)))
+    return {'x': [[1, 0, 0], [0, c, -s], [0, s, c]], 'y': [[c, 0, s], [0, 1, 0], [-s, 0, c]],
+            'z': [[c, s, 0], [-s, c, 0], [0, 0, 1]]}[axis]
+
+def test_3d_chain_matches_steps_in_order():
+    points = random_points(50, 3, seed = 3)
+    chain = Transform3D().scale((300, 400, 400)).shift((500, 500, 0)).rotate_y(20).rotate_x(34).rotate_z(-15)
+
+    expected = points * (300, 400, 400) + (500, 500, 0)
+    for (axis, degrees) in (('y', 20), ('x', 34), ('z', -15)):
+        expected = expected @ np.array(rotation(axis, degrees)).T
+
+    assert np.allclose(chain.apply(points), expected)
+
+def test_3d_point_helpers_match_transform():
+    for (x, y, z) in random_points(20, 3, seed = 4).astype(int).tolist():
+        for (helper, axis) in ((rast_alg.rotateX_3D, 'x'), (rast_alg.rotateY_3D, 'y'), (rast_alg.rotateZ_3D, 'z')):
+            expected = np.trunc(np.array(rotation(axis, 25)) @ (x, y, z))
+            assert helper((x, y, z), 25) == tuple(int(v) for v in expected)
+        assert rast_alg.shift_3D((x, y, z), (1, 2, 3)) == (x + 1, y + 2, z + 3)
+        assert rast_alg.scale_3D((x, y, z), (2, 2, 2)) == (2 * x, 2 * y, 2 * z)
+
+def test_3d_normals_stay_perpendicular_to_surface():
+    view = Transform3D().scale((3, 1, 0.5)).rotate_y(30).shift((1, 2, 3)).rotate_x(-10)
+    rng = np.random.default_rng(5)
+    (a, b) = (rng.standard_normal((40, 3)), rng.standard_normal((40, 3)))
+    normals = np.cross(a, b)
+
+    linear = view.matrix[:3, :3]
+    moved = view.apply_normals(normals)
+
+    assert np.allclose(np.einsum('ij,ij->i', moved, a @ linear.T), 0)
+    assert np.allclose(np.einsum('ij,ij->i', moved, b @ linear.T), 0)
+    assert np.allclose(np.linalg.norm(moved, axis = 1), 1)
+    # без нормирования ориентация и направление совпадают с векторным произведением преобразованных сторон
+    raw = view.apply_normals(normals, normalize = False)
+    assert (np.einsum('ij,ij->i', raw, np.cross(a @ linear.T, b @ linear.T)) > 0).all()
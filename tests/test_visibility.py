@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+import rast_alg
+from rast_alg import FrameBuffer
+from rast_bench import sphere_mesh, write_obj
+
+
+# треугольник в координатах плоскости, обход против часовой стрелки при взгляде с +z: нормаль (0, 0, 1)
+TRIANGLE = (np.array([[10, 10, 0], [90, 10, 0], [10, 90, 0]], np.float64), np.array([[0, 1, 2]]))
+
+def bowl_mesh(n = 40):
+    # открытая чаша z = 0.3 (x^2 + y^2), грани обходятся против часовой стрелки при взгляде с +z
+    (x, y) = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n))
+    vertices = np.stack((x, y, 0.3 * (x ** 2 + y ** 2)), axis = -1).reshape(-1, 3)
+    index = np.arange(n * n).reshape(n, n)
+    (a, b, c, d) = (index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1])
+    faces = np.concatenate((np.stack((a, b, c), axis = -1).reshape(-1, 3), np.stack((a, c, d), axis = -1).reshape(-1, 3)))
+    return (vertices, faces)
+
+def screen_mesh(mesh):
+    # сетка в координатах плоскости 1000 x 1000
+    return (mesh[0] * 400 + 500, mesh[1])
+
+def obj_file(tmp_path, name, mesh, flip = False):
+    (vertices, faces) = mesh
+    path = str(tmp_path / f'{name}.obj')
+    write_obj(path, vertices, faces[:, ::-1] if flip else faces)
+    return path
+
+def test_face_normals_follow_winding():
+    (vertices, faces) = TRIANGLE
+    assert rast_alg._face_normals(vertices, faces).tolist() == [[0, 0, 6400]]
+    assert rast_alg._face_normals(vertices, faces[:, ::-1]).tolist() == [[0, 0, -6400]]
+
+@pytest.mark.parametrize('smooth', [True, False])
+def test_triangle_facing_viewer_is_lit(tmp_path, smooth):
+    path = obj_file(tmp_path, 'triangle', TRIANGLE)
+    image = FrameBuffer((100, 100))
+    rast_alg.Renderer(view = np.eye(4)).draw_lit(path, image, smooth = smooth)
+
+    inside = image.data[20:50, 20:50]
+    assert (inside == 255).all()
+
+@pytest.mark.parametrize('smooth', [True, False])
+def test_open_bowl_facing_viewer_is_lit(tmp_path, smooth):
+    lit = FrameBuffer((1000, 1000))
+    rast_alg.zbuffer_clipper_with_light(obj_file(tmp_path, 'bowl', bowl_mesh()), lit, smooth = smooth)
+    back = FrameBuffer((1000, 1000))
+    rast_alg.zbuffer_clipper_with_light(obj_file(tmp_path, 'bowl_cw', bowl_mesh(), flip = True), back, smooth = smooth)
+
+    # лицевая сторона освещена, обратная (обход по часовой стрелке) - только фоновой освещенностью
+    assert lit.data[lit.data > 0].mean() > 150
+    assert np.array_equal(back.data > 0, lit.data > 0)
+    assert back.data[back.data > 0].max() <= 26
+
+def test_closed_mesh_is_lit_from_outside(tmp_path):
+    image = FrameBuffer((1000, 1000))
+    rast_alg.zbuffer_clipper_with_light(obj_file(tmp_path, 'sphere', sphere_mesh(4000)), image)
+
+    assert image.data.max() == 255
+    assert image.data[image.data > 0].mean() > 150
+
+def test_roggers_draws_triangle_facing_viewer(tmp_path):
+    image = FrameBuffer((100, 100))
+    rast_alg.roggers_clipper(obj_file(tmp_path, 'triangle', TRIANGLE), image)
+
+    expected = FrameBuffer((100, 100))
+    rast_alg.bresenham_lines(np.array([[10, 10, 90, 10], [90, 10, 10, 90], [10, 90, 10, 10]]), expected)
+    assert np.array_equal(image.data, expected.data)
+
+def test_roggers_culls_triangle_facing_away(tmp_path):
+    image = FrameBuffer((100, 100))
+    rast_alg.roggers_clipper(obj_file(tmp_path, 'triangle_cw', TRIANGLE, flip = True), image)
+
+    assert not image.data.any()
+
+def test_roggers_draws_front_of_bowl(tmp_path):
+    front = FrameBuffer((1000, 1000))
+    rast_alg.roggers_clipper(obj_file(tmp_path, 'bowl', screen_mesh(bowl_mesh())), front)
+    back = FrameBuffer((1000, 1000))
+    rast_alg.roggers_clipper(obj_file(tmp_path, 'bowl_cw', screen_mesh(bowl_mesh()), flip = True), back)
+
+    assert front.data.any() and not back.data.any()
+
+@pytest.mark.parametrize('name', ['triangle', 'bowl', 'bowl_cw', 'sphere'])
+def test_renderer_wireframe_matches_roggers_for_identity_view(tmp_path, name):
+    mesh = {'triangle': TRIANGLE, 'bowl': screen_mesh(bowl_mesh()), 'bowl_cw': screen_mesh(bowl_mesh()),
+            'sphere': screen_mesh(sphere_mesh(4000))}[name]
+    path = obj_file(tmp_path, name, mesh, flip = name.endswith('_cw'))
+
+    expected = FrameBuffer((1000, 1000))
+    rast_alg.roggers_clipper(path, expected)
+    image = FrameBuffer((1000, 1000))
+    rast_alg.Renderer(view = np.eye(4)).draw_wireframe(path, image)
+
+    assert np.array_equal(image.data, expected.data)
+
+def test_renderer_wireframe_draws_bowl(tmp_path):
+    image = FrameBuffer((1000, 1000))
+    rast_alg.Renderer().draw_wireframe(obj_file(tmp_path, 'bowl', bowl_mesh()), image)
+
+    assert np.count_nonzero(image.data) > 1000
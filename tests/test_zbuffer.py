@@ -0,0 +1,89 @@
+import random
+
+import numpy as np
+import pytest
+
+import rast_alg
+from rast_alg import FrameBuffer
+from rast_bench import sphere_mesh, torus_mesh, write_obj
+
+
+@pytest.fixture(autouse = True)
+def small_pool_threshold(monkeypatch):
+    # пул включается и для небольших тестовых сеток
+    monkeypatch.setattr(rast_alg, '_ZBUFFER_POOL_FACES', 0)
+
+@pytest.fixture(params = ['sphere', 'torus'])
+def mesh_file(request, tmp_path):
+    (vertices, faces) = {'sphere': sphere_mesh, 'torus': torus_mesh}[request.param](4000)
+    path = str(tmp_path / f'{request.param}.obj')
+    write_obj(path, vertices, faces)
+    return path
+
+def test_pool_matches_single_process(mesh_file):
+    images = []
+    for workers in (1, 2):
+        random.seed(0)
+        image = FrameBuffer((1000, 1000))
+        rast_alg.zbuffer_clipper(mesh_file, image, workers = workers)
+        images.append(image.data)
+
+    assert np.count_nonzero(images[0]) > 0
+    assert np.array_equal(images[0], images[1])
+
+def test_pool_matches_single_process_with_light(mesh_file):
+    images = []
+    for workers in (1, 2):
+        image = FrameBuffer((1000, 1000))
+        rast_alg.zbuffer_clipper_with_light(mesh_file, image, workers = workers)
+        images.append(image.data)
+
+    assert np.count_nonzero(images[0]) > 0
+    assert np.array_equal(images[0], images[1])
+
+def test_renderer_pool_matches_single_process(mesh_file):
+    images = []
+    for workers in (1, 2):
+        image = FrameBuffer((1000, 1000))
+        rast_alg.Renderer(workers = workers).draw_zbuffer(mesh_file, image, color = 200)
+        images.append(image.data)
+
+    assert np.array_equal(images[0], images[1])
+
+def reference_zbuffer(points, faces, size):
+    # эталон: каждый треугольник проверяется во всех пикселях плоскости, видима точка с наибольшим z,
+    # при равной глубине - треугольник с меньшим номером
+    (w, h) = size
+    (ys, xs) = np.mgrid[:h, :w].astype(np.float64)
+    depth = np.full((h, w), -np.inf)
+    ids = np.full((h, w), -1)
+    for (t, face) in enumerate(faces):
+        (x, y, z) = points[face].T
+        area = (x[1] - x[0]) * (y[2] - y[0]) - (x[2] - x[0]) * (y[1] - y[0])
+        if (area == 0):
+            continue
+        e = [np.sign(area) * ((y[(k + 1) % 3] - y[(k + 2) % 3]) * xs + (x[(k + 2) % 3] - x[(k + 1) % 3]) * ys
+                              + x[(k + 1) % 3] * y[(k + 2) % 3] - x[(k + 2) % 3] * y[(k + 1) % 3]) for k in range(3)]
+        covered = (e[0] >= 0) & (e[1] >= 0) & (e[2] >= 0)
+        d = (e[0] * z[0] + e[1] * z[1] + e[2] * z[2]) / abs(area)
+        win = covered & (d > depth)
+        depth[win] = d[win]
+        ids[win] = t
+    return ids
+
+@pytest.mark.parametrize('seed', range(3))
+def test_raster_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    # большие и маленькие треугольники, часть - за пределами плоскости, с пересечениями по глубине
+    centers = rng.uniform(-10, 110, (120, 1, 2))
+    radius = np.where(rng.random((120, 1, 1)) < 0.3, 40, 5)
+    xy = np.rint(centers + rng.uniform(-1, 1, (120, 3, 2)) * radius)
+    points = np.concatenate((xy.reshape(-1, 2), rng.uniform(-50, 50, (360, 1))), axis = 1)
+    faces = np.arange(360).reshape(-1, 3)
+    colors = np.arange(1, 121)
+
+    (color, depth, ids) = rast_alg._zbuffer_render(points, faces, colors, (100, 80), workers = 1, tile = 32)
+
+    expected = reference_zbuffer(points, faces, (100, 80))
+    assert np.array_equal(ids, expected)
+    assert np.array_equal(color, np.where(expected >= 0, colors[expected], 0))